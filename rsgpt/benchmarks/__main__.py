@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from ..utils.stores import (
+    configure_embedding_cache,
+    get_embedding_settings,
+    set_embeddings,
+)
+from .suites import (
+    DelayedEmbeddings,
+    bench_chunk_edit,
+    bench_indexing,
+    bench_recall_memory,
+    bench_search,
+)
+
+SUITES = ("indexing", "search", "chunk_edit", "recall_memory")
+
+
+def _revision() -> str | None:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode("utf-8")
+            .strip()
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def run_benchmarks(
+    suites: tuple[str, ...] = SUITES,
+    files: int = 200,
+    lines_per_file: int = 200,
+    indexing_workers: int = 1,
+    queries: int = 50,
+    large_file_size: int = 1_000_000,
+    edits: int = 10,
+    memory_sizes: tuple[int, ...] = (100, 1000, 5000),
+    embedding_delay_ms: float = 0.0,
+    seed: int = 0,
+) -> dict:
+    """
+    Run the benchmark suites on synthetic data in a temporary directory.
+
+    Embeddings come from a deterministic local stand-in, optionally delayed to model the
+    latency of the embedding server, and the embedding cache is disabled, so results only
+    depend on the code and the machine. The embedding settings of the process are
+    restored afterwards.
+
+    Returns:
+        dict: The parameters, environment and results of the run.
+    """
+    embeddings = DelayedEmbeddings(delay_s=embedding_delay_ms / 1000)
+    previous_embeddings, cache_path, cache_max_entries = get_embedding_settings()
+    configure_embedding_cache(None)
+    set_embeddings(embeddings)
+    results = {}
+    start = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            repo_path = f"{directory}/repo"
+            if "indexing" in suites or "search" in suites:
+                indexing, identifiers = bench_indexing(
+                    repo_path, files, lines_per_file, indexing_workers, seed
+                )
+                if "indexing" in suites:
+                    results["indexing"] = indexing
+                if "search" in suites:
+                    results["search"] = bench_search(
+                        repo_path, identifiers, queries, seed
+                    )
+            if "chunk_edit" in suites:
+                results["chunk_edit"] = bench_chunk_edit(
+                    f"{directory}/edit_repo", large_file_size, edits, seed
+                )
+            if "recall_memory" in suites:
+                results["recall_memory"] = bench_recall_memory(
+                    f"{directory}/memory_store", memory_sizes, queries, seed
+                )
+    finally:
+        set_embeddings(previous_embeddings)
+        configure_embedding_cache(cache_path, cache_max_entries)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "files": files,
+            "lines_per_file": lines_per_file,
+            "indexing_workers": indexing_workers,
+            "queries": queries,
+            "large_file_size": large_file_size,
+            "edits": edits,
+            "memory_sizes": list(memory_sizes),
+            "embedding_delay_ms": embedding_delay_ms,
+            "seed": seed,
+        },
+        "embedding_requests": embeddings.requests,
+        "duration_s": time.perf_counter() - start,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark RSgpt indexing, search, chunk editing and recall memory "
+        "offline, on synthetic data."
+    )
+    parser.add_argument(
+        "--suite", action="append", choices=SUITES, help="Suite to run, all by default."
+    )
+    parser.add_argument(
+        "--files", type=int, default=200, help="Files of the synthetic repository."
+    )
+    parser.add_argument("--lines-per-file", type=int, default=200)
+    parser.add_argument("--indexing-workers", type=int, default=1)
+    parser.add_argument(
+        "--queries", type=int, default=50, help="Searches per query kind."
+    )
+    parser.add_argument(
+        "--large-file-size",
+        type=int,
+        default=1_000_000,
+        help="Characters of the edited file.",
+    )
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument(
+        "--memory-sizes", type=int, nargs="+", default=[100, 1000, 5000]
+    )
+    parser.add_argument(
+        "--embedding-delay-ms",
+        type=float,
+        default=0.0,
+        help="Latency added to each embedding request.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write the JSON results to this file instead of stdout.",
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        suites=args.suite or SUITES,
+        files=args.files,
+        lines_per_file=args.lines_per_file,
+        indexing_workers=args.indexing_workers,
+        queries=args.queries,
+        large_file_size=args.large_file_size,
+        edits=args.edits,
+        memory_sizes=args.memory_sizes,
+        embedding_delay_ms=args.embedding_delay_ms,
+        seed=args.seed,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
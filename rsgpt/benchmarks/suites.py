@@ -0,0 +1,195 @@
+import contextlib
+import io
+import os
+import random
+import statistics
+import time
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from ..tools import modify_file_chunk, search_repo_by_path, search_repo_content
+from ..utils.recall_memory import RecallMemoryStore
+from ..utils.repo_index import RepoIndex
+from ..utils.repository_loader import load_repository
+from .synthetic_repo import WORDS, generate_repository, write_large_file
+
+EMBEDDING_SIZE = 256
+
+
+class DelayedEmbeddings(Embeddings):
+    """
+    Deterministic stand-in for the embedding model, optionally waiting a fixed time per
+    request to model the latency of a local model server.
+    """
+
+    def __init__(self, delay_s: float = 0.0, size: int = EMBEDDING_SIZE):
+        self.embeddings = DeterministicFakeEmbedding(size=size)
+        self.delay_s = delay_s
+        self.requests = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.requests += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """Return the mean and percentiles of durations in seconds, in milliseconds."""
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def _timed(function, *args, **kwargs) -> float:
+    """Return the duration of a call, silencing the progress printed by the loader."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    if isinstance(result, str) and result.startswith("Error"):
+        raise RuntimeError(result)
+    return time.perf_counter() - start
+
+
+def _chunk_count(repo_path: str) -> int:
+    repo_index = RepoIndex(repo_path)
+    try:
+        return repo_index.connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[
+            0
+        ]
+    finally:
+        repo_index.close()
+
+
+def _indexed_files(repo_path: str) -> list[str]:
+    repo_index = RepoIndex(repo_path)
+    try:
+        return sorted(repo_index.get_files())
+    finally:
+        repo_index.close()
+
+
+def bench_indexing(
+    repo_path: str,
+    file_count: int,
+    lines_per_file: int,
+    indexing_workers: int = 1,
+    seed: int = 0,
+) -> tuple[dict, list[str]]:
+    """Measure cold, warm and incremental indexing of a synthetic repository."""
+    identifiers = generate_repository(repo_path, file_count, lines_per_file, seed)
+    cold = _timed(load_repository, repo_path, indexing_workers=indexing_workers)
+    chunk_count = _chunk_count(repo_path)
+    warm = _timed(load_repository, repo_path, indexing_workers=indexing_workers)
+
+    rng = random.Random(seed)
+    changed = rng.sample(_indexed_files(repo_path), max(1, file_count // 100))
+    for file_path in changed:
+        with open(os.path.join(repo_path, file_path), "a") as f:
+            f.write(f"# {' '.join(rng.choices(WORDS, k=8))}\n")
+    incremental = _timed(load_repository, repo_path, indexing_workers=indexing_workers)
+    return {
+        "files": file_count,
+        "chunks": chunk_count,
+        "cold_s": cold,
+        "cold_files_per_s": file_count / cold,
+        "cold_chunks_per_s": chunk_count / cold,
+        "warm_s": warm,
+        "incremental_files": len(changed),
+        "incremental_s": incremental,
+    }, identifiers
+
+
+def bench_search(
+    repo_path: str, identifiers: list[str], query_count: int, seed: int = 0
+) -> dict:
+    """Measure the latency of identifier, natural language and path searches."""
+    rng = random.Random(seed)
+    config = {"configurable": {"repo_path": repo_path}}
+    file_paths = _indexed_files(repo_path)
+    samples = {"identifier": [], "natural_language": [], "by_path": []}
+    for _ in range(query_count):
+        samples["identifier"].append(
+            _timed(
+                search_repo_content.invoke, {"query": rng.choice(identifiers)}, config
+            )
+        )
+        query = "how to " + " ".join(rng.choices(WORDS, k=5))
+        samples["natural_language"].append(
+            _timed(search_repo_content.invoke, {"query": query}, config)
+        )
+        samples["by_path"].append(
+            _timed(
+                search_repo_by_path.invoke,
+                {"path": rng.choice(file_paths), "chunk_number": 0},
+                config,
+            )
+        )
+    return {kind: latency_summary(values) for kind, values in samples.items()}
+
+
+def bench_chunk_edit(
+    repo_path: str, file_size: int, edit_count: int, seed: int = 0
+) -> dict:
+    """Measure the cost of modifying chunks of a large file, re-indexing included."""
+    rng = random.Random(seed)
+    file_path = "large_module.py"
+    generate_repository(repo_path, file_count=0)
+    write_large_file(repo_path, file_path, file_size, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_repository(repo_path)
+    config = {"configurable": {"repo_path": repo_path}}
+    samples = []
+    for _ in range(edit_count):
+        repo_index = RepoIndex(repo_path)
+        chunk_count = repo_index.count_chunks(file_path)
+        repo_index.close()
+        chunk = rng.randrange(chunk_count)
+        new_content = f"def edited_{chunk}():\n    return {chunk}\n"
+        samples.append(
+            _timed(
+                modify_file_chunk.invoke,
+                {"file_path": file_path, "chunks": [chunk], "new_content": new_content},
+                config,
+            )
+        )
+    return {"file_size": file_size, **latency_summary(samples)}
+
+
+def bench_recall_memory(
+    store_path: str, sizes: list[int], query_count: int, seed: int = 0
+) -> list[dict]:
+    """Measure memory saving throughput and search latency as the store grows."""
+    rng = random.Random(seed)
+    store = RecallMemoryStore(store_path, DelayedEmbeddings())
+    results = []
+    for size in sorted(sizes):
+        memories = [
+            " ".join(rng.choices(WORDS, k=12)) for _ in range(size - len(store))
+        ]
+        start = time.perf_counter()
+        for memory in memories:
+            store.add_texts([memory])
+        save_s = time.perf_counter() - start
+        samples = [
+            _timed(store.similarity_search, " ".join(rng.choices(WORDS, k=4)), 5)
+            for _ in range(query_count)
+        ]
+        results.append(
+            {
+                "memories": len(store),
+                "saves_per_s": len(memories) / save_s if save_s else None,
+                "search": latency_summary(samples),
+            }
+        )
+    return results
@@ -0,0 +1,87 @@
+import os
+import random
+from git import Repo
+
+WORDS = (
+    "index chunk vector store embedding search repository file path worker graph "
+    "message tool query result batch cache lock memory commit branch diff tree node "
+    "config model prompt token stream parse load save update delete create read write"
+).split()
+
+
+def _identifier(rng: random.Random) -> str:
+    return "_".join(rng.choice(WORDS) for _ in range(3))
+
+
+def _python_file(rng: random.Random, lines: int, identifiers: list[str]) -> str:
+    content = []
+    while len(content) < lines:
+        name = _identifier(rng)
+        identifiers.append(name)
+        content.append(f"def {name}({rng.choice(WORDS)}, {rng.choice(WORDS)}):")
+        content.append(f'    """{" ".join(rng.choices(WORDS, k=10)).capitalize()}."""')
+        for _ in range(rng.randint(3, 12)):
+            content.append(
+                f"    {_identifier(rng)} = {rng.choice(WORDS)}({rng.randint(0, 99)})"
+            )
+        content.append(f"    return {rng.choice(WORDS)}")
+        content.append("")
+    return "\n".join(content[:lines]) + "\n"
+
+
+def _markdown_file(rng: random.Random, lines: int) -> str:
+    content = [f"# {' '.join(rng.choices(WORDS, k=3)).title()}", ""]
+    while len(content) < lines:
+        content.append(
+            " ".join(rng.choices(WORDS, k=rng.randint(8, 16))).capitalize() + "."
+        )
+    return "\n".join(content[:lines]) + "\n"
+
+
+def generate_repository(
+    repo_path: str,
+    file_count: int,
+    lines_per_file: int = 200,
+    seed: int = 0,
+) -> list[str]:
+    """
+    Create a git repository of Python and Markdown files with reproducible content.
+
+    Files are spread over nested directories, Python files define functions whose names
+    are combinations of common words, so that both identifier and natural language
+    queries find matches.
+
+    Args:
+        repo_path (str): Directory of the repository, created if needed.
+        file_count (int): Number of files to generate.
+        lines_per_file (int): Number of lines of each file.
+        seed (int): Seed of the content generator.
+
+    Returns:
+        list[str]: The function names defined in the Python files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(repo_path, exist_ok=True)
+    Repo.init(repo_path)
+    identifiers = []
+    for index in range(file_count):
+        directory = os.path.join(f"package_{index % 10}", f"module_{index % 7}")
+        os.makedirs(os.path.join(repo_path, directory), exist_ok=True)
+        if index % 4 == 3:
+            file_path = os.path.join(directory, f"notes_{index}.md")
+            content = _markdown_file(rng, lines_per_file)
+        else:
+            file_path = os.path.join(directory, f"source_{index}.py")
+            content = _python_file(rng, lines_per_file, identifiers)
+        with open(os.path.join(repo_path, file_path), "w") as f:
+            f.write(content)
+    return identifiers
+
+
+def write_large_file(repo_path: str, file_path: str, size: int, seed: int = 0):
+    """Write a Python file of about size characters to the repository."""
+    rng = random.Random(seed)
+    line_count = max(1, size // 45)
+    content = _python_file(rng, line_count, [])
+    with open(os.path.join(repo_path, file_path), "w") as f:
+        f.write(content)
@@ -1,12 +1,21 @@
 from langgraph.graph import StateGraph, START, END
 from ..tools import execute_command_at_repo_root
-from langchain.prompts import ChatPromptTemplate
+from ..utils.git import get_staged_diff, stage_all
+from ..utils.diff_pipeline import DIFF_GROUP_CHARS, MAX_DIFF_GROUPS, prepare_diff
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from .graphs_common import WorkerState
-from ..utils.llm import llm_base
+
+# Number of groups of files summarized concurrently
+DIFF_SUMMARY_WORKERS = 4
 
 
 class CommitState(WorkerState):
     git_diff: str
+    diff_groups: list[str]
+    skipped_files: list[str]
+    diff_summaries: list[str]
     commit_command: str
 
 
@@ -16,33 +25,87 @@ class CommitAssistantGraph(StateGraph):
         self.tools = [execute_command_at_repo_root]
         self.add_node("stage_files", self.stage_files)
         self.add_node("analyze_code_diff", self.analyze_code_diff)
+        self.add_node("summarize_diff_groups", self.summarize_diff_groups)
         self.add_node("generate_commit_details", self.generate_commit_details)
         self.add_node("execute_git_commit", self.execute_git_commit)
         self.add_edge(START, "stage_files")
         self.add_edge("stage_files", "analyze_code_diff")
-        self.add_edge("analyze_code_diff", "generate_commit_details")
+        self.add_edge("analyze_code_diff", "summarize_diff_groups")
+        self.add_edge("summarize_diff_groups", "generate_commit_details")
         self.add_edge("generate_commit_details", "execute_git_commit")
         self.add_edge("execute_git_commit", END)
 
-    def stage_files(self, state: CommitState):
-        """Stages all changes using git add ."""
-        execute_command_at_repo_root.invoke({"command": "git add ."})
+    def stage_files(self, state: CommitState, config: RunnableConfig):
+        """Stages all changes, additions and deletions included."""
+        stage_all(config["configurable"]["repo_path"])
+        return state
+
+    def analyze_code_diff(self, state: CommitState, config: RunnableConfig):
+        """
+        Fetches the difference of staged changes and splits it into groups of files,
+        leaving out lockfiles, vendored, generated and binary files.
+        """
+        configurable = config["configurable"]
+        state["git_diff"] = get_staged_diff(configurable["repo_path"])
+        state["diff_groups"], state["skipped_files"] = prepare_diff(
+            state["git_diff"],
+            max_chars=configurable.get("commit_diff_group_chars", DIFF_GROUP_CHARS),
+            max_groups=configurable.get("commit_max_diff_groups", MAX_DIFF_GROUPS),
+        )
         return state
 
-    def analyze_code_diff(self, state: CommitState):
-        """Fetches the difference of staged changes."""
-        git_diff_output = execute_command_at_repo_root.invoke(
-            {"command": "git diff --staged"}
+    def summarize_diff_groups(self, state: CommitState, config: RunnableConfig):
+        """
+        Summarizes each group of files concurrently when the diff does not fit in a
+        single prompt. A single group is passed on as is.
+        """
+        if len(state["diff_groups"]) <= 1:
+            state["diff_summaries"] = []
+            return state
+
+        from ..utils.llm import llm_base as llm
+
+        summary_prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    "You are a developer assistant summarizing code changes for a commit message.",
+                ),
+                (
+                    "user",
+                    "Summarize the following part of a Git diff in a few bullet points, one per file, "
+                    "stating what changed and why if it can be inferred:\n---\n{git_diff}\n---",
+                ),
+            ]
+        )
+        chain = summary_prompt | llm | StrOutputParser()
+        state["diff_summaries"] = chain.batch(
+            [{"git_diff": group} for group in state["diff_groups"]],
+            {
+                "max_concurrency": config["configurable"].get(
+                    "commit_summary_workers", DIFF_SUMMARY_WORKERS
+                )
+            },
         )
-        state["git_diff"] = git_diff_output["stdout"]
         return state
 
     def generate_commit_details(self, state: CommitState):
-        """Uses LangChain LLM to generate commit details from diff."""
-        git_diff = state["git_diff"]
+        """Uses LangChain LLM to generate commit details from the diff or its summaries."""
+        if state["diff_summaries"]:
+            changes = (
+                "Summaries of the staged changes, by group of files:\n"
+                + "\n".join(state["diff_summaries"])
+            )
+        else:
+            changes = "Git diff:\n" + "".join(state["diff_groups"])
+        if state["skipped_files"]:
+            changes += "\nOther changed files, not shown:\n" + "\n".join(
+                state["skipped_files"]
+            )
+
+        # Set up the LLM and prompt, the client is only imported when a diff is analyzed
+        from ..utils.llm import llm_base as llm
 
-        # Set up the LLM and prompt
-        llm = llm_base
         commit_prompt = ChatPromptTemplate.from_messages(
             [
                 (
@@ -51,23 +114,23 @@ class CommitAssistantGraph(StateGraph):
                 ),
                 (
                     "user",
-                    "Please generate a conventional commit message based on the following Git diff:\n---\n{git_diff}\n---\n"
+                    "Please generate a conventional commit message based on the following changes:\n---\n{changes}\n---\n"
                     "Just provide the commit command starting with git commit or nothing if you have nothing to commit. ",
                 ),
             ]
         )
 
         chain = commit_prompt | llm
-        state["commit_command"] = chain.invoke({"git_diff": git_diff}).content
+        state["commit_command"] = chain.invoke({"changes": changes}).content
         # Remove ```bahsh\n from the start of the command if it exists
         state["commit_command"] = state["commit_command"].replace("```bash\n", "")
         # Remove ``` from the end of the command if it exists
         state["commit_command"] = state["commit_command"].replace("```", "")
         return state
 
-    def execute_git_commit(self, state: CommitState):
+    def execute_git_commit(self, state: CommitState, config: RunnableConfig):
         output = execute_command_at_repo_root.invoke(
-            {"command": state["commit_command"]}
+            {"command": state["commit_command"]}, config
         )
         print(f"stderr: {output['stderr']}")
         return state
@@ -1,10 +1,10 @@
+from functools import cached_property
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import MessagesState, StateGraph, START, END
 from langgraph.types import Command
 from langchain_core.runnables import RunnableConfig
 from langgraph.prebuilt import ToolNode
 from ..tools import call_worker, execute_command_at_repo_root
-from ..utils.llm import llm_base
 
 
 class DispatcherState(MessagesState):
@@ -16,12 +16,12 @@ class DispatcherGraph(StateGraph):
         [
             (
                 "You are a supervisor agent tasked with managing a conversation the following workers agent:\n"
-                "ALWAYS call one worker at a time.\n"
+                "Call several workers in the same turn only when their tasks are independent, they then run concurrently.\n"
                 "repo_collector: Can collect information from the current repository.\n"
                 "repo_worker: Can operate in the current repository.\n"
                 "deeper_think_worker: Can provide deeper insights on the conversation.\n"
                 "specialist: Can provide help on {specialist}.\n"
-                "Proceed step by step, ensuring that the workers are called in the correct order.\n"
+                "When a task depends on the result of another worker, proceed step by step, ensuring that the workers are called in the correct order.\n"
                 "To call a worker, use the call_worker tool.\n"
                 "Each worker will perform a task and respond with their results and status."
                 "You are responsible for anticipating the workers needs and routing the conversation accordingly.\n"
@@ -32,7 +32,12 @@ class DispatcherGraph(StateGraph):
         ]
     )
 
-    llm_with_tools = llm_base.bind_tools([call_worker, execute_command_at_repo_root])
+    @cached_property
+    def llm_with_tools(self):
+        # Bound on first use, so the CLI starts without importing the OpenAI client
+        from ..utils.llm import llm_base
+
+        return llm_base.bind_tools([call_worker, execute_command_at_repo_root])
 
     def __init__(self):
         super().__init__(DispatcherState)
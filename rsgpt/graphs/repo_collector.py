@@ -3,12 +3,15 @@ from .graphs_common import WorkerState
 from langgraph.prebuilt import ToolNode
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
-from ..utils.repository_loader import (
-    load_repository as shared_load_repository,
-)  # New Import
+from ..utils.index_watcher import sync_repository
+from ..utils.indexing_pipeline import EMBEDDING_BATCH_SIZE
 from ..tools import (
     search_repo_content,
     search_repo_by_path,
+    search_repo_by_path_range,
+    find_symbol,
+    find_references,
+    import_graph,
     generate_repo_tree,
     execute_command_at_repo_root,
     run_python_test_script,
@@ -24,6 +27,10 @@ class RepoCollector(StateGraph):
             tools=[
                 search_repo_content,
                 search_repo_by_path,
+                search_repo_by_path_range,
+                find_symbol,
+                find_references,
+                import_graph,
                 generate_repo_tree,
                 execute_command_at_repo_root,
                 run_python_test_script,
@@ -46,7 +53,7 @@ class RepoCollector(StateGraph):
                 "system",
                 " You are a helpful AI that collects repository elements necessary for tasks."
                 " Your operations are strictly read-only and aimed at collecting information that would allow another agent to perform tasks."
-                " You can use generate_repo_tree if you are looking for a file. "
+                " You can use generate_repo_tree if you are looking for a file, find_symbol to locate or read a Python function or class by name, and find_references and import_graph to navigate Python code without searching. "
                 " Ensure detailed and well-structured data collection without modifying any content.",
             ),
             ("placeholder", "{messages}"),
@@ -57,6 +64,10 @@ class RepoCollector(StateGraph):
         [
             search_repo_content,
             search_repo_by_path,
+            search_repo_by_path_range,
+            find_symbol,
+            find_references,
+            import_graph,
             generate_repo_tree,
             execute_command_at_repo_root,
             run_python_test_script,
@@ -64,7 +75,13 @@ class RepoCollector(StateGraph):
     )
 
     def load_repository(self, _: WorkerState, config: RunnableConfig) -> dict:
-        return shared_load_repository(config["configurable"]["repo_path"])
+        return sync_repository(
+            config["configurable"]["repo_path"],
+            embedding_batch_size=config["configurable"].get(
+                "embedding_batch_size", EMBEDDING_BATCH_SIZE
+            ),
+            indexing_workers=config["configurable"].get("indexing_workers", 1),
+        )
 
     def agent(self, state: WorkerState) -> dict:
         bound = self.prompt | self.model_with_tools
@@ -2,9 +2,8 @@ from langgraph.graph import StateGraph, START, END
 from .graphs_common import WorkerState
 import rsgpt.utils.ast_editor as ast_editor  # Import the AST Editor
 from langgraph.prebuilt import ToolNode
-from ..utils.repository_loader import (
-    load_repository as shared_load_repository,
-)  # New Import
+from ..utils.index_watcher import sync_repository
+from ..utils.indexing_pipeline import EMBEDDING_BATCH_SIZE
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
 from ..tools import (
@@ -12,6 +11,10 @@ from ..tools import (
     write_file,
     modify_file_chunk,
     search_repo_by_path,
+    search_repo_by_path_range,
+    find_symbol,
+    find_references,
+    import_graph,
     generate_repo_tree,
     execute_command_at_repo_root,
     run_python_test_script,
@@ -28,6 +31,10 @@ class RepoWorker(StateGraph):
             tools=[
                 search_repo_content,
                 search_repo_by_path,
+                search_repo_by_path_range,
+                find_symbol,
+                find_references,
+                import_graph,
                 generate_repo_tree,
                 write_file,
                 modify_file_chunk,
@@ -35,6 +42,7 @@ class RepoWorker(StateGraph):
                 run_python_test_script,
                 ast_editor.rename_functions,  # Adding rename function tool
                 ast_editor.replace_function_body,  # Adding replace body tool
+                ast_editor.edit_python_functions,
             ]
         )
         self.add_node("tools", tool_node)
@@ -65,6 +73,10 @@ class RepoWorker(StateGraph):
         [
             search_repo_content,
             search_repo_by_path,
+            search_repo_by_path_range,
+            find_symbol,
+            find_references,
+            import_graph,
             generate_repo_tree,
             write_file,
             modify_file_chunk,
@@ -72,11 +84,18 @@ class RepoWorker(StateGraph):
             run_python_test_script,
             ast_editor.rename_functions,  # Include AST-based rename functions
             ast_editor.replace_function_body,  # Include function body replacement
+            ast_editor.edit_python_functions,
         ]
     )
 
     def load_repository(self, _: WorkerState, config: RunnableConfig) -> dict:
-        return shared_load_repository(config["configurable"]["repo_path"])
+        return sync_repository(
+            config["configurable"]["repo_path"],
+            embedding_batch_size=config["configurable"].get(
+                "embedding_batch_size", EMBEDDING_BATCH_SIZE
+            ),
+            indexing_workers=config["configurable"].get("indexing_workers", 1),
+        )
 
     def agent(self, state: WorkerState) -> dict:
         bound = self.prompt | self.model_with_tools
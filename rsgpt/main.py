@@ -1,8 +1,18 @@
-from .graphs.dispatcher import DispatcherGraph
-from .graphs.commit_assistant import CommitAssistantGraph
 from langgraph.graph import MessagesState
 from .utils.git import get_repo_root
+from .utils.background_logging import (
+    LOG_BACKUP_COUNT,
+    LOG_MAX_BYTES,
+    LOG_MESSAGE_CHARS,
+    REDACTED_PATTERNS,
+    setup_logging,
+)
+from .utils.llm import configure_llm_cache, llm_cache_stats
+from .utils.stores import configure_embedding_cache, embedding_cache_stats
+from .utils.streaming import astream_graph
+from .utils.tracing import TracingCallbackHandler, start_tracing, stop_tracing
 import argparse
+import asyncio
 import yaml
 import os
 
@@ -15,6 +25,34 @@ def load_config():
         "specialist_subject": "general",
         "repo_path": repo_root,
         "recursion_limit": 100,
+        "embedding_batch_size": 64,
+        "indexing_workers": 1,
+        "background_indexing": False,
+        "embedding_cache_path": os.path.join(
+            repo_root, ".rsgpt/embedding_cache.sqlite3"
+        ),
+        "embedding_cache_max_entries": 50000,
+        "llm_cache": False,
+        "llm_cache_path": os.path.join(repo_root, ".rsgpt/llm_cache.sqlite3"),
+        "llm_cache_ttl_s": 7 * 24 * 3600,
+        "llm_cache_max_entries": 5000,
+        "command_timeout": 300,
+        "command_output_limit": 20000,
+        "command_memory_limit_mb": None,
+        "command_cpu_limit_s": None,
+        "max_concurrent_workers": 4,
+        "context_token_budget": 12000,
+        "context_recent_messages": 6,
+        "worker_context_token_budgets": {},
+        "commit_diff_group_chars": 12000,
+        "commit_max_diff_groups": 16,
+        "commit_summary_workers": 4,
+        "tracing": True,
+        "log_max_bytes": LOG_MAX_BYTES,
+        "log_backup_count": LOG_BACKUP_COUNT,
+        "log_compress": False,
+        "log_message_chars": LOG_MESSAGE_CHARS,
+        "log_redacted_patterns": list(REDACTED_PATTERNS),
     }
     if os.path.exists(config_path):
         try:
@@ -27,6 +65,15 @@ def load_config():
     return default_config
 
 
+def run_dispatcher(graph, messages, config, stream: bool):
+    """Run the dispatcher, streaming its progress unless disabled."""
+    if stream:
+        return asyncio.run(astream_graph(graph, messages, config))
+    messages = asyncio.run(graph.ainvoke(messages, config))
+    messages["messages"][-1].pretty_print()
+    return messages
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Run RSgpt with optional file input or commit mode."
@@ -37,10 +84,70 @@ def main():
     parser.add_argument(
         "--file", type=str, help="Provide the initial input through a file."
     )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Only print the final answer instead of streaming tokens and tool calls.",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Call the models even when the response cache is enabled in the config.",
+    )
     args = parser.parse_args()
 
     config = load_config()
-    graph = DispatcherGraph().compile()
+    log_directory = os.path.join(config["repo_path"], ".rsgpt/log")
+    setup_logging(
+        log_directory,
+        max_bytes=config["log_max_bytes"],
+        backup_count=config["log_backup_count"],
+        compress=config["log_compress"],
+        max_message_chars=config["log_message_chars"],
+        redacted_patterns=config["log_redacted_patterns"],
+    )
+    if config["tracing"]:
+        config["callbacks"] = [TracingCallbackHandler(start_tracing(log_directory))]
+    configure_embedding_cache(
+        config["embedding_cache_path"], config["embedding_cache_max_entries"]
+    )
+    if config["llm_cache"] and not args.no_llm_cache:
+        configure_llm_cache(
+            config["llm_cache_path"],
+            ttl_s=config["llm_cache_ttl_s"],
+            max_entries=config["llm_cache_max_entries"],
+        )
+    if config["background_indexing"] and not args.commit:
+        from .utils.index_watcher import start_repository_watcher
+
+        start_repository_watcher(
+            config["repo_path"],
+            embedding_batch_size=config["embedding_batch_size"],
+            indexing_workers=config["indexing_workers"],
+        )
+    try:
+        run_session(args, config)
+    except (KeyboardInterrupt, EOFError):
+        print()
+    finally:
+        cache_stats = {
+            "LLM cache": llm_cache_stats(),
+            "Embedding cache": embedding_cache_stats(),
+        }
+        summary = stop_tracing(
+            {cache: stats for cache, stats in cache_stats.items() if stats}
+        )
+        if summary:
+            print(summary)
+
+
+def run_session(args, config):
+    """Run the commit assistant or the dispatcher conversation until it ends."""
+    # Graphs are imported on demand, the commit mode does not need the dispatcher
+    if args.file or not args.commit:
+        from .graphs.dispatcher import DispatcherGraph
+
+        graph = DispatcherGraph().compile()
     messages = MessagesState()
 
     if args.file:
@@ -48,12 +155,13 @@ def main():
             with open(args.file, "r") as file:
                 initial_input = file.read()
             messages["messages"] = [("user", initial_input)]
-            messages = graph.invoke(messages, config)
-            messages["messages"][-1].pretty_print()
+            messages = run_dispatcher(graph, messages, config, not args.no_stream)
         except FileNotFoundError:
             print(f"Error: File '{args.file}' not found.")
 
     if args.commit:
+        from .graphs.commit_assistant import CommitAssistantGraph
+
         graph = CommitAssistantGraph().compile()
         messages["messages"] = []
         messages = graph.invoke(messages, config)
@@ -63,8 +171,7 @@ def main():
         while True:
             user_input = input("User: ")
             messages["messages"].append(("user", user_input))
-            messages = graph.invoke(messages, config)
-            messages["messages"][-1].pretty_print()
+            messages = run_dispatcher(graph, messages, config, not args.no_stream)
 
 
 if __name__ == "__main__":
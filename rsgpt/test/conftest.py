@@ -0,0 +1,28 @@
+import pytest
+from git import Repo
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from rsgpt.utils.repository_loader import load_repository
+from rsgpt.utils.stores import set_embeddings
+
+
+@pytest.fixture
+def indexed_repo(tmp_path):
+    """
+    Return a function creating a git repository in tmp_path with the given files, indexed
+    with a local stand-in for the embedding model, and returning the config of the tools.
+    """
+
+    def create(
+        files: dict[str, str], embeddings: Embeddings | None = None, index: bool = True
+    ) -> dict:
+        Repo.init(tmp_path)
+        for file_path, content in files.items():
+            (tmp_path / file_path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / file_path).write_text(content)
+        set_embeddings(embeddings or DeterministicFakeEmbedding(size=16))
+        if index:
+            load_repository(str(tmp_path))
+        return {"configurable": {"repo_path": str(tmp_path)}}
+
+    yield create
+    set_embeddings(None)
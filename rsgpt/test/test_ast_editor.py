@@ -0,0 +1,165 @@
+from rsgpt.utils.ast_editor import (
+    ASTEditError,
+    ASTEditor,
+    edit_functions,
+    edit_python_functions,
+)
+from rsgpt.utils import ast_editor
+from rsgpt.utils.repo_index import RepoIndex
+from rsgpt.utils.stores import get_repo_lock
+import pytest
+import threading
+
+SOURCE = '''"""Module docstring."""
+import os  # needed below
+
+
+@decorator
+def helper(a, b):  # keep this comment
+    # Add the values
+    return a + b
+
+
+class Greeter:
+    """Say hello."""
+
+    def greet(self, name):
+        return f"Hello {name}"
+
+    async def wait(self): return None
+
+
+def main():
+    return helper(1,   2)  # call it
+'''
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    path = tmp_path / "module.py"
+    path.write_text(SOURCE)
+    return str(path)
+
+
+def test_edits_preserve_the_rest_of_the_file(file_path):
+    assert edit_functions(
+        file_path,
+        name_map={"helper": "add", "Greeter.greet": "welcome"},
+        new_bodies={"main": "value = helper(1, 2)\nreturn value"},
+    )
+    with open(file_path) as f:
+        edited = f.read()
+    expected = (
+        SOURCE.replace("def helper(", "def add(")
+        .replace("def greet(self", "def welcome(self")
+        .replace(
+            "    return helper(1,   2)  # call it\n",
+            "    value = helper(1, 2)\n    return value\n",
+        )
+    )
+    assert edited == expected
+
+
+def test_one_line_bodies_are_moved_to_their_own_lines(file_path):
+    with ASTEditor(file_path) as editor:
+        (wait,) = editor.find_functions("Greeter.wait")
+        editor.replace_body(wait, "await sleep()\nreturn True")
+    with open(file_path) as f:
+        assert (
+            "    async def wait(self):\n        await sleep()\n        return True\n"
+            in f.read()
+        )
+
+
+def test_replaced_bodies_drop_their_comments(file_path):
+    edit_functions(file_path, new_bodies={"helper": "return a - b"})
+    with open(file_path) as f:
+        assert f.read() == SOURCE.replace(
+            "    # Add the values\n    return a + b\n", "    return a - b\n"
+        )
+
+
+def test_nested_functions_are_found(tmp_path):
+    path = tmp_path / "nested.py"
+    path.write_text(
+        "def outer():\n    if True:\n        def inner():\n            return 1\n"
+        "    return inner\n"
+    )
+    assert edit_functions(str(path), name_map={"inner": "first"}) == 1
+    assert edit_functions(str(path), new_bodies={"outer.first": "return 2"}) == 1
+    assert path.read_text() == (
+        "def outer():\n    if True:\n        def first():\n            return 2\n"
+        "    return inner\n"
+    )
+
+
+def test_failed_edits_leave_the_file_untouched(file_path):
+    with pytest.raises(ASTEditError):
+        edit_functions(file_path, {"helper": "add", "missing": "other"})
+    with pytest.raises(ASTEditError):
+        edit_functions(file_path, new_bodies={"helper": "return (a"})
+    with pytest.raises(ASTEditError):
+        edit_functions(file_path, {"helper": "1add"})
+    editor = ASTEditor(file_path)
+    (helper,) = editor.find_functions("helper")
+    editor.replace_body(helper, "return a")
+    with pytest.raises(ASTEditError):
+        editor.replace_body(helper, "return b")
+    with open(file_path) as f:
+        assert f.read() == SOURCE
+
+
+def test_edit_tool_reindexes_the_file(indexed_repo):
+    config = indexed_repo({"module.py": SOURCE})
+    result = edit_python_functions.invoke(
+        {"file_path": "module.py", "name_map": {"helper": "add"}}, config
+    )
+    assert result == "1 functions edited successfully in module.py."
+    repo_index = RepoIndex(config["configurable"]["repo_path"])
+    assert [
+        (path, symbol.qualified_name) for path, symbol in repo_index.find_symbols("add")
+    ] == [("module.py", "add")]
+    repo_index.close()
+    result = edit_python_functions.invoke(
+        {"file_path": "module.py", "new_bodies": {"missing": "pass"}}, config
+    )
+    assert result.startswith("Error editing module.py, no change was made")
+
+
+def test_edit_tool_rejects_paths_outside_of_the_repository(indexed_repo, tmp_path):
+    config = indexed_repo({"module.py": SOURCE})
+    outside = tmp_path.parent / "outside.py"
+    outside.write_text(SOURCE)
+    for file_path in ("../outside.py", str(outside)):
+        result = edit_python_functions.invoke(
+            {"file_path": file_path, "name_map": {"helper": "add"}}, config
+        )
+        assert result.startswith(f"Error editing {file_path}, no change was made")
+    assert outside.read_text() == SOURCE
+
+
+def test_edit_tool_holds_the_repository_lock(indexed_repo, monkeypatch):
+    config = indexed_repo({"module.py": SOURCE})
+    repo_path = config["configurable"]["repo_path"]
+    lock_states = []
+    edit_functions = ast_editor.edit_functions
+
+    def recording_edit_functions(*args):
+        # Another thread, such as a watcher refresh, cannot index the file meanwhile
+        def try_lock():
+            acquired = get_repo_lock(repo_path).acquire(blocking=False)
+            lock_states.append(acquired)
+            if acquired:
+                get_repo_lock(repo_path).release()
+
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        return edit_functions(*args)
+
+    monkeypatch.setattr(ast_editor, "edit_functions", recording_edit_functions)
+    result = edit_python_functions.invoke(
+        {"file_path": "module.py", "name_map": {"helper": "add"}}, config
+    )
+    assert result == "1 functions edited successfully in module.py."
+    assert lock_states == [False]
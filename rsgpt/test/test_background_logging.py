@@ -0,0 +1,46 @@
+import gzip
+import logging
+import os
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from rsgpt.utils.background_logging import setup_logging, stop_logging
+from rsgpt.utils.llm import input_display_callback, output_display_callback
+
+
+def read_log(log_path) -> str:
+    with open(log_path) as f:
+        return f.read()
+
+
+def test_model_calls_are_logged_redacted_and_truncated(tmp_path):
+    log_path = setup_logging(str(tmp_path), max_message_chars=200)
+    llm = FakeListChatModel(
+        responses=["done"],
+        callbacks=[input_display_callback, output_display_callback],
+    )
+    llm.invoke("key sk-abcdefghijklmnopqrstuvwxyz " + "x" * 1000 + " end of prompt")
+    stop_logging()
+
+    log = read_log(log_path)
+    assert "--- INPUT SENT TO LLM ---" in log
+    assert "--- OUTPUT FROM LLM ---" in log
+    assert "done" in log
+    assert "[REDACTED]" in log and "sk-abcdefghijklmnopqrstuvwxyz" not in log
+    assert "characters elided ..." in log
+    assert "end of prompt" in log
+
+
+def test_log_file_is_rotated_and_compressed(tmp_path):
+    log_path = setup_logging(
+        str(tmp_path), max_bytes=1000, backup_count=2, compress=True
+    )
+    for index in range(100):
+        logging.getLogger("rsgpt.test").info("record %d %s", index, "y" * 50)
+    stop_logging()
+
+    file_name = os.path.basename(log_path)
+    assert file_name.endswith(f"_{os.getpid()}.log")
+    files = sorted(os.listdir(tmp_path))
+    assert files == [file_name, file_name + ".1.gz", file_name + ".2.gz"]
+    with gzip.open(log_path + ".1.gz", "rt") as f:
+        assert "record" in f.read()
+    assert "record 99" in read_log(log_path)
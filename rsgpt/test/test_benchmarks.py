@@ -0,0 +1,40 @@
+import json
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rsgpt.benchmarks.__main__ import run_benchmarks
+from rsgpt.utils.stores import (
+    configure_embedding_cache,
+    get_embedding_settings,
+    set_embeddings,
+)
+
+
+def test_benchmarks_run_on_a_small_synthetic_repository(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    set_embeddings(embeddings)
+    configure_embedding_cache(str(tmp_path / "cache.sqlite3"), 100)
+    report = run_benchmarks(
+        files=8,
+        lines_per_file=50,
+        queries=2,
+        large_file_size=20000,
+        edits=2,
+        memory_sizes=(10,),
+    )
+    results = report["results"]
+    assert results["indexing"]["files"] == 8
+    assert results["indexing"]["chunks"] > 0
+    assert set(results["search"]) == {"identifier", "natural_language", "by_path"}
+    assert results["chunk_edit"]["count"] == 2
+    assert results["recall_memory"][0]["memories"] == 10
+    # The report is meant to be stored and compared across runs
+    assert json.loads(json.dumps(report)) == report
+    # The embedding settings of the caller are left as they were
+    try:
+        assert get_embedding_settings() == (
+            embeddings,
+            str(tmp_path / "cache.sqlite3"),
+            100,
+        )
+    finally:
+        configure_embedding_cache(None)
+        set_embeddings(None)
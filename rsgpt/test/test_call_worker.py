@@ -0,0 +1,68 @@
+import asyncio
+import time
+from langchain_core.messages import AIMessage
+from langgraph.graph import MessagesState, StateGraph, START, END
+from langgraph.prebuilt import ToolNode
+import rsgpt.tools as tools
+
+
+class SlowWorker:
+    """Stand-in for a worker graph answering after a fixed delay."""
+
+    async def ainvoke(self, worker_input, config):
+        await asyncio.sleep(0.5)
+        return {"final_messages": [worker_input["messages"][-1][1]]}
+
+
+def test_independent_workers_run_concurrently_in_order(monkeypatch):
+    monkeypatch.setattr(
+        tools,
+        "_get_worker",
+        lambda worker, messages, fake_user_message: (
+            SlowWorker(),
+            {"messages": messages + [("user", fake_user_message)]},
+        ),
+    )
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", ToolNode([tools.call_worker]))
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    tool_calls = [
+        {
+            "name": "call_worker",
+            "args": {"worker": "repo_collector", "fake_user_message": f"task {index}"},
+            "id": f"call_{index}",
+        }
+        for index in range(4)
+    ]
+
+    start = time.monotonic()
+    result = asyncio.run(
+        graph.compile().ainvoke(
+            {"messages": [AIMessage(content="", tool_calls=tool_calls)]},
+            {"max_concurrent_workers": 2},
+        )
+    )
+    # Four workers of 0.5s with two slots take two rounds
+    assert 0.9 < time.monotonic() - start < 1.9
+    assert [message.content for message in result["messages"][1:]] == [
+        f'["task {index}"]' for index in range(4)
+    ]
+
+
+def test_worker_calls_run_without_the_cli_config(monkeypatch):
+    monkeypatch.setattr(
+        tools,
+        "_get_worker",
+        lambda worker, messages, fake_user_message: (
+            SlowWorker(),
+            {"messages": [("user", fake_user_message)]},
+        ),
+    )
+    result = asyncio.run(
+        tools.call_worker.ainvoke(
+            {"worker": "repo_collector", "fake_user_message": "task", "messages": []},
+            {"configurable": {}},
+        )
+    )
+    assert result == ["task"]
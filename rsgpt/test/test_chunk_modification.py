@@ -1,46 +1,113 @@
-from rsgpt.tools import modify_file_chunk
-from rsgpt.utils.git import get_repo_root
-from rsgpt.utils.repository_loader import load_repository
-import shutil
+from rsgpt.tools import delete_file_chunk, modify_file_chunk
+from rsgpt.utils import chunk_editor
+from rsgpt.utils.repo_index import RepoIndex
+from rsgpt.utils.stores import get_repo_lock
+import pytest
 import os
+import threading
 
+TEST_FILE = os.path.join(os.path.dirname(__file__), "long_test_file.txt")
 
-def test_modify_multiple_chunks():
-    load_repository(get_repo_root())
 
-    # The path to the test file and its backup
-    file_path = "rsgpt/test/long_test_file.txt"
-    backup_path = "rsgpt/test/long_test_file_backup.txt"
+@pytest.fixture
+def repo_path(indexed_repo):
+    with open(TEST_FILE) as f:
+        config = indexed_repo({"long_test_file.txt": f.read()})
+    return config["configurable"]["repo_path"]
 
-    # Create a backup of the file
-    shutil.copy(file_path, backup_path)
 
-    # Define the chunks to modify (e.g., chunks 5 to 7)
-    start_chunk = 5
-    end_chunk = 7
+def chunk_ranges(repo_path):
+    repo_index = RepoIndex(repo_path)
+    chunks = repo_index.get_chunks("long_test_file.txt", 0, 1000)
+    repo_index.close()
+    return [(chunk.start_index, chunk.start_index + chunk.length) for chunk in chunks]
+
+
+def test_modify_multiple_chunks(repo_path):
+    file_path = os.path.join(repo_path, "long_test_file.txt")
+    with open(file_path) as f:
+        original = f.read()
+    ranges = chunk_ranges(repo_path)
+    config = {"configurable": {"repo_path": repo_path}}
 
-    # Generate new content for these chunks
+    # Define the chunks to modify (e.g., chunks 5 to 7)
     new_content = "This is the modified content for chunks 5 through 7."
+    result = modify_file_chunk.invoke(
+        {
+            "file_path": "long_test_file.txt",
+            "chunks": [5, 6, 7],
+            "new_content": new_content,
+        },
+        config,
+    )
+    assert result == "File chunks modified successfully"
+
+    with open(file_path) as f:
+        modified = f.read()
+    start, end = ranges[5][0], ranges[7][1]
+    assert modified == original[:start] + new_content + original[end:]
+    # Lines of chunk 5 also appear in other chunks, which must be left untouched
+    assert original[start:end].splitlines()[0] in modified
+
+    # The file was re-indexed, so its new chunks can be edited right away
+    start, end = chunk_ranges(repo_path)[2]
+    result = delete_file_chunk.invoke(
+        {"file_path": "long_test_file.txt", "chunk_number": 2}, config
+    )
+    assert result == "File chunk deleted successfully"
+    with open(file_path) as f:
+        assert f.read() == modified[:start] + modified[end:]
+
+
+def test_modify_chunks_of_a_file_changed_since_indexing(repo_path):
+    with open(os.path.join(repo_path, "long_test_file.txt"), "a") as f:
+        f.write("Appended outside of the chunk tools.\n")
+    config = {"configurable": {"repo_path": repo_path}}
+    result = modify_file_chunk.invoke(
+        {"file_path": "long_test_file.txt", "chunks": [0], "new_content": ""},
+        config,
+    )
+    assert result.startswith(
+        "Error modifying chunks: File changed since it was indexed"
+    )
+
+    result = modify_file_chunk.invoke(
+        {"file_path": "long_test_file.txt", "chunks": [0], "new_content": ""},
+        config,
+    )
+    assert result == "File chunks modified successfully"
+
+
+def test_modify_chunks_out_of_range(repo_path):
+    config = {"configurable": {"repo_path": repo_path}}
+    result = modify_file_chunk.invoke(
+        {"file_path": "long_test_file.txt", "chunks": [1000], "new_content": ""},
+        config,
+    )
+    assert result.startswith("Error modifying chunks: End of chunk range")
 
-    try:
-        # Execute modify_file_chunk for the range
-        modify_file_chunk.invoke(
-            {
-                "file_path": file_path,
-                "chunk_range": {"start_chunk": start_chunk, "stop_chunk": end_chunk},
-                "new_content": new_content,
-            }
-        )
 
-        # Print success message for manual verification
-        print("Test passed: Chunks modified successfully.")
+def test_modify_chunks_holds_the_repository_lock(repo_path, monkeypatch):
+    lock_states = []
+    git_blob_sha = chunk_editor.git_blob_sha
 
-    finally:
-        # Restore the file from backup
-        shutil.copy(backup_path, file_path)
-        # Delete backup file
-        os.remove(backup_path)
+    def recording_git_blob_sha(data):
+        # Another thread, such as a watcher refresh, cannot index the file meanwhile
+        def try_lock():
+            acquired = get_repo_lock(repo_path).acquire(blocking=False)
+            lock_states.append(acquired)
+            if acquired:
+                get_repo_lock(repo_path).release()
 
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        return git_blob_sha(data)
 
-if __name__ == "__main__":
-    test_modify_multiple_chunks()
+    monkeypatch.setattr(chunk_editor, "git_blob_sha", recording_git_blob_sha)
+    result = modify_file_chunk.invoke(
+        {"file_path": "long_test_file.txt", "chunks": [0], "new_content": "Start."},
+        {"configurable": {"repo_path": repo_path}},
+    )
+    assert result == "File chunks modified successfully"
+    assert lock_states == [False]
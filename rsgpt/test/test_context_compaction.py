@@ -0,0 +1,63 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from rsgpt.tools import _worker_history
+from rsgpt.utils.context_compaction import compact_history
+
+
+def worker_turn(index: int, output_size: int) -> list:
+    tool_call = {
+        "name": "call_worker",
+        "args": {"worker": "repo_collector", "fake_user_message": f"task {index}"},
+        "id": f"call_{index}",
+    }
+    return [
+        HumanMessage(content=f"Request {index}"),
+        AIMessage(content="", tool_calls=[tool_call]),
+        ToolMessage(content="x" * output_size, tool_call_id=f"call_{index}"),
+        AIMessage(content=f"Answer {index}"),
+    ]
+
+
+def test_short_histories_are_left_untouched():
+    history = worker_turn(0, 100)
+    assert compact_history(history, token_budget=1000) == history
+
+
+def test_older_tool_outputs_are_elided_first():
+    history = worker_turn(0, 8000) + worker_turn(1, 8000)
+    compacted = compact_history(history, token_budget=3000, recent_messages=4)
+    assert len(compacted) == len(history)
+    assert "[... 7000 characters of tool output elided ...]" in compacted[2].content
+    # The latest turn is kept verbatim
+    assert compacted[4:] == history[4:]
+
+
+def test_oldest_turns_are_summarized():
+    history = sum((worker_turn(index, 4000) for index in range(10)), [])
+    compacted = compact_history(history, token_budget=3000, recent_messages=4)
+    assert count_tokens_approximately(compacted) < 3000
+    assert compacted[0].content.startswith("Summary of the")
+    assert "- user: Request 0" in compacted[0].content
+    assert "- assistant called call_worker: {'worker': 'repo_collector'" in (
+        compacted[0].content
+    )
+    assert compacted[-4:] == history[-4:]
+    # Tool results stay after the assistant message calling them
+    for previous, message in zip(compacted, compacted[1:]):
+        if isinstance(message, ToolMessage):
+            assert isinstance(previous, AIMessage) and previous.tool_calls
+
+
+def test_worker_history_uses_the_budget_of_the_worker():
+    messages = [("system", "Dispatcher prompt")]
+    messages += sum((worker_turn(index, 4000) for index in range(10)), [])
+    messages.append(AIMessage(content="", tool_calls=[]))
+    config = {
+        "configurable": {
+            "context_token_budget": 100000,
+            "worker_context_token_budgets": {"repo_collector": 3000},
+        }
+    }
+    assert len(_worker_history("specialist", messages, config)) == 40
+    history = _worker_history("repo_collector", messages, config)
+    assert count_tokens_approximately(history) < 3000
@@ -0,0 +1,91 @@
+from rsgpt.utils.diff_pipeline import FileDiff, group_diffs, prepare_diff, split_diff
+
+
+def file_diff(path: str, lines: list[str], hunks: int = 1) -> str:
+    text = f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+    for hunk in range(hunks):
+        text += f"@@ -{hunk * 10},1 +{hunk * 10},1 @@\n"
+        text += "".join(line + "\n" for line in lines)
+    return text
+
+
+def test_split_diff_counts_changes_per_file():
+    diff = file_diff("src/a.py", ["-old", "+new", "+added"]) + (
+        "diff --git a/logo.png b/logo.png\nnew file mode 100644\n"
+        "Binary files /dev/null and b/logo.png differ\n"
+    )
+    file_diffs = split_diff(diff)
+
+    assert [(f.path, f.additions, f.deletions, f.binary) for f in file_diffs] == [
+        ("src/a.py", 2, 1, False),
+        ("logo.png", 0, 0, True),
+    ]
+
+
+def test_prepare_diff_leaves_out_lockfiles_generated_and_binary_files():
+    diff = (
+        file_diff("src/a.py", ["+def a():", "+    pass"])
+        + file_diff("poetry.lock", ["+lots of hashes"])
+        + file_diff("web/vendor/lib.js", ["+vendored"])
+        + file_diff("api_pb2.py", ["+generated"])
+        + file_diff("schema.py", ["+# @generated by a tool", "+X = 1"])
+        + "diff --git a/logo.png b/logo.png\nBinary files a/logo.png and b/logo.png differ\n"
+    )
+    groups, skipped = prepare_diff(diff)
+
+    assert len(groups) == 1
+    assert [f.path for f in split_diff(groups[0])] == ["src/a.py"]
+    assert skipped == [
+        "poetry.lock (+1 -0)",
+        "web/vendor/lib.js (+1 -0)",
+        "api_pb2.py (+1 -0)",
+        "schema.py (+2 -0)",
+        "logo.png (binary)",
+    ]
+
+
+def test_large_diffs_are_grouped_split_at_hunks_and_capped():
+    lines = ["+" + "x" * 80] * 10
+    file_diffs = split_diff(
+        "".join(file_diff(f"pkg/module_{i}.py", lines) for i in range(10))
+        + file_diff("pkg/large.py", lines, hunks=6)
+    )
+    groups = group_diffs(file_diffs, max_chars=2000)
+
+    assert all(len(group) <= 2000 for group in groups)
+    # The large file is split in parts which each keep the file header
+    large_parts = [g for g in groups if "pkg/large.py" in g]
+    assert len(large_parts) >= 3
+    assert sum(g.count("@@ -") for g in large_parts) == 6
+
+    kept, listed = prepare_diff(
+        "".join(f.text for f in file_diffs), max_chars=2000, max_groups=2
+    )
+    assert len(kept) == 2
+    kept_paths = {f.path for group in kept for f in split_diff(group)}
+    listed_paths = {entry.split(" ")[0] for entry in listed}
+    assert kept_paths | listed_paths == {f.path for f in file_diffs}
+    # Only the first parts of the large file are kept, the rest is reported
+    assert kept_paths == {"pkg/large.py"}
+    assert listed[-1].startswith("pkg/large.py (+60 -0), truncated:")
+
+
+def test_files_split_across_dropped_groups_are_listed_as_truncated():
+    lines = ["+" + "x" * 80] * 10
+    diff = file_diff("large.py", lines, hunks=6)
+    kept, listed = prepare_diff(diff, max_chars=2000, max_groups=1)
+    assert len(kept) == 1
+    total = len(prepare_diff(diff, max_chars=2000)[0])
+    assert listed == [
+        f"large.py (+60 -0), truncated: {total - 1} of {total} parts not shown"
+    ]
+
+
+def test_long_headers_leave_room_for_the_hunks():
+    header = "diff --git a/long.py b/long.py\n" + "".join(
+        f"similarity index {index}%\n" for index in range(100)
+    )
+    text = header + "@@ -0,1 +0,1 @@\n" + "+changed line\n" * 20
+    parts = group_diffs([FileDiff("long.py", text, 20, 0, False)], max_chars=1000)
+    assert all(len(part) <= 1000 for part in parts)
+    assert all("+changed line" in part for part in parts)
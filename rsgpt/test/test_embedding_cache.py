@@ -0,0 +1,72 @@
+import sqlite3
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rsgpt.utils.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Local stand-in for the Ollama embedder counting the embedded texts."""
+
+    embedded_texts: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded_texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_cached_vectors_are_reused_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    embedding = CountingEmbedding(size=8)
+    cache = CachedEmbeddings(embedding, path, "fake")
+    vectors = cache.embed_documents(["a", "b", "a"])
+    assert embedding.embedded_texts == 2
+    assert cache.stats()["misses"] == 3
+
+    reopened = CachedEmbeddings(embedding, path, "fake")
+    assert reopened.embed_documents(["b", "a"]) == [vectors[1], vectors[0]]
+    assert reopened.embed_query("a") == vectors[0]
+    assert embedding.embedded_texts == 2
+    assert reopened.stats()["hits"] == 3
+
+
+def test_model_name_is_part_of_the_key(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    embedding = CountingEmbedding(size=8)
+    CachedEmbeddings(embedding, path, "model-a").embed_query("text")
+    CachedEmbeddings(embedding, path, "model-b").embed_query("text")
+    assert embedding.embedded_texts == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    embedding = CountingEmbedding(size=8)
+    cache = CachedEmbeddings(
+        embedding, str(tmp_path / "cache.sqlite3"), "fake", max_entries=10
+    )
+    cache.embed_documents([f"text {index}" for index in range(10)])
+    cache.embed_query("text 0")
+    cache.embed_query("text 10")
+    assert cache.stats()["entries"] <= 10
+
+    embedding.embedded_texts = 0
+    cache.embed_query("text 0")
+    cache.embed_query("text 10")
+    assert embedding.embedded_texts == 0
+    cache.embed_query("text 1")
+    assert embedding.embedded_texts == 1
+
+
+def test_cache_of_an_older_layout_is_emptied(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB, last_access)"
+        )
+        connection.execute("INSERT INTO embeddings VALUES ('key', x'00', 0)")
+    connection.close()
+    cache = CachedEmbeddings(CountingEmbedding(size=8), path, "fake")
+    assert cache.stats()["entries"] == 0
+    cache.embed_query("text")
+    assert CachedEmbeddings(CountingEmbedding(size=8), path, "fake").stats() == {
+        "hits": 0,
+        "misses": 0,
+        "entries": 1,
+    }
@@ -1,8 +1,10 @@
 import unittest
-from rsgpt.utils.git import get_repo_root
-from unittest.mock import patch
+from rsgpt.utils.git import get_repo_root, list_repository_files
 from setup_fake_git import setup_fake_git_directory
+from git import Repo
+import os
 import shutil
+import tempfile
 from pathlib import Path
 
 class TestGitUtils(unittest.TestCase):
@@ -14,11 +16,38 @@ class TestGitUtils(unittest.TestCase):
         # Clean up after each test
         shutil.rmtree(self.fake_git_dir)
 
-    @patch('subprocess.check_output')
-    def test_get_repo_root(self, mock_check_output):
-        # Mock subprocess to return the path of the fake git directory
-        mock_check_output.return_value = f'{self.fake_git_dir}\n'.encode('utf-8')
-        self.assertEqual(get_repo_root(), Path(self.fake_git_dir))
+    def test_get_repo_root(self):
+        # The root is found from any directory of the repository, without running git
+        sub_dir = os.path.join(self.fake_git_dir, 'src', 'package')
+        os.makedirs(sub_dir)
+        expected = Path(self.fake_git_dir).resolve()
+        self.assertEqual(get_repo_root(self.fake_git_dir), expected)
+        self.assertEqual(get_repo_root(sub_dir), expected)
+
+    def test_get_repo_root_outside_repository(self):
+        outside_dir = tempfile.mkdtemp()
+        try:
+            self.assertIsNone(get_repo_root(outside_dir))
+        finally:
+            shutil.rmtree(outside_dir)
+
+    def test_list_repository_files_does_not_stage(self):
+        repo_dir = tempfile.mkdtemp()
+        try:
+            repo = Repo.init(repo_dir)
+            for name in ('tracked.py', 'untracked.py', 'ignored.log', '.gitignore'):
+                with open(os.path.join(repo_dir, name), 'w') as f:
+                    f.write('*.log\n' if name == '.gitignore' else 'content\n')
+            repo.index.add(['tracked.py'])
+            repo.index.write()
+
+            files = list_repository_files(repo_dir)
+            self.assertEqual(sorted(files), ['.gitignore', 'tracked.py', 'untracked.py'])
+            self.assertEqual(
+                [path for path, _ in repo.index.entries], ['tracked.py']
+            )
+        finally:
+            shutil.rmtree(repo_dir)
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rsgpt.tools import search_repo_content
+from rsgpt.utils.hybrid_search import search_repository
+from rsgpt.utils.stores import get_embeddings
+
+
+class QueryCountingEmbedding(DeterministicFakeEmbedding):
+    query_count: int = 0
+
+    def embed_query(self, text):
+        self.query_count += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def repo_path(indexed_repo):
+    config = indexed_repo(
+        {
+            "src/loader.py": (
+                "def load_repository_index(path):\n    return open(path).read()\n"
+            ),
+            "src/parser.js": (
+                "function parseConfig(text) { return JSON.parse(text); }\n"
+            ),
+            "docs.md": "The repository index is loaded when the worker starts.\n",
+        },
+        embeddings=QueryCountingEmbedding(size=16),
+    )
+    return config["configurable"]["repo_path"]
+
+
+def test_identifier_queries_do_not_embed_the_query(repo_path):
+    documents = search_repository(repo_path, "load_repository_index")
+    assert [document.metadata["file_path"] for document in documents] == [
+        "src/loader.py"
+    ]
+    assert documents[0].metadata["language"] == "python"
+    assert get_embeddings().query_count == 0
+
+    # Unknown identifiers fall back to the vector store
+    assert search_repository(repo_path, "missing_identifier", k=1)
+    assert get_embeddings().query_count == 1
+
+
+def test_natural_language_queries_fuse_both_rankings(repo_path):
+    documents = search_repository(repo_path, "how is the repository index loaded", k=3)
+    paths = [document.metadata["file_path"] for document in documents]
+    assert len(paths) == 3
+    # Both lexical matches rank before the chunk only found by the vector store
+    assert set(paths[:2]) == {"src/loader.py", "docs.md"}
+
+
+def test_search_filters(repo_path):
+    documents = search_repository(
+        repo_path, "repository index", k=5, language="markdown"
+    )
+    assert [document.metadata["file_path"] for document in documents] == ["docs.md"]
+    documents = search_repository(repo_path, "text parse", k=5, path_prefix="src/")
+    assert {document.metadata["file_path"] for document in documents} == {
+        "src/loader.py",
+        "src/parser.js",
+    }
+
+    result = search_repo_content.invoke(
+        {"query": "parseConfig", "k": 1}, {"configurable": {"repo_path": repo_path}}
+    )
+    assert len(result) == 1
+    assert "src/parser.js" in result[0]
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+# Dependencies only needed once a repository is indexed, a model called or the web searched
+DEFERRED_MODULES = [
+    "chromadb",
+    "git",
+    "langchain_chroma",
+    "langchain_community",
+    "langchain_ollama",
+    "langchain_openai",
+    "openai",
+]
+# Seconds spent executing the package's own modules, dependencies excluded
+OWN_IMPORT_BUDGET = 0.5
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Return the self and cumulative import times in microseconds of every module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_time), int(cumulative))
+    return times
+
+
+def test_cli_startup_defers_heavy_dependencies():
+    times = import_times(
+        "rsgpt.main, rsgpt.graphs.dispatcher, rsgpt.graphs.commit_assistant"
+    )
+    imported = {name.split(".")[0] for name in times}
+    assert imported.isdisjoint(DEFERRED_MODULES)
+    own_time = sum(
+        self_time
+        for name, (self_time, _) in times.items()
+        if name.split(".")[0] == "rsgpt"
+    )
+    assert own_time < OWN_IMPORT_BUDGET * 1e6
@@ -0,0 +1,96 @@
+import os
+import time
+import pytest
+import rsgpt.utils.index_watcher as index_watcher
+from rsgpt.utils.repo_index import RepoIndex
+
+
+def wait_for(predicate, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.05)
+
+
+def indexed_files(repo_path):
+    repo_index = RepoIndex(repo_path)
+    try:
+        return set(repo_index.get_files())
+    finally:
+        repo_index.close()
+
+
+@pytest.fixture
+def repo_path(indexed_repo):
+    config = indexed_repo({"first.txt": "First file.\n"}, index=False)
+    yield config["configurable"]["repo_path"]
+    index_watcher.stop_repository_watchers()
+
+
+requires_watchfiles = pytest.mark.skipif(
+    index_watcher.watchfiles is None, reason="watchfiles is not installed"
+)
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("the repository was scanned")
+
+
+@requires_watchfiles
+def test_watcher_keeps_the_index_fresh(repo_path, monkeypatch):
+    watcher = index_watcher.start_repository_watcher(repo_path)
+    assert watcher.wait_until_fresh(20)
+    assert indexed_files(repo_path) == {"first.txt"}
+
+    # Changed files are re-indexed one by one rather than by a scan
+    monkeypatch.setattr(index_watcher, "load_repository", fail)
+    with open(f"{repo_path}/second.txt", "w") as f:
+        f.write("Second file.\n")
+    wait_for(lambda: "second.txt" in indexed_files(repo_path))
+    assert watcher.wait_until_fresh(20)
+
+    # Graph nodes no longer scan the repository while the watcher keeps it fresh
+    assert index_watcher.sync_repository(repo_path) == {}
+
+
+@requires_watchfiles
+def test_sync_repository_sees_changes_not_notified_yet(repo_path):
+    watcher = index_watcher.start_repository_watcher(repo_path)
+    assert watcher.wait_until_fresh(20)
+    with open(f"{repo_path}/second.txt", "w") as f:
+        f.write("Second file.\n")
+    assert index_watcher.sync_repository(repo_path) == {}
+    assert indexed_files(repo_path) == {"first.txt", "second.txt"}
+
+
+@requires_watchfiles
+def test_watcher_skips_files_ignored_by_git(repo_path):
+    with open(f"{repo_path}/.gitignore", "w") as f:
+        f.write("__pycache__/\n")
+    watcher = index_watcher.start_repository_watcher(repo_path)
+    assert watcher.wait_until_fresh(20)
+    generation = watcher.generation
+
+    os.makedirs(f"{repo_path}/__pycache__")
+    with open(f"{repo_path}/__pycache__/first.pyc", "wb") as f:
+        f.write(b"ignored")
+    # Notifications are delivered within a few tenths of a second
+    time.sleep(1)
+    assert watcher.generation == generation
+    with open(f"{repo_path}/second.txt", "w") as f:
+        f.write("Second file.\n")
+    wait_for(lambda: "second.txt" in indexed_files(repo_path))
+    assert watcher.generation == generation + 1
+
+
+def test_sync_repository_scans_without_watcher(repo_path):
+    assert index_watcher.sync_repository(repo_path) == {}
+    assert indexed_files(repo_path) == {"first.txt"}
+
+
+def test_watcher_is_disabled_without_watchfiles(repo_path, monkeypatch, caplog):
+    monkeypatch.setattr(index_watcher, "watchfiles", None)
+    assert index_watcher.start_repository_watcher(repo_path) is None
+    assert "watchfiles is not installed" in caplog.text
+    assert index_watcher.sync_repository(repo_path) == {}
+    assert indexed_files(repo_path) == {"first.txt"}
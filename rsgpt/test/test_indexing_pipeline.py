@@ -0,0 +1,60 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rsgpt.utils.indexing_pipeline import IndexingPipeline
+from rsgpt.utils.repo_index import FileEntry, RepoIndex
+from rsgpt.utils.stores import get_repo_vector_store, set_embeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Fake embedder recording the size of each embedding request."""
+
+    request_sizes: list[int] = []
+
+    def embed_documents(self, texts):
+        self.request_sizes.append(len(texts))
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def embedding():
+    embedding = CountingEmbedding(size=16, request_sizes=[])
+    set_embeddings(embedding)
+    yield embedding
+    set_embeddings(None)
+
+
+def file_chunks(file_path, count):
+    return [
+        Document(
+            page_content=f"{file_path} chunk {number}",
+            metadata={
+                "file_path": file_path,
+                "chunk_number": number,
+                "start_index": number * 20,
+                "language": "python",
+            },
+        )
+        for number in range(count)
+    ]
+
+
+def test_chunks_are_batched_across_files(tmp_path, embedding):
+    vector_store = get_repo_vector_store(str(tmp_path))
+    repo_index = RepoIndex(str(tmp_path))
+    with IndexingPipeline(
+        vector_store, repo_index, batch_size=4, max_in_flight=1
+    ) as pipeline:
+        for file_path in ("a.py", "b.py", "c.py"):
+            pipeline.add_file(
+                file_path, FileEntry(file_path, 0, 0), file_chunks(file_path, 3)
+            )
+        # Files are recorded only once all of their chunks are stored
+        assert "c.py" not in repo_index.get_files()
+        pipeline.flush()
+
+    assert embedding.request_sizes == [4, 4, 1]
+    assert sorted(repo_index.get_files()) == ["a.py", "b.py", "c.py"]
+    assert len(repo_index.get_chunks("b.py", 0, 10)) == 3
+    assert len(vector_store.get()["ids"]) == 9
+    repo_index.close()
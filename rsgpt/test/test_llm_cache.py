@@ -0,0 +1,65 @@
+import time
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+from rsgpt.utils.llm_cache import SQLiteLLMCache
+
+
+def fake_model(cache, answers):
+    return GenericFakeChatModel(
+        messages=iter([AIMessage(content=answer) for answer in answers]), cache=cache
+    )
+
+
+def test_responses_are_reused_across_instances(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    model = fake_model(SQLiteLLMCache(path), ["first", "second"])
+    assert model.invoke("question").content == "first"
+    assert model.invoke("question").content == "first"
+    assert model.invoke("other question").content == "second"
+
+    cache = SQLiteLLMCache(path)
+    assert fake_model(cache, []).invoke("question").content == "first"
+    assert cache.stats() == {"hits": 1, "misses": 0, "entries": 2}
+
+
+def test_expired_and_evicted_responses_are_dropped(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite3"), ttl_s=0.1)
+    model = fake_model(cache, ["first", "second"])
+    assert model.invoke("question").content == "first"
+    time.sleep(0.2)
+    assert model.invoke("question").content == "second"
+
+    cache = SQLiteLLMCache(str(tmp_path / "small.sqlite3"), max_entries=10)
+    model = fake_model(cache, [str(index) for index in range(12)])
+    for index in range(12):
+        model.invoke(f"question {index}")
+    assert cache.stats()["entries"] <= 10
+    # The least recently used responses were evicted first
+    assert fake_model(cache, []).invoke("question 11").content == "11"
+
+
+def test_graph_calls_are_reused_despite_message_ids(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite3"))
+    model = fake_model(cache, ["first", "second"])
+
+    def call_model(state: MessagesState):
+        return {"messages": [model.invoke(state["messages"])]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("first_call", call_model)
+    graph.add_node("second_call", call_model)
+    graph.add_edge(START, "first_call")
+    graph.add_edge("first_call", "second_call")
+    graph.add_edge("second_call", END)
+    graph = graph.compile()
+
+    # Every run gives the messages new ids, the second call sees the first response
+    for _ in range(2):
+        result = graph.invoke({"messages": [("user", "question")]})
+        assert [message.content for message in result["messages"]] == [
+            "question",
+            "first",
+            "second",
+        ]
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2}
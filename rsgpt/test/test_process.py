@@ -0,0 +1,76 @@
+import sys
+import time
+from rsgpt.tools import execute_command_at_repo_root
+from rsgpt.utils.process import BoundedOutput, run_command
+
+
+def test_output_is_decoded_and_returned(tmp_path):
+    result = run_command(
+        "echo out; echo err >&2; exit 3", cwd=str(tmp_path), shell=True, stream=False
+    )
+    assert result["stdout"] == "out\n"
+    assert result["stderr"] == "err\n"
+    assert result["returncode"] == 3
+    assert not result["timed_out"]
+
+
+def test_long_output_keeps_head_and_tail(tmp_path):
+    result = run_command(
+        [sys.executable, "-c", "for i in range(100000): print(i)"],
+        cwd=str(tmp_path),
+        max_output_chars=100,
+        stream=False,
+    )
+    assert result["stdout"].startswith("0\n1\n2\n")
+    assert result["stdout"].endswith("99998\n99999\n")
+    assert "characters truncated" in result["stdout"]
+    assert len(result["stdout"]) < 200
+
+
+def test_command_is_stopped_after_timeout(tmp_path):
+    start = time.monotonic()
+    result = run_command(
+        "echo started; sleep 30", cwd=str(tmp_path), shell=True, timeout=1, stream=False
+    )
+    assert time.monotonic() - start < 10
+    assert result["timed_out"]
+    assert result["stdout"] == "started\n"
+    assert "timed out" in result["stderr"]
+
+
+def test_bounded_output_without_truncation():
+    output = BoundedOutput(10)
+    output.append("abc")
+    output.append("def")
+    assert output.getvalue() == "abcdef"
+
+
+def test_resource_limits_apply_to_the_command(tmp_path):
+    result = run_command(
+        [sys.executable, "-c", "data = bytearray(1 << 30); print('allocated')"],
+        cwd=str(tmp_path),
+        memory_limit_mb=256,
+        stream=False,
+    )
+    assert result["returncode"] != 0
+    assert "MemoryError" in result["stderr"]
+
+    start = time.monotonic()
+    result = run_command(
+        'echo "it\'s $0"; while :; do :; done',
+        cwd=str(tmp_path),
+        shell=True,
+        cpu_limit_s=1,
+        timeout=30,
+        stream=False,
+    )
+    assert time.monotonic() - start < 10
+    assert result["stdout"] == "it's /bin/sh\n"
+    assert not result["timed_out"]
+
+
+def test_command_tools_run_without_the_cli_config(tmp_path):
+    result = execute_command_at_repo_root.invoke(
+        {"command": "echo hello"}, {"configurable": {"repo_path": str(tmp_path)}}
+    )
+    assert result["stdout"] == "hello\n"
@@ -0,0 +1,105 @@
+import pytest
+from rsgpt.tools import find_symbol
+from rsgpt.utils.python_chunker import split_python
+from rsgpt.utils.repo_index import RepoIndex
+
+SOURCE = '''"""Module docstring."""
+import os
+
+
+# Helper comment
+def helper(value):
+    return value + 1
+
+
+class Worker:
+    """A worker."""
+
+    limit = 3
+
+    @property
+    def name(self):
+        return "worker"
+
+    def run(self):
+        def nested():
+            return 1
+
+        return nested()
+
+
+if __name__ == "__main__":
+    Worker().run()
+'''
+
+
+def chunk_texts(source: str, max_chars: int = 4000) -> list[tuple[str, str]]:
+    chunks, _ = split_python(source, max_chars)
+    return [(chunk.symbol, source[start:end]) for start, end, chunk in chunks]
+
+
+def test_one_chunk_per_top_level_definition():
+    texts = chunk_texts(SOURCE)
+
+    assert [symbol for symbol, _ in texts] == ["", "helper", "Worker", ""]
+    assert "".join(text for _, text in texts) == SOURCE
+    assert texts[1][1].startswith("# Helper comment\ndef helper(value):")
+    assert texts[2][1].startswith("class Worker:") and "return nested()" in texts[2][1]
+
+
+def test_oversized_classes_are_split_by_method():
+    texts = chunk_texts(SOURCE, max_chars=120)
+
+    assert [symbol for symbol, _ in texts] == [
+        "",
+        "helper",
+        "Worker",
+        "Worker.name",
+        "Worker.run",
+        "",
+    ]
+    assert "".join(text for _, text in texts) == SOURCE
+    assert texts[3][1].lstrip().startswith("@property")
+
+
+def test_symbols_include_nested_definitions():
+    _, symbols = split_python(SOURCE)
+
+    assert [(s.qualified_name, s.kind, s.start_line, s.end_line) for s in symbols] == [
+        ("helper", "function", 5, 7),
+        ("Worker", "class", 10, 23),
+        ("Worker.name", "method", 15, 17),
+        ("Worker.run", "method", 19, 23),
+        ("Worker.run.nested", "function", 20, 21),
+    ]
+
+
+def test_invalid_python_is_not_split():
+    assert split_python("def broken(:\n") is None
+
+
+@pytest.fixture
+def config(indexed_repo):
+    return indexed_repo({"package/workers.py": SOURCE})
+
+
+def test_python_chunks_are_indexed_with_their_symbols(config):
+    repo_index = RepoIndex(config["configurable"]["repo_path"])
+    try:
+        assert repo_index.count_chunks("package/workers.py") == 4
+        assert [file_path for file_path, _ in repo_index.find_symbols("run")] == [
+            "package/workers.py"
+        ]
+        assert repo_index.find_symbols("package.workers.Worker.run")
+        assert not repo_index.find_symbols("Other.run")
+    finally:
+        repo_index.close()
+
+
+def test_find_symbol_returns_the_source_of_the_definition(config):
+    result = find_symbol.invoke({"name": "Worker.run"}, config)
+
+    assert result.startswith("package/workers.py:19-23 method Worker.run, chunks 2-2")
+    assert "def run(self):" in result and "return nested()" in result
+    assert "def helper" not in result
+    assert find_symbol.invoke({"name": "missing"}, config) == "NO SYMBOL FOUND"
@@ -0,0 +1,107 @@
+import ast
+import pytest
+import rsgpt.tools as tools
+from rsgpt.tools import find_references, find_symbol, import_graph
+from rsgpt.utils.python_xref import extract_code_index, module_name
+from rsgpt.utils.repository_loader import load_repository
+
+ENGINE = """from .helpers import clean
+from . import helpers
+import os.path
+
+
+class Engine:
+    def start(self, path=os.path.sep):
+        return clean(self.stop())
+
+    def stop(self):
+        return helpers.clean("stop")
+"""
+
+HELPERS = """def clean(value):
+    return value.strip()
+"""
+
+MAIN = """from package.engine import Engine
+
+Engine().start()
+"""
+
+
+def test_references_and_imports_are_resolved():
+    code_index = extract_code_index(ast.parse(ENGINE), "package/engine.py", [])
+
+    assert [(i.module, i.name) for i in code_index.imports] == [
+        ("package.helpers", "clean"),
+        ("package", "helpers"),
+        ("os.path", ""),
+    ]
+    references = {(r.name, r.line, r.symbol) for r in code_index.references}
+    assert ("clean", 8, "Engine.start") in references
+    assert ("stop", 8, "Engine.start") in references
+    assert ("clean", 11, "Engine.stop") in references
+    # Default values are evaluated outside of the function
+    assert ("sep", 7, "Engine") in references
+
+
+def test_module_name():
+    assert module_name("package/engine.py") == "package.engine"
+    assert module_name("package/__init__.py") == "package"
+
+
+@pytest.fixture
+def config(indexed_repo):
+    return indexed_repo(
+        {
+            "package/__init__.py": "",
+            "package/engine.py": ENGINE,
+            "package/helpers.py": HELPERS,
+            "main.py": MAIN,
+        }
+    )
+
+
+def test_find_symbol_locations_and_references(config):
+    assert (
+        find_symbol.invoke({"name": "Engine.stop", "with_source": False}, config)
+        == "package/engine.py:10-11 method Engine.stop, chunks 1-1"
+    )
+    assert find_references.invoke({"name": "clean"}, config).splitlines() == [
+        "package/engine.py:1 imports clean from package.helpers",
+        "package/engine.py:8 in Engine.start",
+        "package/engine.py:11 in Engine.stop",
+    ]
+    assert find_references.invoke({"name": "missing"}, config) == "NO REFERENCE FOUND"
+
+
+def test_import_graph(config):
+    assert import_graph.invoke({"module": "package/helpers.py"}, config) == (
+        "package.helpers imports:\n  nothing\n"
+        "package.helpers is imported by:\n  package/engine.py"
+    )
+    result = import_graph.invoke({"module": "package.engine"}, config)
+    assert "  package.helpers.clean (line 1)" in result
+    assert result.endswith("is imported by:\n  main.py")
+
+
+def test_code_index_follows_file_changes(config):
+    repo_path = config["configurable"]["repo_path"]
+    with open(f"{repo_path}/main.py", "w") as f:
+        f.write("import os\n")
+    load_repository(repo_path)
+
+    assert import_graph.invoke({"module": "package.engine"}, config).endswith(
+        "is imported by:\n  nothing"
+    )
+
+
+def test_import_graph_reports_truncated_importers(config, monkeypatch):
+    monkeypatch.setattr(tools, "IMPORTERS_SHOWN", 1)
+    # package/engine.py imports the package twice, it is only counted once
+    assert import_graph.invoke({"module": "package"}, config).endswith(
+        "is imported by:\n  main.py\n  ... list truncated to the first 1"
+    )
+    monkeypatch.setattr(tools, "IMPORTERS_SHOWN", 2)
+    assert import_graph.invoke({"module": "package"}, config).endswith(
+        "is imported by:\n  main.py\n  package/engine.py"
+    )
@@ -0,0 +1,79 @@
+import json
+import os
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+from rsgpt.utils.recall_memory import RecallMemoryStore
+
+MEMORIES = [f"memory number {index}" for index in range(20)]
+
+
+def test_saved_memories_are_found_after_reopening(tmp_path):
+    path = str(tmp_path / "memory_store")
+    embedding = DeterministicFakeEmbedding(size=32)
+    store = RecallMemoryStore(path, embedding)
+    for memory in MEMORIES:
+        store.add_texts([memory])
+    assert store.similarity_search("memory number 7", k=1) == ["memory number 7"]
+
+    reopened = RecallMemoryStore(path, embedding)
+    assert len(reopened) == len(MEMORIES)
+    assert reopened.similarity_search("memory number 12", k=2)[0] == "memory number 12"
+
+
+def test_memories_appended_by_another_store_are_visible(tmp_path):
+    path = str(tmp_path / "memory_store")
+    embedding = DeterministicFakeEmbedding(size=32)
+    reader = RecallMemoryStore(path, embedding)
+    RecallMemoryStore(path, embedding).add_texts(MEMORIES[:3])
+    assert len(reader) == 3
+    assert reader.similarity_search("memory number 2", k=1) == ["memory number 2"]
+
+
+def test_interrupted_write_is_rolled_back(tmp_path):
+    path = str(tmp_path / "memory_store")
+    embedding = DeterministicFakeEmbedding(size=32)
+    RecallMemoryStore(path, embedding).add_texts(MEMORIES[:5])
+    # Simulate a crash after the vector was written but before its full record
+    with open(os.path.join(path, "vectors.f32"), "ab") as f:
+        f.write(b"\0" * 32 * 4)
+    with open(os.path.join(path, "memories.jsonl"), "a") as f:
+        f.write('{"id": "partial", "te')
+
+    store = RecallMemoryStore(path, embedding)
+    assert len(store) == 5
+    store.add_texts(["after crash"])
+    assert store.similarity_search("after crash", k=1) == ["after crash"]
+    assert len(RecallMemoryStore(path, embedding)) == 6
+
+
+def test_legacy_in_memory_store_is_migrated(tmp_path):
+    path = str(tmp_path / "memory_store")
+    embedding = DeterministicFakeEmbedding(size=32)
+    legacy_store = InMemoryVectorStore(embedding)
+    legacy_store.add_texts(MEMORIES[:4])
+    legacy_store.dump(path)
+
+    store = RecallMemoryStore(path, embedding)
+    assert len(store) == 4
+    assert store.similarity_search("memory number 3", k=1) == ["memory number 3"]
+    with open(path + ".legacy.json") as f:
+        assert len(json.load(f)) == 4
+
+
+def test_open_store_recovers_from_a_write_interrupted_in_another_process(tmp_path):
+    path = str(tmp_path / "memory_store")
+    embedding = DeterministicFakeEmbedding(size=32)
+    store = RecallMemoryStore(path, embedding)
+    store.add_texts(MEMORIES[:3])
+    # Another process crashed after writing a vector and part of its record
+    with open(os.path.join(path, "vectors.f32"), "ab") as f:
+        f.write(b"\0" * 32 * 4)
+    with open(os.path.join(path, "memories.jsonl"), "a") as f:
+        f.write('{"id": "partial", "te')
+
+    store.add_texts(["after crash"])
+    assert store.similarity_search("after crash", k=1) == ["after crash"]
+    reopened = RecallMemoryStore(path, embedding)
+    assert len(reopened) == 4
+    assert reopened.similarity_search("memory number 1", k=1) == ["memory number 1"]
+    assert reopened.similarity_search("after crash", k=1) == ["after crash"]
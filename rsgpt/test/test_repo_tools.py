@@ -0,0 +1,39 @@
+import pytest
+from rsgpt.tools import search_repo_by_path, search_repo_by_path_range
+
+
+@pytest.fixture
+def config(indexed_repo):
+    return indexed_repo(
+        {"notes.txt": "".join(f"Line {index} of the notes.\n" for index in range(400))}
+    )
+
+
+def test_search_repo_by_path_returns_the_requested_chunk(config):
+    result = search_repo_by_path.invoke(
+        {"path": "notes.txt", "chunk_number": 1}, config
+    )
+    assert len(result) == 1
+    assert "'chunk_number': 1," in result[0]
+    assert "Line 100 of the notes." in result[0]
+
+
+def test_search_repo_by_path_reports_missing_files_and_chunks(config):
+    assert search_repo_by_path.invoke(
+        {"path": "missing.txt", "chunk_number": 0}, config
+    ) == ["NO FILE FOUND"]
+    result = search_repo_by_path.invoke(
+        {"path": "notes.txt", "chunk_number": 1000}, config
+    )
+    assert result[0].startswith("NO CHUNK FOUND, last_chunk_number is")
+
+
+def test_search_repo_by_path_range_returns_consecutive_chunks(config):
+    result = search_repo_by_path_range.invoke(
+        {"path": "notes.txt", "start_chunk": 0, "stop_chunk": 2}, config
+    )
+    assert len(result) == 3
+    assert all(
+        f"'chunk_number': {index}," in chunk for index, chunk in enumerate(result)
+    )
+    assert "Line 0 of the notes." in result[0]
@@ -0,0 +1,83 @@
+import sqlite3
+from rsgpt.tools import create_file, find_symbol, generate_repo_tree, write_file
+from rsgpt.utils.repo_tree import render_tree
+from rsgpt.utils.repository_loader import load_repository
+
+FILES = ["README.md", "src/app.py", "src/lib/a.py", "src/lib/b.py", "tests/test_app.py"]
+
+
+def test_render_tree():
+    assert render_tree(FILES) == "\n".join(
+        [
+            "├── README.md",
+            "├── src/",
+            "│   ├── app.py",
+            "│   └── lib/",
+            "│       ├── a.py",
+            "│       └── b.py",
+            "└── tests/",
+            "    └── test_app.py",
+        ]
+    )
+
+
+def test_render_tree_limits():
+    assert render_tree(FILES, max_depth=1) == "\n".join(
+        ["├── README.md", "├── src/ (3 files)", "└── tests/ (1 file)"]
+    )
+    assert render_tree(FILES, path="src/lib/") == "├── a.py\n└── b.py"
+    assert render_tree(FILES, path="missing") == "NO PATH FOUND"
+    assert render_tree(FILES, max_entries=2).splitlines() == [
+        "├── README.md",
+        "├── src/",
+        "... truncated after 2 entries, use a deeper path or a lower max_depth to see more.",
+    ]
+
+
+def test_generate_repo_tree_follows_the_index(indexed_repo, tmp_path):
+    config = indexed_repo(
+        {
+            ".gitignore": "build/\n",
+            "build/output.bin": "ignored",
+            "main.py": "print('hello')\n",
+        }
+    )
+    assert generate_repo_tree.invoke({}, config) == "├── .gitignore\n└── main.py"
+
+    (tmp_path / "other.py").write_text("print('other')\n")
+    load_repository(str(tmp_path))
+    assert generate_repo_tree.invoke({}, config).endswith("└── other.py")
+
+
+def test_generate_repo_tree_after_the_index_is_rebuilt(indexed_repo, tmp_path):
+    config = indexed_repo({"main.py": "print('hello')\n"})
+    assert generate_repo_tree.invoke({}, config) == "└── main.py"
+
+    # An index rebuilt for a new schema restarts from the same generation
+    index_path = tmp_path / ".rsgpt" / "chroma_db" / "index.sqlite3"
+    with sqlite3.connect(index_path) as connection:
+        connection.execute("PRAGMA user_version = 0")
+    connection.close()
+    (tmp_path / "main.py").rename(tmp_path / "app.py")
+    load_repository(str(tmp_path))
+    assert generate_repo_tree.invoke({}, config) == "└── app.py"
+
+
+def test_files_written_by_tools_are_indexed(indexed_repo, tmp_path):
+    config = indexed_repo({".gitignore": "build/\n", "main.py": "print('hello')\n"})
+    create_file.invoke({"file_path": "new.py", "file_content": "x = 1\n"}, config)
+    (tmp_path / "build").mkdir()
+    create_file.invoke({"file_path": "build/out.py", "file_content": "y = 1\n"}, config)
+    assert generate_repo_tree.invoke({}, config) == (
+        "├── .gitignore\n├── main.py\n└── new.py"
+    )
+
+    write_file.invoke(
+        {
+            "file_path": "main.py",
+            "file_content": "def run():\n    pass\n",
+            "append": True,
+        },
+        config,
+    )
+    assert "main.py" in find_symbol.invoke({"name": "run"}, config)
@@ -0,0 +1,167 @@
+import os
+import pytest
+from git import Repo
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from rsgpt.utils.repo_index import RepoIndex
+from rsgpt.utils import repository_loader
+from rsgpt.utils.repository_loader import load_repository
+from rsgpt.utils.stores import get_repo_vector_store, set_embeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Local stand-in for the Ollama embedder counting the embedded texts."""
+
+    embedded_texts: int = 0
+    embedding_requests: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded_texts += len(texts)
+        self.embedding_requests += 1
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def embedding():
+    embedding = CountingEmbedding(size=16)
+    set_embeddings(embedding)
+    yield embedding
+    set_embeddings(None)
+
+
+@pytest.fixture
+def repo_path(tmp_path):
+    Repo.init(tmp_path)
+    for index in range(3):
+        with open(tmp_path / f"module_{index}.py", "w") as f:
+            f.write(f"def function_{index}():\n    return {index}\n" * 100)
+    return str(tmp_path)
+
+
+def indexed_paths(repo_path):
+    metadatas = get_repo_vector_store(repo_path).get()["metadatas"]
+    return sorted({metadata["file_path"] for metadata in metadatas})
+
+
+def test_unchanged_files_are_not_embedded_again(repo_path, embedding):
+    load_repository(repo_path)
+    assert embedding.embedded_texts > 0
+    assert indexed_paths(repo_path) == ["module_0.py", "module_1.py", "module_2.py"]
+
+    embedding.embedded_texts = 0
+    os.utime(os.path.join(repo_path, "module_0.py"), ns=(0, 0))
+    load_repository(repo_path)
+    assert embedding.embedded_texts == 0
+
+
+def test_modified_and_removed_files_are_updated(repo_path, embedding):
+    load_repository(repo_path)
+    with open(os.path.join(repo_path, "module_0.py"), "a") as f:
+        f.write("# modified\n")
+    os.remove(os.path.join(repo_path, "module_2.py"))
+
+    embedding.embedded_texts = 0
+    load_repository(repo_path)
+    assert embedding.embedded_texts > 0
+    assert indexed_paths(repo_path) == ["module_0.py", "module_1.py"]
+
+
+def test_renamed_files_reuse_embeddings(repo_path, embedding):
+    load_repository(repo_path)
+    os.rename(
+        os.path.join(repo_path, "module_1.py"), os.path.join(repo_path, "renamed.py")
+    )
+
+    embedding.embedded_texts = 0
+    load_repository(repo_path)
+    assert embedding.embedded_texts == 0
+    assert indexed_paths(repo_path) == ["module_0.py", "module_2.py", "renamed.py"]
+
+
+def test_batches_span_several_files(repo_path, embedding):
+    load_repository(repo_path, embedding_batch_size=1000)
+    assert embedding.embedding_requests == 1
+    assert len(get_repo_vector_store(repo_path).get()["ids"]) == (
+        embedding.embedded_texts
+    )
+
+
+def test_chunk_index_locates_chunks_in_files(repo_path, embedding):
+    load_repository(repo_path)
+    repo_index = RepoIndex(repo_path)
+    chunks = repo_index.get_chunks("module_0.py", 0, 100)
+    repo_index.close()
+    assert [chunk.chunk_number for chunk in chunks] == list(range(len(chunks)))
+
+    with open(os.path.join(repo_path, "module_0.py")) as f:
+        content = f.read()
+    documents = get_repo_vector_store(repo_path).get(
+        ids=[chunk.chunk_id for chunk in chunks]
+    )
+    stored = dict(zip(documents["ids"], documents["documents"]))
+    for chunk in chunks:
+        assert (
+            stored[chunk.chunk_id]
+            == content[chunk.start_index : chunk.start_index + chunk.length]
+        )
+
+
+def indexed_chunks(repo_path):
+    repo_index = RepoIndex(repo_path)
+    chunks = {
+        file_path: [
+            (chunk.chunk_number, chunk.start_index, chunk.length)
+            for chunk in repo_index.get_chunks(file_path, 0, 1000)
+        ]
+        for file_path in repo_index.get_files()
+    }
+    repo_index.close()
+    return chunks
+
+
+def test_files_split_in_a_process_pool_match_the_serial_run(
+    tmp_path, embedding, monkeypatch
+):
+    monkeypatch.setattr(repository_loader, "PARALLEL_SPLIT_MIN_FILES", 4)
+    start_methods = []
+
+    class RecordingExecutor(repository_loader.ProcessPoolExecutor):
+        def __init__(self, *args, mp_context=None, **kwargs):
+            start_methods.append(mp_context and mp_context.get_start_method())
+            super().__init__(*args, mp_context=mp_context, **kwargs)
+
+    monkeypatch.setattr(repository_loader, "ProcessPoolExecutor", RecordingExecutor)
+    for name in ("serial", "parallel"):
+        Repo.init(tmp_path / name)
+        for index in range(8):
+            with open(tmp_path / name / f"module_{index}.py", "w") as f:
+                f.write(f"def function_{index}():\n    return {index}\n" * 50 * index)
+    load_repository(str(tmp_path / "serial"))
+    load_repository(str(tmp_path / "parallel"), indexing_workers=2)
+    assert indexed_chunks(str(tmp_path / "parallel")) == indexed_chunks(
+        str(tmp_path / "serial")
+    )
+    # The workers never fork the threads of the indexing process
+    assert start_methods == [repository_loader.SPLIT_START_METHOD]
+    assert start_methods[0] != "fork"
+
+
+def test_failed_parallel_indexing_stops_the_process_pool(
+    repo_path, embedding, monkeypatch
+):
+    monkeypatch.setattr(repository_loader, "PARALLEL_SPLIT_MIN_FILES", 2)
+    add_file = repository_loader.IndexingPipeline.add_file
+
+    def failing_add_file(self, file_path, entry, chunks):
+        if file_path == "module_1.py":
+            raise RuntimeError("embedding failed")
+        add_file(self, file_path, entry, chunks)
+
+    monkeypatch.setattr(
+        repository_loader.IndexingPipeline, "add_file", failing_add_file
+    )
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        load_repository(repo_path, indexing_workers=2)
+    # Files stored before the failure are kept, the others are indexed on the next run
+    monkeypatch.undo()
+    load_repository(repo_path, indexing_workers=2)
+    assert indexed_paths(repo_path) == ["module_0.py", "module_1.py", "module_2.py"]
@@ -0,0 +1,49 @@
+import asyncio
+import io
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import MessagesState, StateGraph, START, END
+from langgraph.prebuilt import ToolNode, tools_condition
+from rsgpt.utils.streaming import astream_graph
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return f"result for {query}"
+
+
+def build_graph():
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="The answer is 42")]))
+
+    def agent(state: MessagesState):
+        if len(state["messages"]) == 1:
+            tool_call = {"name": "lookup", "args": {"query": "answer"}, "id": "call_0"}
+            return {"messages": AIMessage(content="", tool_calls=[tool_call])}
+        return {"messages": llm.invoke(state["messages"])}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", ToolNode([lookup]))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", tools_condition)
+    graph.add_edge("tools", "agent")
+    return graph.compile()
+
+
+def test_astream_graph_prints_progress_and_returns_final_state():
+    output = io.StringIO()
+    state = asyncio.run(
+        astream_graph(build_graph(), {"messages": [("user", "question")]}, {}, output)
+    )
+
+    assert state["messages"][-1].content == "The answer is 42"
+    printed = output.getvalue()
+    assert "[tool] lookup started: {'query': 'answer'}" in printed
+    assert "[tool] lookup finished in" in printed
+    assert "result for answer" in printed
+    assert "[agent] The answer is 42\n" in printed
+    # The final answer was streamed, so it is not printed a second time
+    assert printed.count("The answer is 42") == 1
+    assert "first token after" in printed
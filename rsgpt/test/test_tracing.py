@@ -0,0 +1,106 @@
+import json
+from langchain_core.caches import InMemoryCache
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import MessagesState, StateGraph, START
+from langgraph.prebuilt import ToolNode, tools_condition
+from rsgpt.utils.tracing import TracedEmbeddings, Tracer, TracingCallbackHandler
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return f"result for {query}"
+
+
+def build_graph():
+    tool_call = {"name": "lookup", "args": {"query": "answer"}, "id": "call_0"}
+    usage = {"input_tokens": 12, "output_tokens": 3, "total_tokens": 15}
+    llm = FakeMessagesListChatModel(
+        responses=[
+            AIMessage(content="", tool_calls=[tool_call], usage_metadata=usage),
+            AIMessage(content="The answer is 42", usage_metadata=usage),
+        ]
+    )
+
+    def agent(state: MessagesState):
+        return {"messages": llm.invoke(state["messages"])}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", ToolNode([lookup]))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", tools_condition)
+    graph.add_edge("tools", "agent")
+    return graph.compile()
+
+
+def read_spans(tracer: Tracer) -> list[dict]:
+    with open(tracer.path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_tracing_records_graph_node_tool_and_llm_spans(tmp_path):
+    tracer = Tracer(str(tmp_path))
+    config = {"callbacks": [TracingCallbackHandler(tracer)]}
+    build_graph().invoke({"messages": [("user", "question")]}, config)
+    tracer.close()
+
+    spans = read_spans(tracer)
+    kinds = [(span["kind"], span["name"]) for span in spans]
+    assert kinds.count(("node", "agent")) == 2
+    assert kinds.count(("node", "tools")) == 1
+    assert kinds.count(("tool", "lookup")) == 1
+    assert kinds.count(("graph", "LangGraph")) == 1
+    llm_spans = [span for span in spans if span["kind"] == "llm"]
+    assert len(llm_spans) == 2
+    assert all(span["prompt_tokens"] == 12 for span in llm_spans)
+    assert all(not span["cached"] for span in llm_spans)
+
+    # Spans are attached to the closest recorded span they ran in
+    by_id = {span["span_id"]: span for span in spans}
+    graph_span = next(span for span in spans if span["kind"] == "graph")
+    assert graph_span["parent_id"] is None
+    tool_span = next(span for span in spans if span["kind"] == "tool")
+    assert by_id[tool_span["parent_id"]]["name"] == "tools"
+    for span in llm_spans:
+        assert by_id[span["parent_id"]]["name"] == "agent"
+    for span in spans:
+        if span["kind"] == "node":
+            assert span["parent_id"] == graph_span["span_id"]
+
+    summary = tracer.summary({"LLM cache": {"hits": 1, "misses": 2, "entries": 2}})
+    assert "tokens 24 in / 6 out" in summary
+    assert "LLM cache: 1 hits, 2 misses, 2 entries" in summary
+
+
+def test_traced_embeddings_record_a_span_per_request(tmp_path):
+    tracer = Tracer(str(tmp_path))
+    embeddings = TracedEmbeddings(DeterministicFakeEmbedding(size=8), tracer)
+    assert len(embeddings.embed_documents(["a", "b", "c"])) == 3
+    assert len(embeddings.embed_query("a")) == 8
+    tracer.close()
+
+    spans = read_spans(tracer)
+    assert [(span["name"], span["texts"]) for span in spans] == [
+        ("embed_documents", 3),
+        ("embed_query", 1),
+    ]
+
+
+def test_tracing_marks_llm_cache_hits(tmp_path):
+    tracer = Tracer(str(tmp_path))
+    config = {"callbacks": [TracingCallbackHandler(tracer)]}
+    usage = {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2}
+    llm = FakeMessagesListChatModel(
+        responses=[AIMessage(content="a", usage_metadata=usage)], cache=InMemoryCache()
+    )
+    llm.invoke("question", config)
+    llm.invoke("question", config)
+    tracer.close()
+
+    assert [span["cached"] for span in read_spans(tracer)] == [False, True]
+    # Only the response actually generated counts in the token totals
+    assert "tokens 1 in / 1 out, 1 cached" in tracer.summary()
@@ -1,31 +1,37 @@
-from langchain_core.tools import tool
-from langchain_core.documents import Document
-import uuid
+from langchain_core.tools import StructuredTool, tool
+import asyncio
 import os
-import subprocess
-from langchain_ollama.embeddings import OllamaEmbeddings
-from langchain_core.vectorstores import InMemoryVectorStore
+import threading
+import weakref
 from langchain_core.runnables import RunnableConfig
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_chroma import Chroma
 from typing import Annotated
 from langgraph.prebuilt import InjectedState
+from .utils.context_compaction import (
+    CONTEXT_TOKEN_BUDGET,
+    RECENT_MESSAGES,
+    compact_history,
+)
+from .utils.git import list_repository_files
+from .utils.hybrid_search import search_repository
+from .utils.process import run_command
+from .utils.python_chunker import line_offsets
+from .utils.python_xref import module_name
+from .utils.repo_index import RepoIndex
+from .utils.repo_tree import get_repo_tree
+from .utils.stores import get_recall_memory_store, get_repo_vector_store
+
+# Seconds after which a command run by a tool is stopped, unless configured otherwise
+COMMAND_TIMEOUT = 300
+# Characters kept from each of stdout and stderr of a command, unless configured otherwise
+COMMAND_OUTPUT_LIMIT = 20000
 
 
 @tool
 def save_recall_memory(memory: str, config: RunnableConfig) -> str:
     """Save memory to vectorstore for later semantic retrieval."""
-    document = Document(page_content=memory, id=str(uuid.uuid4()))
-    print(f"Saving memory in {config['configurable']['memory_store_path']}")
-    try:
-        recall_vector_store = InMemoryVectorStore.load(
-            config["configurable"]["memory_store_path"],
-            OllamaEmbeddings(model="bge-m3"),
-        )
-    except FileNotFoundError:
-        recall_vector_store = InMemoryVectorStore(OllamaEmbeddings(model="bge-m3"))
-    recall_vector_store.add_documents([document])
-    recall_vector_store.dump(config["configurable"]["memory_store_path"])
+    memory_store_path = config["configurable"]["memory_store_path"]
+    print(f"Saving memory in {memory_store_path}")
+    get_recall_memory_store(memory_store_path).add_texts([memory])
     return memory
 
 
@@ -33,18 +39,20 @@ def save_recall_memory(memory: str, config: RunnableConfig) -> str:
 def execute_command_at_repo_root(command: str, config: RunnableConfig) -> str:
     """Execute a command from the repository's root directory and return its output."""
     try:
-        repo_root = config["configurable"]["repo_path"]
-        process = subprocess.Popen(
+        configurable = config["configurable"]
+        return run_command(
             command,
-            cwd=repo_root,
+            cwd=configurable["repo_path"],
             shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            timeout=configurable.get("command_timeout", COMMAND_TIMEOUT),
+            max_output_chars=configurable.get(
+                "command_output_limit", COMMAND_OUTPUT_LIMIT
+            ),
+            memory_limit_mb=configurable.get("command_memory_limit_mb"),
+            cpu_limit_s=configurable.get("command_cpu_limit_s"),
         )
-        stdout, stderr = process.communicate()
-        return {"stdout": stdout, "stderr": stderr}
-    except subprocess.CalledProcessError as e:
-        return f"An error occurred: {e.stderr}"
+    except OSError as e:
+        return f"An error occurred: {e}"
 
 
 @tool
@@ -55,18 +63,20 @@ def run_python_test_script(test_script_path: str, config: RunnableConfig) -> str
 
     test_script_path (str): Path to the test script from the repository's root directory.
     """
-    repo_root = config["configurable"]["repo_path"]
+    configurable = config["configurable"]
+    repo_root = configurable["repo_path"]
     test_script_path = os.path.join(repo_root, test_script_path)
     try:
-        command = ["python", test_script_path]
-        process = subprocess.Popen(
-            command,
+        return run_command(
+            ["python", test_script_path],
             cwd=repo_root,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            timeout=configurable.get("command_timeout", COMMAND_TIMEOUT),
+            max_output_chars=configurable.get(
+                "command_output_limit", COMMAND_OUTPUT_LIMIT
+            ),
+            memory_limit_mb=configurable.get("command_memory_limit_mb"),
+            cpu_limit_s=configurable.get("command_cpu_limit_s"),
         )
-        stdout, stderr = process.communicate()
-        return {"stdout": stdout, "stderr": stderr}
 
     except Exception as e:
         return f"An error occurred while running the test script: {str(e)}"
@@ -75,31 +85,37 @@ def run_python_test_script(test_script_path: str, config: RunnableConfig) -> str
 @tool
 def search_recall_memories(query: str, config: RunnableConfig) -> list[str]:
     """Search for memories in vectorstore based on query."""
-    try:
-        recall_vector_store = InMemoryVectorStore.load(
-            config["configurable"]["memory_store_path"],
-            OllamaEmbeddings(model="bge-m3"),
-        )
-    except FileNotFoundError:
+    recall_memory_store = get_recall_memory_store(
+        config["configurable"]["memory_store_path"]
+    )
+    memories = recall_memory_store.similarity_search(query, k=3)
+    if not memories:
         print("No memories found.")
-        recall_vector_store = InMemoryVectorStore(OllamaEmbeddings(model="bge-m3"))
-    documents = recall_vector_store.similarity_search(query, k=3)
-    if not documents:
         return ["NO MEMORIES FOUND"]
-    return [document.page_content for document in documents]
+    return memories
 
 
 @tool
-def search_repo_content(query: str, config: RunnableConfig) -> list[str]:
-    """Perform semantic search on repo content based on query."""
-    vector_store = Chroma(
-        collection_name="repo",
-        embedding_function=OllamaEmbeddings(model="bge-m3"),
-        persist_directory=os.path.join(
-            config["configurable"]["repo_path"], ".rsgpt", "chroma_db"
-        ),
+def search_repo_content(
+    query: str,
+    config: RunnableConfig,
+    k: int = 3,
+    path_prefix: str = "",
+    language: str = "",
+) -> list[str]:
+    """
+    Search repo content by identifier or by description.
+    Identifiers, dotted names and paths are matched exactly, other queries are matched
+    both by keywords and by meaning.
+    Args:
+        query: Identifier or description of the searched content
+        k: Number of chunks to return
+        path_prefix: Only search files whose path from the repository's root starts with it
+        language: Only search files in this language (python, js, html, markdown, cpp or text)
+    """
+    search_results = search_repository(
+        config["configurable"]["repo_path"], query, k, path_prefix, language
     )
-    search_results = vector_store.similarity_search(query, k=3)
     return [document.model_dump_json() for document in search_results]
 
 
@@ -108,64 +124,199 @@ def search_repo_by_path(
     path: str, chunk_number: int, config: RunnableConfig
 ) -> list[str]:
     """Search for file content by path and chunk number (starting from 0) in the repository."""
-    vector_store = Chroma(
-        collection_name="repo",
-        embedding_function=OllamaEmbeddings(model="bge-m3"),
-        persist_directory=os.path.join(
-            config["configurable"]["repo_path"], ".rsgpt", "chroma_db"
-        ),
+    return search_repo_by_path_range.invoke(
+        {"path": path, "start_chunk": chunk_number, "stop_chunk": chunk_number},
+        config,
     )
-    documents = vector_store.get(where={"file_path": path})
-    if len(documents["ids"]) == 0:
+
+
+@tool
+def search_repo_by_path_range(
+    path: str, start_chunk: int, stop_chunk: int, config: RunnableConfig
+) -> list[str]:
+    """
+    Get a range of consecutive chunks of a file by path in one call.
+    Args:
+        path: Path of the file from the repository's root directory
+        start_chunk: Number of the first chunk to return (starting from 0)
+        stop_chunk: Number of the last chunk to return, included
+    """
+    repo_path = config["configurable"]["repo_path"]
+    repo_index = RepoIndex(repo_path)
+    try:
+        chunk_count = repo_index.count_chunks(path)
+        chunks = repo_index.get_chunks(path, start_chunk, stop_chunk)
+    finally:
+        repo_index.close()
+    if chunk_count == 0:
         return ["NO FILE FOUND"]
-    chunk_max = len(documents["ids"]) - 1
-    if chunk_number > chunk_max:
+    chunk_max = chunk_count - 1
+    if not chunks:
         return [f"NO CHUNK FOUND, last_chunk_number is {chunk_max}"]
-    for index in range(len(documents["metadatas"])):
-        if documents["metadatas"][index]["chunk_number"] == chunk_number:
-            content = documents["documents"][index]
-            return [
-                f"{{'content': {content}, 'chunk_number': {chunk_number}, 'last_chunk_number': {chunk_max}}}"
-            ]
-    return ["NO CHUNK FOUND"]
+    documents = get_repo_vector_store(repo_path).get(
+        ids=[chunk.chunk_id for chunk in chunks]
+    )
+    contents = dict(zip(documents["ids"], documents["documents"]))
+    return [
+        f"{{'content': {contents[chunk.chunk_id]}, 'chunk_number': {chunk.chunk_number}, 'last_chunk_number': {chunk_max}}}"
+        for chunk in chunks
+    ]
+
+
+# Above this number of matches, find_symbol only lists the definitions
+SYMBOL_SOURCES_SHOWN = 3
+# Maximum number of lines listed by find_references
+REFERENCES_SHOWN = 100
+# Maximum number of importing files listed by import_graph
+IMPORTERS_SHOWN = 100
+
+
+@tool
+def find_symbol(name: str, config: RunnableConfig, with_source: bool = True) -> str:
+    """
+    Get the location and source of a Python function, method or class by name, without searching.
+    Args:
+        name: Name of the symbol, optionally qualified by its class or module, for instance RepoWorker.agent
+        with_source: Whether to include the source of the definitions, or only list where they are
+    """
+    repo_path = config["configurable"]["repo_path"]
+    repo_index = RepoIndex(repo_path)
+    try:
+        matches = repo_index.find_symbols(name)
+        results = []
+        for file_path, symbol in matches:
+            try:
+                with open(
+                    os.path.join(repo_path, file_path), encoding="utf-8", newline=""
+                ) as f:
+                    content = f.read()
+            except OSError:
+                continue
+            offsets = line_offsets(content)
+            start = offsets[min(symbol.start_line - 1, len(offsets) - 1)]
+            end = offsets[min(symbol.end_line, len(offsets) - 1)]
+            chunk_numbers = repo_index.get_chunk_numbers(file_path, start, end)
+            chunk_range = (
+                f", chunks {chunk_numbers[0]}-{chunk_numbers[-1]}"
+                if chunk_numbers
+                else ""
+            )
+            location = (
+                f"{file_path}:{symbol.start_line}-{symbol.end_line} "
+                f"{symbol.kind} {symbol.qualified_name}{chunk_range}"
+            )
+            if with_source and len(matches) <= SYMBOL_SOURCES_SHOWN:
+                location += "\n" + content[start:end]
+            results.append(location)
+    finally:
+        repo_index.close()
+    if not results:
+        return "NO SYMBOL FOUND"
+    return "\n\n".join(results)
 
 
 @tool
-def generate_repo_tree(config: RunnableConfig) -> str:
+def find_references(name: str, config: RunnableConfig) -> str:
     """
-    Generates a tree representation of a repository, ignoring files and folders starting with a dot.
+    List the lines of Python files using a name, and the files importing it.
+    Names are matched without resolving their type: self.run() and run() both use run.
+    Args:
+        name: Name of the function, class, method, attribute or variable. For a dotted name, only its last part is matched
     """
-    root_path = config["configurable"]["repo_path"]
+    name = name.strip().split(".")[-1]
+    repo_index = RepoIndex(config["configurable"]["repo_path"])
+    try:
+        references = repo_index.find_references(name, limit=REFERENCES_SHOWN + 1)
+        importers = repo_index.find_name_imports(name)
+    finally:
+        repo_index.close()
+    lines = [
+        f"{file_path}:{imported.line} imports {name} from {imported.module}"
+        for file_path, imported in importers
+    ]
+    lines += [
+        f"{file_path}:{reference.line} in {reference.symbol or 'module'}"
+        for file_path, reference in references[:REFERENCES_SHOWN]
+    ]
+    if len(references) > REFERENCES_SHOWN:
+        lines.append(f"... more than {REFERENCES_SHOWN} references, list truncated")
+    return "\n".join(lines) if lines else "NO REFERENCE FOUND"
 
-    def generate_repo_tree_rec(root_path_rec, prefix):
-        tree = []
-        entries = sorted(
-            [e for e in os.listdir(root_path_rec) if not e.startswith(".")]
+
+@tool
+def import_graph(module: str, config: RunnableConfig) -> str:
+    """
+    Show what a Python module imports and which files import it.
+    Args:
+        module: Dotted name of the module, or path of the file from the repository's root, for instance rsgpt/tools.py or rsgpt.tools
+    """
+    if module.endswith(".py"):
+        file_path = module
+        module = module_name(module)
+    else:
+        file_path = module.replace(".", "/") + ".py"
+    repo_index = RepoIndex(config["configurable"]["repo_path"])
+    try:
+        imports = repo_index.get_imports(file_path) or repo_index.get_imports(
+            file_path.removesuffix(".py") + "/__init__.py"
         )
-        for index, entry in enumerate(entries):
-            entry_path = os.path.join(root_path_rec, entry)
-            connector = "└── " if index == len(entries) - 1 else "├── "
-            tree.append(f"{prefix}{connector}{entry}")
+        importers = repo_index.find_importers(module, limit=IMPORTERS_SHOWN + 1)
+    finally:
+        repo_index.close()
+    lines = [f"{module} imports:"]
+    lines += [
+        f"  {imported.module}{'.' + imported.name if imported.name else ''} "
+        f"(line {imported.line})"
+        for imported in imports
+    ] or ["  nothing"]
+    lines.append(f"{module} is imported by:")
+    lines += [f"  {file_path}" for file_path in importers[:IMPORTERS_SHOWN]] or [
+        "  nothing"
+    ]
+    if len(importers) > IMPORTERS_SHOWN:
+        lines.append(f"  ... list truncated to the first {IMPORTERS_SHOWN}")
+    return "\n".join(lines)
 
-            if os.path.isdir(entry_path):
-                subtree_prefix = (
-                    f"{prefix}    " if index == len(entries) - 1 else f"{prefix}│   "
-                )
-                tree.append(generate_repo_tree_rec(entry_path, subtree_prefix))
-        return "\n".join(tree)
 
-    return generate_repo_tree_rec(root_path, "")
+@tool
+def generate_repo_tree(
+    config: RunnableConfig, path: str = "", max_depth: int = 3, max_entries: int = 500
+) -> str:
+    """
+    Generates a tree representation of the files of the repository, ignored files excluded.
+    Args:
+        path: Directory from the repository's root to render, the whole repository by default
+        max_depth: Number of directory levels to render, deeper directories only show their file count
+        max_entries: Maximum number of lines of the tree
+    """
+    return get_repo_tree(
+        config["configurable"]["repo_path"], path, max_depth, max_entries
+    )
+
+
+def _reindex_written_file(repo_path: str, full_path: str):
+    """
+    Re-index a file written by a tool, so the tree, the symbols and the chunk offsets
+    include it right away. Files outside of the repository or ignored by git are skipped.
+    """
+    from .utils.repository_loader import reindex_file
+
+    relative_path = os.path.relpath(full_path, repo_path)
+    if relative_path in list_repository_files(repo_path):
+        reindex_file(repo_path, relative_path)
 
 
 @tool
 def create_file(file_path: str, file_content: str, config: RunnableConfig) -> str:
     """Create a file in the repository."""
-    full_path = os.path.join(config["configurable"]["repo_path"], file_path)
+    repo_path = config["configurable"]["repo_path"]
+    full_path = os.path.join(repo_path, file_path)
     try:
         with open(full_path, "w") as f:
             f.write(file_content)
     except Exception as e:
         return f"Error creating file: {e}"
+    _reindex_written_file(repo_path, full_path)
     return f"File created at {full_path}"
 
 
@@ -190,6 +341,7 @@ def write_file(file_path: str, file_content: str, append: bool, config: Runnable
             f.write(file_content)
     except Exception as e:
         return f"Error writing file: {e}"
+    _reindex_written_file(repo_path, full_path)
     return f"File written successfully to {full_path} (appended: {append})"
 
 
@@ -201,40 +353,16 @@ def delete_file_chunk(file_path: str, chunk_number: int, config: RunnableConfig)
         file_path (str): Path to the file containing the chunk
         chunk_number (int): Chunk number index to be deleted
     """
+    from .utils.chunk_editor import replace_chunks
+
     try:
-        vector_store = Chroma(
-            collection_name="repo",
-            embedding_function=OllamaEmbeddings(model="bge-m3"),
-            persist_directory=os.path.join(
-                config["configurable"]["repo_path"], ".rsgpt", "chroma_db"
-            ),
+        replace_chunks(
+            config["configurable"]["repo_path"],
+            file_path,
+            chunk_number,
+            chunk_number,
+            "",
         )
-        # Retrieve all chunks for the file
-        results = vector_store.get(where={"file_path": file_path})
-        if not results["ids"]:
-            return "File not found in vector store"
-
-        # Order results by chunk number
-        results["metadatas"] = sorted(
-            results["metadatas"], key=lambda x: x["chunk_number"]
-        )
-
-        # Retrieve the selected chunk content
-        deleted_content = results["documents"][chunk_number]
-
-        # Find and remove the selected chunk content in the file
-        with open(
-            os.path.join(config["configurable"]["repo_path"], file_path), "r"
-        ) as f:
-            file_content = f.read()
-
-        file_content = file_content.replace(deleted_content, "")
-
-        with open(
-            os.path.join(config["configurable"]["repo_path"], file_path), "w"
-        ) as f:
-            f.write(file_content)
-
         return "File chunk deleted successfully"
     except Exception as e:
         return f"Error deleting chunk: {str(e)}"
@@ -251,66 +379,36 @@ def modify_file_chunk(
         chunks: list of the chunks to replace, must be consecutive chunks
         new_content: New content to replace the chunks
     """
+    from .utils.chunk_editor import replace_chunks
+
     try:
         # Check that all chunks are consecutive
         if not all([chunks[i] + 1 == chunks[i + 1] for i in range(len(chunks) - 1)]):
             return "Chunks must be consecutive"
 
-        vector_store = Chroma(
-            collection_name="repo",
-            embedding_function=OllamaEmbeddings(model="bge-m3"),
-            persist_directory=os.path.join(
-                config["configurable"]["repo_path"], ".rsgpt", "chroma_db"
-            ),
-        )
-
-        # Retrieve all chunks for the file
-        results = vector_store.get(where={"file_path": file_path})
-        if not results["ids"]:
-            return "File not found in vector store"
-        ck_range = range(chunks[0], chunks[-1] + 1)
-        if len(results["documents"]) <= ck_range[-1]:
-            return (
-                f"End of chunk range is over maximum chunk {len(results['documents'])}"
-            )
-
-        # Order results by chunk number
-        results["metadatas"] = sorted(
-            results["metadatas"], key=lambda x: x["chunk_number"]
+        replace_chunks(
+            config["configurable"]["repo_path"],
+            file_path,
+            chunks[0],
+            chunks[-1],
+            new_content,
         )
-
-        # Modify the first chunk with the new content and delete the rest
-        with open(
-            os.path.join(config["configurable"]["repo_path"], file_path), "r"
-        ) as f:
-            file_content = f.read()
-            old_chunk_content = ""
-            old_chunk_content = results["documents"][ck_range[0]]
-            file_content = file_content.replace(old_chunk_content, new_content)
-
-        for chunk_index in ck_range[1:]:
-            old_chunk_content = results["documents"][chunk_index]
-            file_content = file_content.replace(old_chunk_content, "")
-
-        with open(
-            os.path.join(config["configurable"]["repo_path"], file_path), "w"
-        ) as f:
-            f.write(file_content)
-
         return "File chunks modified successfully"
     except Exception as e:
         return f"Error modifying chunks: {str(e)}"
 
 
+_workers_lock = threading.Lock()
 repo_worker_g = None  # Initialize as None
 
 
 def initialize_repo_worker():
     global repo_worker_g
-    if repo_worker_g is None:
-        from .graphs.repo_worker import RepoWorker
+    with _workers_lock:
+        if repo_worker_g is None:
+            from .graphs.repo_worker import RepoWorker
 
-        repo_worker_g = RepoWorker().compile()
+            repo_worker_g = RepoWorker().compile()
 
 
 specialist_g = None  # Initialize as None
@@ -318,10 +416,11 @@ specialist_g = None  # Initialize as None
 
 def initialize_specialist():
     global specialist_g
-    if specialist_g is None:
-        from .graphs.specialist_with_memory import SpecialistWithMemory
+    with _workers_lock:
+        if specialist_g is None:
+            from .graphs.specialist_with_memory import SpecialistWithMemory
 
-        specialist_g = SpecialistWithMemory().compile()
+            specialist_g = SpecialistWithMemory().compile()
 
 
 # Add initialization for deeper think worker
@@ -330,10 +429,11 @@ deeperthink_worker_g = None
 
 def initialize_deeperthink_worker():
     global deeperthink_worker_g
-    if deeperthink_worker_g is None:
-        from .graphs.deeper_think_worker import DeeperThinkWorker
+    with _workers_lock:
+        if deeperthink_worker_g is None:
+            from .graphs.deeper_think_worker import DeeperThinkWorker
 
-        deeperthink_worker_g = DeeperThinkWorker().compile()
+            deeperthink_worker_g = DeeperThinkWorker().compile()
 
 
 def initialize_repo_collector():
@@ -342,8 +442,69 @@ def initialize_repo_collector():
     return RepoCollector().compile()
 
 
-@tool
-def call_worker(
+def _is_system_message(message) -> bool:
+    if isinstance(message, dict):
+        return message.get("role") == "system"
+    if isinstance(message, tuple):
+        return message[0] == "system"
+    return getattr(message, "type", None) == "system"
+
+
+def _worker_history(worker: str, messages: list, config: RunnableConfig) -> list:
+    """
+    Return the dispatcher history forwarded to a worker: without system messages and
+    without the calling message, compacted to the token budget of the worker.
+    """
+    configurable = config["configurable"]
+    token_budget = configurable.get("worker_context_token_budgets", {}).get(
+        worker, configurable.get("context_token_budget", CONTEXT_TOKEN_BUDGET)
+    )
+    return compact_history(
+        [message for message in messages[:-1] if not _is_system_message(message)],
+        token_budget,
+        configurable.get("context_recent_messages", RECENT_MESSAGES),
+    )
+
+
+def _get_worker(worker: str, history: list, fake_user_message: str):
+    """Return the compiled graph of a worker and its input, or None if it does not exist."""
+    input_messages = history + [("user", fake_user_message)]
+    if worker == "repo_worker":
+        initialize_repo_worker()  # Ensure repo_worker_g is initialized
+        return repo_worker_g, {"messages": input_messages, "final_messages": []}
+    elif worker == "specialist":
+        initialize_specialist()
+        return specialist_g, {"messages": input_messages}
+    elif worker == "repo_collector":
+        return initialize_repo_collector(), {"messages": input_messages}
+    elif worker == "deeper_think_worker":
+        initialize_deeperthink_worker()
+        return deeperthink_worker_g, {"messages": input_messages}
+    return None, None
+
+
+# Workers allowed to run at once, unless configured otherwise
+MAX_CONCURRENT_WORKERS = 4
+
+WORKER_NOT_FOUND = "Worker not found, please choose between 'repo_worker', 'specialist', 'repo_collector', or 'deeper_think_worker'"
+
+_worker_slots: dict[int, threading.BoundedSemaphore] = {}
+_async_worker_slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _get_worker_slots(limit: int) -> threading.BoundedSemaphore:
+    """Return the semaphore capping the number of workers running in threads."""
+    with _workers_lock:
+        return _worker_slots.setdefault(limit, threading.BoundedSemaphore(limit))
+
+
+def _get_async_worker_slots(limit: int) -> asyncio.Semaphore:
+    """Return the semaphore capping the number of workers running in the event loop."""
+    loop_slots = _async_worker_slots.setdefault(asyncio.get_running_loop(), {})
+    return loop_slots.setdefault(limit, asyncio.Semaphore(limit))
+
+
+def _call_worker(
     worker: str,
     fake_user_message: str,
     config: RunnableConfig,
@@ -352,47 +513,63 @@ def call_worker(
     """Call a worker agent. Will route the messages to the worker agent and return the response.
     You can fake an additional user message to the worker agent by providing the fake_user_message parameter.
     The worker agent will receive the fake_user_message as the last message in the conversation.
+    Workers called in the same turn run concurrently.
     """
-    response = None
-    input_messages = []
-    for message in messages[:-1]:
-        system = False
-        try:
-            if message["role"] == "system":
-                system = True
-        except:
-            pass
-        try:
-            if message.type == "system":
-                system = True
-        except:
-            pass
-        if not system:
-            input_messages.append(message)
-
-    input_messages.append(("user", fake_user_message))
-    if worker == "repo_worker":
-        initialize_repo_worker()  # Ensure repo_worker_g is initialized
-        response = repo_worker_g.invoke(
-            {"messages": input_messages, "final_messages": []}, config
-        )
-    elif worker == "specialist":
-        initialize_specialist()
-        response = specialist_g.invoke({"messages": input_messages}, config)
-    elif worker == "repo_collector":
-        repo_collector = initialize_repo_collector()
-        response = repo_collector.invoke({"messages": input_messages}, config)
-    elif worker == "deeper_think_worker":
-        initialize_deeperthink_worker()
-        response = deeperthink_worker_g.invoke({"messages": input_messages}, config)
-    else:
-        return "Worker not found, please choose between 'repo_worker', 'specialist', 'repo_collector', or 'deeper_think_worker'"
+    graph, worker_input = _get_worker(
+        worker, _worker_history(worker, messages, config), fake_user_message
+    )
+    if graph is None:
+        return WORKER_NOT_FOUND
+    with _get_worker_slots(
+        config["configurable"].get("max_concurrent_workers", MAX_CONCURRENT_WORKERS)
+    ):
+        response = graph.invoke(worker_input, config)
+    return response["final_messages"]
+
+
+async def _acall_worker(
+    worker: str,
+    fake_user_message: str,
+    config: RunnableConfig,
+    messages: Annotated[list, InjectedState("messages")],
+):
+    graph, worker_input = _get_worker(
+        worker, _worker_history(worker, messages, config), fake_user_message
+    )
+    if graph is None:
+        return WORKER_NOT_FOUND
+    async with _get_async_worker_slots(
+        config["configurable"].get("max_concurrent_workers", MAX_CONCURRENT_WORKERS)
+    ):
+        response = await graph.ainvoke(worker_input, config)
     return response["final_messages"]
 
 
-web_search = TavilySearchResults(
-    max_results=5,
-    search_depth="advanced",
-    include_answer=True,
-    include_raw_content=True,
+call_worker = StructuredTool.from_function(
+    func=_call_worker, coroutine=_acall_worker, name="call_worker"
 )
+
+
+_web_search_lock = threading.Lock()
+_web_search_client = None
+
+
+@tool
+def web_search(query: str) -> list[dict] | str:
+    """
+    A search engine optimized for comprehensive, accurate, and trusted results.
+    Useful for when you need to answer questions about current events.
+    Input should be a search query.
+    """
+    global _web_search_client
+    with _web_search_lock:
+        if _web_search_client is None:
+            from langchain_community.tools.tavily_search import TavilySearchResults
+
+            _web_search_client = TavilySearchResults(
+                max_results=5,
+                search_depth="advanced",
+                include_answer=True,
+                include_raw_content=True,
+            )
+    return _web_search_client.invoke({"query": query})
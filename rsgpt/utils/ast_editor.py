@@ -1,89 +1,275 @@
 import ast
-import astor
-from typing import Callable
+import os
+import re
+import textwrap
 from langchain.tools import tool
+from langchain_core.runnables import RunnableConfig
+from .python_chunker import line_offsets
+
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class ASTEditError(Exception):
+    """Raised when an edit cannot be applied to a Python file."""
 
 
 class ASTEditor:
+    """
+    Edit the definitions of a Python file in place, keeping the rest of it untouched.
+
+    The file is parsed once, edits are recorded as replacements of the source ranges of
+    the edited nodes, and `save` splices them all in a single write, so comments and
+    formatting outside of the edited ranges are preserved. Used as a context manager, the
+    edits are saved when the block exits without error and dropped otherwise.
+    """
+
     def __init__(self, file_path: str):
         """
         Initialize the ASTEditor with the path to the Python file to be modified.
         """
         self.file_path = file_path
+        with open(file_path, "r", encoding="utf-8", newline="") as file:
+            self.source = file.read()
         self.tree = self.load_ast()
+        self.offsets = line_offsets(self.source)
+        self.edits: list[tuple[int, int, str]] = []
 
-    def load_ast(self):
+    def load_ast(self) -> ast.Module:
         """
         Load and parse the Python file into an abstract syntax tree (AST).
         """
-        with open(self.file_path, "r") as file:
-            return ast.parse(file.read(), filename=self.file_path)
+        try:
+            return ast.parse(self.source, filename=self.file_path)
+        except SyntaxError as e:
+            raise ASTEditError(f"Cannot parse {self.file_path}: {e}") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.save()
 
-    def apply_transformation(self, transform: Callable[[ast.AST], ast.AST]):
+    def offset(self, line: int, column: int) -> int:
+        """Return the character offset of an AST position, whose column is in bytes."""
+        start = self.offsets[line - 1]
+        line_text = self.source[start : self.offsets[line]]
+        return start + len(line_text.encode("utf-8")[:column].decode("utf-8"))
+
+    def find_functions(self, name: str) -> list[ast.FunctionDef | ast.AsyncFunctionDef]:
+        """
+        Return the functions and methods matching a name, or a dotted qualified name such
+        as `Class.method` or `function.nested`. Nested functions are searched too.
         """
-        Apply a transformation function to the AST.
+        functions = []
+
+        def visit(node: ast.AST, prefix: str):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, _FUNCTIONS + (ast.ClassDef,)):
+                    if isinstance(child, _FUNCTIONS) and name in (
+                        child.name,
+                        prefix + child.name,
+                    ):
+                        functions.append(child)
+                    visit(child, prefix + child.name + ".")
+                else:
+                    visit(child, prefix)
 
-        Args:
-            transform (Callable[[ast.AST], ast.AST]): A function that takes in an AST node and returns a transformed AST node.
+        visit(self.tree, "")
+        return functions
+
+    def replace_range(self, start: int, end: int, text: str):
+        """Record the replacement of the characters from start to end of the file."""
+        for edit_start, edit_end, _ in self.edits:
+            if start < edit_end and edit_start < end:
+                raise ASTEditError("Edits of the same source range conflict")
+        self.edits.append((start, end, text))
+
+    def rename_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef, name: str):
+        """Rename a function at its definition."""
+        start = self.offset(node.lineno, node.col_offset)
+        match = re.compile(r"(?:async\s+)?def\s+").match(self.source, start)
+        if match is None:
+            raise ASTEditError(f"Cannot locate the name of {node.name}")
+        self.replace_range(match.end(), match.end() + len(node.name), name)
+
+    def replace_body(self, node: ast.FunctionDef | ast.AsyncFunctionDef, code: str):
         """
-        self.tree = transform(self.tree)
+        Replace the body of a function, indented like the current one. Everything from
+        the line after the signature to the end of the last body line is replaced, so
+        the comments of the current body go with it.
+        """
+        code = textwrap.dedent(code).strip("\n")
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            raise ASTEditError(f"Invalid body for {node.name}: {e}") from e
+        first, last = node.body[0], node.body[-1]
+        line_start = self.offsets[first.lineno - 1]
+        start = self.offset(first.lineno, first.col_offset)
+        last_line = self.source[
+            self.offsets[last.end_lineno - 1] : self.offsets[last.end_lineno]
+        ]
+        end = self.offsets[last.end_lineno - 1] + len(last_line.rstrip("\r\n"))
+        indent = self.source[line_start:start]
+        if not indent.strip():
+            # Comment and blank lines above the first statement belong to the body
+            line = first.lineno
+            while line - 1 > node.lineno:
+                text = self.source[self.offsets[line - 2] : self.offsets[line - 1]]
+                if text.strip() and not text.lstrip().startswith("#"):
+                    break
+                line -= 1
+            line_start = self.offsets[line - 1]
+            self.replace_range(line_start, end, textwrap.indent(code, indent))
+        else:
+            # The body follows the signature on the same line, move it to its own lines
+            header = self.source[self.offsets[node.lineno - 1] :]
+            indent = header[: len(header) - len(header.lstrip(" \t"))] + "    "
+            start = len(self.source[:start].rstrip(" \t"))
+            self.replace_range(start, end, "\n" + textwrap.indent(code, indent))
 
     def save(self):
         """
-        Save the modified AST back to the original Python file.
+        Write the recorded edits to the file at once. The file is left untouched when
+        the edited source does not parse.
         """
-        with open(self.file_path, "w") as file:
-            file.write(astor.to_source(self.tree))
+        if not self.edits:
+            return
+        source = self.source
+        for start, end, text in sorted(self.edits, reverse=True):
+            source = source[:start] + text + source[end:]
+        try:
+            ast.parse(source, filename=self.file_path)
+        except SyntaxError as e:
+            raise ASTEditError(f"Edits would break {self.file_path}: {e}") from e
+        with open(self.file_path, "w", encoding="utf-8", newline="") as file:
+            file.write(source)
+        self.source = source
+        self.tree = self.load_ast()
+        self.offsets = line_offsets(source)
+        self.edits = []
 
 
-@tool
-def rename_functions(file_path: str, name_map: dict):
+def edit_functions(
+    file_path: str,
+    name_map: dict[str, str] | None = None,
+    new_bodies: dict[str, str] | None = None,
+) -> int:
     """
-    Rename functions in a Python file based on a provided mapping.
+    Rename functions and replace function bodies of a Python file in a single write.
+    Either every edit is applied, or none is.
 
     Args:
-        file_path (str): The path to the Python file.
-        name_map (dict): A dictionary where keys are original function names and values are new function names.
+        file_path (str): Path of the Python file.
+        name_map (dict): Functions to rename, by current name or `Class.method`.
+        new_bodies (dict): New body code of functions, by name or `Class.method`.
 
     Returns:
-        str: Confirmation message after renaming functions.
+        int: The number of edited functions.
+
+    Raises:
+        ASTEditError: If a function is not found or the edited file would not parse.
     """
     editor = ASTEditor(file_path)
+    edited = 0
+    for edits, apply in (
+        (name_map or {}, editor.rename_function),
+        (new_bodies or {}, editor.replace_body),
+    ):
+        for name, value in edits.items():
+            functions = editor.find_functions(name)
+            if not functions:
+                raise ASTEditError(f"Function {name} not found in {file_path}")
+            for function in functions:
+                apply(function, value)
+            edited += len(functions)
+    editor.save()
+    return edited
 
-    class FunctionRenamer(ast.NodeTransformer):
-        def visit_FunctionDef(self, node):
-            if node.name in name_map:
-                node.name = name_map[node.name]
-            self.generic_visit(node)
-            return node
 
-    editor.apply_transformation(lambda tree: FunctionRenamer().visit(tree))
-    editor.save()
-    return f"Functions renamed successfully in {file_path}."
+def _edit_repository_file(
+    file_path: str,
+    config: RunnableConfig,
+    name_map: dict[str, str] | None = None,
+    new_bodies: dict[str, str] | None = None,
+) -> str:
+    """
+    Edit a file of the repository and re-index it, returning the tool result. The
+    repository lock is held until the file is re-indexed, so no refresh runs in between.
+    """
+    from .repository_loader import reindex_file
+    from .stores import get_repo_lock
+
+    repo_path = config["configurable"]["repo_path"]
+    full_path = os.path.join(repo_path, file_path)
+    relative_path = os.path.relpath(full_path, repo_path)
+    if os.path.isabs(file_path) or relative_path.split(os.sep)[0] == os.pardir:
+        return (
+            f"Error editing {file_path}, no change was made: "
+            "the path must be relative to the repository and stay inside of it"
+        )
+    with get_repo_lock(repo_path):
+        try:
+            edited = edit_functions(full_path, name_map, new_bodies)
+        except (ASTEditError, OSError) as e:
+            return f"Error editing {file_path}, no change was made: {e}"
+        reindex_file(repo_path, relative_path)
+    return f"{edited} functions edited successfully in {file_path}."
 
 
 @tool
-def replace_function_body(file_path: str, function_name: str, new_body_code: str):
+def rename_functions(file_path: str, name_map: dict, config: RunnableConfig):
+    """
+    Rename functions in a Python file based on a provided mapping.
+
+    Args:
+        file_path (str): The path to the Python file from the repository's root directory.
+        name_map (dict): A dictionary where keys are original function names (or Class.method) and values are new function names.
+
+    Returns:
+        str: Confirmation message after renaming functions.
+    """
+    return _edit_repository_file(file_path, config, name_map=name_map)
+
+
+@tool
+def replace_function_body(
+    file_path: str, function_name: str, new_body_code: str, config: RunnableConfig
+):
     """
     Replace the body of a specific function with new code in a Python file.
 
     Args:
-        file_path (str): The path to the Python file.
-        function_name (str): The name of the function to modify.
+        file_path (str): The path to the Python file from the repository's root directory.
+        function_name (str): The name of the function to modify, or Class.method.
         new_body_code (str): The new body code as a string.
 
     Returns:
         str: Confirmation message after replacing the function body.
     """
-    editor = ASTEditor(file_path)
+    return _edit_repository_file(
+        file_path, config, new_bodies={function_name: new_body_code}
+    )
 
-    class FunctionBodyReplacer(ast.NodeTransformer):
-        def visit_FunctionDef(self, node):
-            if node.name == function_name:
-                new_body = ast.parse(new_body_code).body
-                node.body = new_body
-            return node
 
-    editor.apply_transformation(lambda tree: FunctionBodyReplacer().visit(tree))
-    editor.save()
-    return f"Body of function '{function_name}' replaced successfully in {file_path}."
+@tool
+def edit_python_functions(
+    file_path: str,
+    config: RunnableConfig,
+    name_map: dict | None = None,
+    new_bodies: dict | None = None,
+):
+    """
+    Apply several function edits to a Python file at once, leaving the rest of the file untouched.
+    Either all edits are applied or none is.
+
+    Args:
+        file_path (str): The path to the Python file from the repository's root directory.
+        name_map (dict): Functions to rename, original name (or Class.method) to new name.
+        new_bodies (dict): Functions whose body is replaced, name (or Class.method) to new body code.
+
+    Returns:
+        str: Confirmation message after editing the functions.
+    """
+    return _edit_repository_file(file_path, config, name_map, new_bodies)
@@ -0,0 +1,169 @@
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import shutil
+import threading
+from datetime import datetime
+
+# Every process writes its own file, rotation is not safe across processes
+LOG_FILE_NAME = "rsgpt_{timestamp}_{pid}.log"
+# Size of the log file before it is rotated, and number of rotated files kept
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# Characters of a log message kept when it is longer, half from its start, half from its end
+LOG_MESSAGE_CHARS = 20000
+# Secrets replaced in the logged prompts and responses
+REDACTED_PATTERNS = (
+    r"sk-[A-Za-z0-9_\-]{16,}",
+    r"tvly-[A-Za-z0-9_\-]{16,}",
+    r"gh[pousr]_[A-Za-z0-9]{20,}",
+)
+
+_lock = threading.Lock()
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.Handler | None = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler leaving the formatting of records to the listener thread.
+
+    The standard handler merges the message arguments on the logging thread, which means
+    converting whole prompts and responses to strings before each model call returns.
+    Objects logged as arguments must therefore not be modified once logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks reference frames which keep changing, render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formatter masking secrets and shortening long messages."""
+
+    def __init__(
+        self,
+        fmt: str,
+        max_chars: int | None = LOG_MESSAGE_CHARS,
+        redacted_patterns: tuple[str, ...] | list[str] = REDACTED_PATTERNS,
+    ):
+        super().__init__(fmt)
+        self.max_chars = max_chars
+        self.redacted = (
+            re.compile("|".join(f"(?:{pattern})" for pattern in redacted_patterns))
+            if redacted_patterns
+            else None
+        )
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = record.message
+        if self.redacted is not None:
+            message = self.redacted.sub("[REDACTED]", message)
+        if self.max_chars and len(message) > self.max_chars:
+            half = self.max_chars // 2
+            elided = len(message) - 2 * half
+            message = (
+                f"{message[:half]}\n[... {elided} characters elided ...]\n"
+                f"{message[-half:]}"
+            )
+        record.message = message
+        return super().formatMessage(record)
+
+
+def _gzip_rotator(source: str, destination: str):
+    with open(source, "rb") as f_in, gzip.open(destination, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def setup_logging(
+    log_directory: str = ".rsgpt/log",
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
+    compress: bool = False,
+    max_message_chars: int | None = LOG_MESSAGE_CHARS,
+    redacted_patterns: tuple[str, ...] | list[str] = REDACTED_PATTERNS,
+) -> str:
+    """
+    Log the records of the process to a rotated file, from a background thread.
+
+    Records are put in a queue by the logging thread, then formatted, redacted, truncated
+    and written by a listener thread, so logging a large prompt does not delay the model
+    call. Each process logs to its own file, named after its start time and pid, which is
+    rotated when it reaches max_bytes, keeping backup_count older files, gzipped if
+    compress is set. Calling it again replaces the previous configuration.
+
+    Args:
+        log_directory (str): Directory of the log files, created if needed.
+        max_bytes (int): Size of the log file before rotation.
+        backup_count (int): Number of rotated files kept.
+        compress (bool): Whether to gzip the rotated files.
+        max_message_chars (int | None): Characters kept from longer messages, None to
+            keep them whole.
+        redacted_patterns (list[str]): Regular expressions of secrets to mask.
+
+    Returns:
+        str: The path of the log file.
+    """
+    global _listener, _queue_handler
+    os.makedirs(log_directory, exist_ok=True)
+    log_path = os.path.join(
+        log_directory,
+        LOG_FILE_NAME.format(
+            timestamp=datetime.now().strftime("%Y-%m-%d_%H-%M-%S"), pid=os.getpid()
+        ),
+    )
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8",
+    )
+    if compress:
+        file_handler.namer = lambda name: name + ".gz"
+        file_handler.rotator = _gzip_rotator
+    file_handler.setFormatter(
+        RedactingFormatter(
+            "%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+            max_chars=max_message_chars,
+            redacted_patterns=redacted_patterns,
+        )
+    )
+    with _lock:
+        _stop()
+        _queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(
+            _queue_handler.queue, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(logging.INFO)
+    return log_path
+
+
+def stop_logging():
+    """Write the queued records and close the log file."""
+    with _lock:
+        _stop()
+
+
+def _stop():
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = _queue_handler = None
+
+
+atexit.register(stop_logging)
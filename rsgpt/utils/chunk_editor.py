@@ -0,0 +1,77 @@
+import os
+from .repo_index import RepoIndex, git_blob_sha
+from .repository_loader import reindex_file
+from .stores import get_repo_lock
+
+
+class ChunkEditError(Exception):
+    """Raised when the chunks of a file cannot be edited safely."""
+
+
+def replace_chunks(
+    repo_path: str,
+    file_path: str,
+    start_chunk: int,
+    stop_chunk: int,
+    new_content: str,
+):
+    """
+    Replace the content covered by a range of consecutive chunks of a file.
+
+    The chunk offsets recorded at indexing time are used to splice the exact character
+    range from the start of the first chunk to the end of the last one, so overlapping
+    chunks and duplicated content elsewhere in the file are left untouched. The file is
+    re-indexed afterwards so that its chunks can be edited again. The repository lock is
+    held from the staleness check to the re-indexing, so no refresh runs in between.
+
+    Args:
+        repo_path (str): Path to the repository.
+        file_path (str): Path of the file from the repository's root directory.
+        start_chunk (int): Number of the first chunk to replace.
+        stop_chunk (int): Number of the last chunk to replace, included.
+        new_content (str): Content replacing the chunks, empty to delete them.
+
+    Raises:
+        ChunkEditError: If the chunks do not exist or the file changed since it was indexed.
+    """
+    with get_repo_lock(repo_path):
+        _replace_chunks(repo_path, file_path, start_chunk, stop_chunk, new_content)
+
+
+def _replace_chunks(
+    repo_path: str,
+    file_path: str,
+    start_chunk: int,
+    stop_chunk: int,
+    new_content: str,
+):
+    repo_index = RepoIndex(repo_path)
+    try:
+        chunk_count = repo_index.count_chunks(file_path)
+        chunks = repo_index.get_chunks(file_path, start_chunk, stop_chunk)
+        entry = repo_index.get_file(file_path)
+    finally:
+        repo_index.close()
+    if chunk_count == 0 or entry is None:
+        raise ChunkEditError("File not found in vector store")
+    if start_chunk < 0 or stop_chunk < start_chunk:
+        raise ChunkEditError("Invalid chunk range")
+    if stop_chunk >= chunk_count:
+        raise ChunkEditError(f"End of chunk range is over maximum chunk {chunk_count}")
+
+    full_path = os.path.join(repo_path, file_path)
+    with open(full_path, "rb") as f:
+        data = f.read()
+    if git_blob_sha(data) != entry.blob_sha:
+        reindex_file(repo_path, file_path)
+        raise ChunkEditError(
+            "File changed since it was indexed, its chunks were refreshed. "
+            "Read them again before editing."
+        )
+
+    content = data.decode("utf-8")
+    start = chunks[0].start_index
+    end = chunks[-1].start_index + chunks[-1].length
+    with open(full_path, "w", encoding="utf-8", newline="") as f:
+        f.write(content[:start] + new_content + content[end:])
+    reindex_file(repo_path, file_path)
@@ -0,0 +1,111 @@
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+    convert_to_messages,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+# Default number of tokens of history forwarded to a worker
+CONTEXT_TOKEN_BUDGET = 12000
+# Default number of most recent messages always forwarded verbatim
+RECENT_MESSAGES = 6
+# Characters kept from an older tool output once the history exceeds its budget
+TOOL_OUTPUT_CHARS = 1000
+# Characters of each elided user or assistant message quoted in the summary
+SUMMARY_CHARS = 200
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+def _elide_tool_output(message: BaseMessage) -> BaseMessage:
+    if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+        return message
+    if len(message.content) <= TOOL_OUTPUT_CHARS:
+        return message
+    elided = len(message.content) - TOOL_OUTPUT_CHARS
+    return message.model_copy(
+        update={
+            "content": message.content[:TOOL_OUTPUT_CHARS]
+            + f"\n[... {elided} characters of tool output elided ...]"
+        }
+    )
+
+
+def _summarize(messages: list[BaseMessage]) -> HumanMessage:
+    """Replace elided messages by a short extractive digest, without calling a model."""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"- user: {_shorten(message.text(), SUMMARY_CHARS)}")
+        elif isinstance(message, AIMessage):
+            if message.text():
+                lines.append(f"- assistant: {_shorten(message.text(), SUMMARY_CHARS)}")
+            for tool_call in message.tool_calls:
+                arguments = _shorten(str(tool_call["args"]), SUMMARY_CHARS)
+                lines.append(f"- assistant called {tool_call['name']}: {arguments}")
+    return HumanMessage(
+        content=f"Summary of the {len(messages)} earlier messages of the conversation, "
+        "which were elided to save context:\n" + "\n".join(lines)
+    )
+
+
+def compact_history(
+    messages: list,
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    recent_messages: int = RECENT_MESSAGES,
+) -> list[BaseMessage]:
+    """
+    Shrink a conversation history to about token_budget tokens before forwarding it.
+
+    The most recent messages are always kept verbatim. When the history exceeds the
+    budget, older tool outputs are truncated first, then the oldest messages are replaced
+    by a digest of the user requests and tool calls they contained. Tool results are never
+    separated from the assistant message calling them.
+
+    Args:
+        messages (list): History to compact, as messages or message-like tuples and dicts.
+        token_budget (int): Approximate number of tokens of the returned history.
+        recent_messages (int): Number of last messages kept verbatim.
+
+    Returns:
+        list[BaseMessage]: The compacted history.
+    """
+    messages = convert_to_messages(messages)
+    if count_tokens_approximately(messages) <= token_budget:
+        return messages
+
+    split = max(0, len(messages) - recent_messages)
+    # Do not separate tool results from the assistant message calling them
+    while 0 < split < len(messages) and isinstance(messages[split], ToolMessage):
+        split -= 1
+    older = [_elide_tool_output(message) for message in messages[:split]]
+    recent = messages[split:]
+    if count_tokens_approximately(older + recent) <= token_budget:
+        return older + recent
+
+    # Elide the oldest messages, keeping as many of the latest ones as the budget allows
+    elided = len(older)
+    tokens_left = token_budget - count_tokens_approximately(recent)
+    while elided > 0:
+        tokens = count_tokens_approximately([older[elided - 1]])
+        if tokens > tokens_left:
+            break
+        tokens_left -= tokens
+        elided -= 1
+    while elided < len(older) and isinstance(older[elided], ToolMessage):
+        elided += 1
+    if elided == 0:
+        return older + recent
+    compacted = [_summarize(older[:elided])] + older[elided:] + recent
+    # The summary takes some of the budget too, elide more messages to make room for it
+    while elided < len(older) and count_tokens_approximately(compacted) > token_budget:
+        elided += 1
+        while elided < len(older) and isinstance(older[elided], ToolMessage):
+            elided += 1
+        compacted = [_summarize(older[:elided])] + older[elided:] + recent
+    return compacted
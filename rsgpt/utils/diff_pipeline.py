@@ -0,0 +1,194 @@
+import fnmatch
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+# Characters of diff sent to the model in a single summary request
+DIFF_GROUP_CHARS = 12000
+# Groups of files summarized for a commit, other files are only listed with their stats
+MAX_DIFF_GROUPS = 16
+# Files whose changes are listed but never sent to the model
+SKIPPED_FILE_PATTERNS = (
+    "*.lock",
+    "package-lock.json",
+    "pnpm-lock.yaml",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "vendor/*",
+    "*/vendor/*",
+    "node_modules/*",
+    "*/node_modules/*",
+)
+# Markers of generated files, looked for in the first added lines
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT", "Code generated by")
+
+_HUNK_START = re.compile(r"^@@ ", re.MULTILINE)
+
+
+@dataclass
+class FileDiff:
+    """Diff of a single file."""
+
+    path: str
+    text: str
+    additions: int
+    deletions: int
+    binary: bool
+
+    def stats(self) -> str:
+        if self.binary:
+            return f"{self.path} (binary)"
+        return f"{self.path} (+{self.additions} -{self.deletions})"
+
+
+def _file_path(header: str, lines: list[str]) -> str:
+    old_path = None
+    for line in lines:
+        if line.startswith("+++ ") and line != "+++ /dev/null":
+            return line[4:].removeprefix("b/")
+        if line.startswith("--- ") and line != "--- /dev/null":
+            old_path = line[4:].removeprefix("a/")
+    if old_path is not None:
+        return old_path
+    match = re.match(r"diff --git a/(.*) b/(.*)", header)
+    return match.group(2) if match else header
+
+
+def split_diff(diff: str) -> list[FileDiff]:
+    """Split the output of git diff into the diffs of each file."""
+    file_diffs = []
+    for text in re.split(r"^(?=diff --git )", diff, flags=re.MULTILINE):
+        if not text.startswith("diff --git "):
+            continue
+        lines = text.splitlines()
+        body = [line for line in lines[1:] if not line.startswith(("+++ ", "--- "))]
+        file_diffs.append(
+            FileDiff(
+                path=_file_path(lines[0], lines[1:]),
+                text=text,
+                additions=sum(line.startswith("+") for line in body),
+                deletions=sum(line.startswith("-") for line in body),
+                binary=any(
+                    line.startswith("Binary files ") or line == "GIT binary patch"
+                    for line in lines
+                ),
+            )
+        )
+    return file_diffs
+
+
+def is_skipped(file_diff: FileDiff) -> bool:
+    """Return whether a file is a lockfile, vendored, generated or binary."""
+    if file_diff.binary:
+        return True
+    if any(
+        fnmatch.fnmatch(file_diff.path, pattern)
+        or fnmatch.fnmatch(file_diff.path.rsplit("/", 1)[-1], pattern)
+        for pattern in SKIPPED_FILE_PATTERNS
+    ):
+        return True
+    added = [line for line in file_diff.text.splitlines() if line.startswith("+")]
+    return any(marker in line for line in added[:10] for marker in GENERATED_MARKERS)
+
+
+def _split_hunks(file_diff: FileDiff, max_chars: int) -> list[str]:
+    """Split the diff of a file into parts of at most max_chars at hunk boundaries."""
+    starts = [match.start() for match in _HUNK_START.finditer(file_diff.text)]
+    if not starts:
+        return [file_diff.text[:max_chars]]
+    header = file_diff.text[: starts[0]]
+    if len(header) > max_chars // 2:
+        # Keep whole lines of a long header so that hunks still fit in each part
+        cut = header.rfind("\n", 0, max_chars // 2)
+        header = (
+            header[: cut + 1] if cut > 0 else header[: max_chars // 2].rstrip() + "\n"
+        )
+    hunks = [
+        file_diff.text[start:end] for start, end in zip(starts, starts[1:] + [None])
+    ]
+    parts = []
+    part = ""
+    for hunk in hunks:
+        hunk = hunk[: max_chars - len(header)]
+        if part and len(header) + len(part) + len(hunk) > max_chars:
+            parts.append(header + part)
+            part = ""
+        part += hunk
+    parts.append(header + part)
+    return parts
+
+
+def group_diffs(
+    file_diffs: list[FileDiff], max_chars: int = DIFF_GROUP_CHARS
+) -> list[str]:
+    """
+    Pack file diffs into groups of at most max_chars, keeping files of a directory
+    together. Files larger than a group are split at hunk boundaries.
+    """
+    groups = []
+    group = ""
+    for file_diff in sorted(file_diffs, key=lambda file_diff: file_diff.path):
+        parts = (
+            [file_diff.text]
+            if len(file_diff.text) <= max_chars
+            else _split_hunks(file_diff, max_chars)
+        )
+        for part in parts:
+            if group and len(group) + len(part) > max_chars:
+                groups.append(group)
+                group = ""
+            group += part
+    if group:
+        groups.append(group)
+    return groups
+
+
+def prepare_diff(
+    diff: str,
+    max_chars: int = DIFF_GROUP_CHARS,
+    max_groups: int = MAX_DIFF_GROUPS,
+) -> tuple[list[str], list[str]]:
+    """
+    Split a diff into groups of files to summarize separately.
+
+    Args:
+        diff (str): Output of git diff.
+        max_chars (int): Maximum number of characters of a group.
+        max_groups (int): Maximum number of groups, files of the following groups are
+            only listed.
+
+    Returns:
+        tuple[list[str], list[str]]: The groups of file diffs, and the stats of the
+            changed files not in any group, or only partly in the kept groups.
+    """
+    summarized = []
+    skipped = []
+    for file_diff in split_diff(diff):
+        if is_skipped(file_diff):
+            skipped.append(file_diff.stats())
+        else:
+            summarized.append(file_diff)
+    groups = group_diffs(summarized, max_chars)
+    # Large files are split in parts, which may not all be in the kept groups
+    part_counts = Counter(
+        file_diff.path for group in groups for file_diff in split_diff(group)
+    )
+    kept_parts = Counter(
+        file_diff.path
+        for group in groups[:max_groups]
+        for file_diff in split_diff(group)
+    )
+    for file_diff in summarized:
+        kept, total = kept_parts[file_diff.path], part_counts[file_diff.path]
+        if not kept:
+            skipped.append(file_diff.stats())
+        elif kept < total:
+            skipped.append(
+                f"{file_diff.stats()}, truncated: {total - kept} of {total} parts "
+                "not shown"
+            )
+    return groups[:max_groups], skipped
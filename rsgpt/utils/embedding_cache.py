@@ -0,0 +1,62 @@
+import hashlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .sqlite_cache import SQLiteLRUCache
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper caching vectors in a SQLite database.
+
+    Vectors are keyed by the hash of the model name and of the text, so identical chunks,
+    queries and memories are only embedded once across runs. Queries and documents share
+    the same entries, which holds for Ollama where both are embedded the same way. The
+    cache keeps at most `max_entries` vectors, evicting the least recently used ones.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: str,
+        model_name: str,
+        max_entries: int = 50000,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = SQLiteLRUCache(path, max_entries)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = {
+            key: np.frombuffer(vector, dtype=np.float32).tolist()
+            for key, vector in self.cache.get_many(keys).items()
+        }
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            # Round to the stored precision so hits and misses return the same vectors
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), computed)
+            }
+            self.cache.put_many(
+                {key: vector.tobytes() for key, vector in new_vectors.items()}
+            )
+            vectors.update(
+                (key, vector.tolist()) for key, vector in new_vectors.items()
+            )
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(
+            f"{self.model_name}\0{text}".encode("utf-8", "surrogatepass")
+        ).hexdigest()
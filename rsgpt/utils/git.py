@@ -1,13 +1,85 @@
-import subprocess
+import os
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from git import Repo
 
-def get_repo_root() -> Path | None:
+_lock = threading.Lock()
+_repos: dict[str, "Repo"] = {}
+# Repository root -> (index mtime, index size, paths in the index)
+_index_paths: dict[str, tuple[int, int, list[str]]] = {}
+
+
+def get_repo_root(path: str | os.PathLike | None = None) -> Path | None:
+    """
+    Return the root of the git repository containing path, the working directory by
+    default, or None outside of a repository.
+    The parent directories are searched for a `.git` entry, without running git.
+    """
+    directory = Path(path or os.getcwd()).resolve()
+    for candidate in (directory, *directory.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def get_repo(repo_path: str | os.PathLike) -> "Repo":
+    """Return the GitPython repository of repo_path, opened once per process."""
+    from git import Repo
+
+    key = os.path.realpath(repo_path)
+    with _lock:
+        if key not in _repos:
+            _repos[key] = Repo(key)
+        return _repos[key]
+
+
+def _index_file_paths(repo: "Repo") -> list[str]:
+    """
+    Return the paths recorded in the index, parsed in-process.
+    The parsed index is reused until the index file changes.
+    """
+    from git import IndexFile
+
+    index_path = os.path.join(repo.git_dir, "index")
     try:
-        return Path(
-            subprocess.check_output(["git", "rev-parse", "--show-toplevel"])
-            .decode("utf-8")
-            .strip()
+        index_stat = os.stat(index_path)
+    except FileNotFoundError:
+        return []
+    with _lock:
+        cached = _index_paths.get(repo.git_dir)
+    if cached and cached[:2] == (index_stat.st_mtime_ns, index_stat.st_size):
+        return cached[2]
+    paths = list(dict.fromkeys(path for path, _ in IndexFile(repo).entries))
+    with _lock:
+        _index_paths[repo.git_dir] = (
+            index_stat.st_mtime_ns,
+            index_stat.st_size,
+            paths,
         )
-    except subprocess.CalledProcessError:
-        return None
+    return paths
+
+
+def list_repository_files(repo_path: str | os.PathLike) -> list[str]:
+    """
+    Return the files of the repository, tracked or untracked but not ignored, relative to
+    its root. Unlike `git add -A` followed by `git ls-files`, the index is left untouched.
+    Tracked files deleted from the working tree are still listed.
+    """
+    repo = get_repo(repo_path)
+    untracked = repo.git.ls_files("--others", "--exclude-standard", "-z").split("\0")
+    return list(
+        dict.fromkeys(_index_file_paths(repo) + [path for path in untracked if path])
+    )
+
+
+def stage_all(repo_path: str | os.PathLike):
+    """Stage every change of the working tree, additions and deletions included."""
+    get_repo(repo_path).git.add(A=True)
+
+
+def get_staged_diff(repo_path: str | os.PathLike) -> str:
+    """Return the diff of the staged changes, without colors or external diff tools."""
+    return get_repo(repo_path).git.diff("--staged", "--no-color", "--no-ext-diff")
@@ -0,0 +1,115 @@
+import re
+from langchain_core.documents import Document
+from .repo_index import RepoIndex
+from .stores import get_repo_vector_store
+
+# Queries made of a single identifier, dotted name or path are answered lexically
+IDENTIFIER_QUERY = re.compile(r"^[\w.:/\\-]+$")
+# Constant of reciprocal rank fusion, damping the weight of the first ranks
+RRF_K = 60
+# Candidates retrieved by each retriever per requested result before fusion
+CANDIDATES_PER_RESULT = 4
+
+
+def _match_query(query: str, phrase: bool) -> str:
+    """
+    Build an FTS5 query from free text: a phrase of its words for identifiers, so that
+    `get_repo_root` matches the adjacent words get, repo and root, any of them otherwise.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return ""
+    if phrase:
+        return '"' + " ".join(words) + '"'
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+def _vector_search(
+    repo_path: str, query: str, count: int, path_prefix: str, language: str
+) -> list[Document]:
+    vector_store = get_repo_vector_store(repo_path)
+    # Chroma cannot filter on a prefix, so fetch more and filter the paths afterwards
+    fetch_count = count * CANDIDATES_PER_RESULT if path_prefix else count
+    documents = vector_store.similarity_search(
+        query, k=fetch_count, filter={"language": language} if language else None
+    )
+    return [
+        document
+        for document in documents
+        if document.metadata.get("file_path", "").startswith(path_prefix)
+    ][:count]
+
+
+def _get_documents(repo_path: str, chunk_ids: list[str]) -> dict[str, Document]:
+    if not chunk_ids:
+        return {}
+    result = get_repo_vector_store(repo_path).get(
+        ids=chunk_ids, include=["documents", "metadatas"]
+    )
+    return {
+        chunk_id: Document(page_content=content, metadata=metadata, id=chunk_id)
+        for chunk_id, content, metadata in zip(
+            result["ids"], result["documents"], result["metadatas"]
+        )
+    }
+
+
+def search_repository(
+    repo_path: str,
+    query: str,
+    k: int = 3,
+    path_prefix: str = "",
+    language: str = "",
+) -> list[Document]:
+    """
+    Search the indexed chunks of a repository, combining BM25 and embedding similarity.
+
+    Identifier-like queries (a single word, dotted name or path) are answered from the
+    full text index alone, without embedding the query, and only fall back to the vector
+    store when nothing matches. Other queries run both retrievers and merge their rankings
+    with reciprocal rank fusion.
+
+    Args:
+        repo_path (str): Path to the repository.
+        query (str): Identifier or natural language description of the searched content.
+        k (int): Number of chunks returned.
+        path_prefix (str): Only return chunks of files whose path starts with it.
+        language (str): Only return chunks of files in this language.
+
+    Returns:
+        list[Document]: The best matching chunks, best first.
+    """
+    candidate_count = max(k, 1) * CANDIDATES_PER_RESULT
+    identifier = bool(IDENTIFIER_QUERY.match(query.strip()))
+    match_query = _match_query(query, phrase=identifier)
+
+    lexical_ids = []
+    if match_query:
+        repo_index = RepoIndex(repo_path)
+        try:
+            lexical_ids = repo_index.search_text(
+                match_query, candidate_count, path_prefix, language
+            )
+        finally:
+            repo_index.close()
+
+    if identifier and lexical_ids:
+        documents = _get_documents(repo_path, lexical_ids[:k])
+        return [documents[chunk_id] for chunk_id in lexical_ids[:k]]
+
+    vector_documents = _vector_search(
+        repo_path, query, candidate_count, path_prefix, language
+    )
+    scores: dict[str, float] = {}
+    for ranking in (lexical_ids, [document.id for document in vector_documents]):
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    best_ids = sorted(scores, key=scores.get, reverse=True)[:k]
+
+    documents = {document.id: document for document in vector_documents}
+    documents.update(
+        _get_documents(
+            repo_path, [chunk_id for chunk_id in best_ids if chunk_id not in documents]
+        )
+    )
+    return [documents[chunk_id] for chunk_id in best_ids if chunk_id in documents]
@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+from .git import list_repository_files
+from .indexing_pipeline import EMBEDDING_BATCH_SIZE
+from .repo_index import RepoIndex
+from .repository_loader import index_is_current, load_repository, reindex_file
+
+try:
+    import watchfiles
+except ImportError:  # Without file notifications, workers scan the repository instead
+    watchfiles = None
+
+# Directories whose changes never affect the indexed files
+IGNORED_DIRECTORIES = {".git", ".rsgpt"}
+# Above this number of changed files, a full scan is cheaper than re-indexing each file
+REINDEX_MAX_FILES = 20
+# Seconds before a failed refresh is retried
+RETRY_INTERVAL = 2.0
+# Seconds a graph node waits for a running refresh before indexing by itself
+FRESHNESS_TIMEOUT = 60.0
+
+_watchers_lock = threading.Lock()
+_watchers: dict[str, "RepositoryWatcher"] = {}
+
+
+def _watch_filter(_, path: str) -> bool:
+    return not IGNORED_DIRECTORIES.intersection(path.split(os.sep))
+
+
+class RepositoryWatcher:
+    """
+    Keep the index of a repository up to date in the background as its files change.
+
+    A listener thread receives the file notifications (inotify on Linux), keeps the
+    changed files that git does not ignore and increments a change generation. An indexer
+    thread then re-indexes these files, or runs `load_repository` after the first start
+    and large changes, and records the generation it caught up with. The index is fresh
+    when no change arrived since the last completed refresh. Notifications arrive with a
+    delay, so `sync_repository` still checks the files against the index before skipping
+    its own scan.
+
+    The watcher runs in the process of the graphs, since a Chroma client does not see
+    vectors written by another process.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+        indexing_workers: int = 1,
+    ):
+        self.repo_path = repo_path
+        self.embedding_batch_size = embedding_batch_size
+        self.indexing_workers = indexing_workers
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.indexed_generation = -1
+        # Files changed since the last refresh, all of them are scanned when set
+        self.changed_files: set[str] = set()
+        self.full_scan = True
+        self.stop_event = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._index_loop, daemon=True),
+            threading.Thread(target=self._listen, daemon=True),
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    def is_alive(self) -> bool:
+        return all(thread.is_alive() for thread in self.threads)
+
+    def is_fresh(self) -> bool:
+        with self.condition:
+            return self._is_fresh()
+
+    def wait_until_fresh(self, timeout: float | None = None) -> bool:
+        """Wait for the running refresh to complete, return whether the index is fresh."""
+        with self.condition:
+            return (
+                self.condition.wait_for(
+                    lambda: self._is_fresh() or not self.is_alive(), timeout
+                )
+                and self._is_fresh()
+            )
+
+    def _is_fresh(self) -> bool:
+        return self.indexed_generation == self.generation and self.is_alive()
+
+    def _indexed_changes(self, changes: set[tuple]) -> set[str]:
+        """Return the changed files which are indexed, or would be if they existed."""
+        changed_files = {os.path.relpath(path, self.repo_path) for _, path in changes}
+        # Files ignored by git, such as build outputs or caches, never reach the index
+        repo_index = RepoIndex(self.repo_path)
+        try:
+            indexed_files = repo_index.get_files().keys()
+        finally:
+            repo_index.close()
+        return changed_files & (
+            set(list_repository_files(self.repo_path)) | indexed_files
+        )
+
+    def _listen(self):
+        for changes in watchfiles.watch(
+            self.repo_path,
+            watch_filter=_watch_filter,
+            stop_event=self.stop_event,
+        ):
+            try:
+                changed_files = self._indexed_changes(changes)
+            except Exception:
+                logging.exception(f"Cannot filter the changes of {self.repo_path}")
+                changed_files, full_scan = set(), True
+            else:
+                full_scan = False
+            if not changed_files and not full_scan:
+                continue
+            with self.condition:
+                self.changed_files |= changed_files
+                self.full_scan |= full_scan
+                self.generation += 1
+                self.condition.notify_all()
+
+    def _index_loop(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.indexed_generation != self.generation
+                    or self.stop_event.is_set()
+                )
+                target_generation = self.generation
+                changed_files, self.changed_files = self.changed_files, set()
+                full_scan, self.full_scan = self.full_scan, False
+            if self.stop_event.is_set():
+                return
+            try:
+                if full_scan or len(changed_files) > REINDEX_MAX_FILES:
+                    load_repository(
+                        self.repo_path,
+                        embedding_batch_size=self.embedding_batch_size,
+                        indexing_workers=self.indexing_workers,
+                    )
+                else:
+                    for file_path in sorted(changed_files):
+                        reindex_file(
+                            self.repo_path,
+                            file_path,
+                            embedding_batch_size=self.embedding_batch_size,
+                        )
+            except Exception:
+                logging.exception(f"Background indexing of {self.repo_path} failed")
+                with self.condition:
+                    self.full_scan = True
+                # Retry after a pause rather than in a tight loop
+                self.stop_event.wait(RETRY_INTERVAL)
+                continue
+            with self.condition:
+                self.indexed_generation = target_generation
+                self.condition.notify_all()
+
+
+def start_repository_watcher(
+    repo_path: str,
+    embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+    indexing_workers: int = 1,
+) -> RepositoryWatcher | None:
+    """
+    Start keeping the index of a repository fresh in the background, once per process.
+    Returns None when `watchfiles` is not installed, workers then scan the repository.
+    """
+    if watchfiles is None:
+        logging.warning(
+            f"watchfiles is not installed, the index of {repo_path} is not watched and "
+            'is scanned before each worker run, install the "watch" extra to watch it'
+        )
+        return None
+    key = os.path.realpath(repo_path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None or not watcher.is_alive():
+            watcher = RepositoryWatcher(key, embedding_batch_size, indexing_workers)
+            watcher.start()
+            _watchers[key] = watcher
+        return watcher
+
+
+def stop_repository_watchers():
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
+
+
+def sync_repository(
+    repo_path: str,
+    embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+    indexing_workers: int = 1,
+) -> dict:
+    """
+    Make sure the index of a repository is up to date before a worker uses it.
+
+    When a background watcher keeps the index fresh, this waits at most for a refresh in
+    progress, then returns once the files are checked against the index, without reading
+    them. Otherwise, or when a file changed too recently to be notified, the repository is
+    scanned with `load_repository`.
+
+    Args:
+        repo_path (str): Path to the repository.
+        embedding_batch_size (int): Number of chunks sent in a single embedding request.
+        indexing_workers (int): Number of processes reading and splitting files.
+
+    Returns:
+        dict: An empty dictionary as result.
+    """
+    with _watchers_lock:
+        watcher = _watchers.get(os.path.realpath(repo_path))
+    if (
+        watcher is not None
+        and watcher.wait_until_fresh(FRESHNESS_TIMEOUT)
+        and index_is_current(repo_path)
+    ):
+        return {}
+    return load_repository(
+        repo_path,
+        embedding_batch_size=embedding_batch_size,
+        indexing_workers=indexing_workers,
+    )
@@ -0,0 +1,154 @@
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from .repo_index import ChunkEntry, FileEntry, RepoIndex
+
+# Number of chunks sent to the embedding model in a single request
+EMBEDDING_BATCH_SIZE = 64
+# Number of embedding requests allowed to run while the next files are being split
+MAX_BATCHES_IN_FLIGHT = 2
+
+
+class IndexingPipeline:
+    """
+    Batch chunks across files, embed them in the background and write them to Chroma in bulk.
+
+    Chunks are accumulated until a batch is full, then embedded on a worker thread while the
+    caller keeps reading and splitting files. Finished batches are written to the collection
+    from the caller's thread, and a file is recorded in the repository index only once all of
+    its chunks are stored.
+    """
+
+    def __init__(
+        self,
+        vector_store: Chroma,
+        repo_index: RepoIndex,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_in_flight: int = MAX_BATCHES_IN_FLIGHT,
+    ):
+        self.vector_store = vector_store
+        self.repo_index = repo_index
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self.in_flight: deque[tuple[Future, list[Document]]] = deque()
+        self.pending_chunks: list[Document] = []
+        self.remaining_chunks: dict[str, int] = {}
+        self.file_entries: dict[str, FileEntry] = {}
+        self.file_chunks: dict[str, list[ChunkEntry]] = {}
+        self.file_texts: dict[str, list[str]] = {}
+
+    def add_file(self, file_path: str, entry: FileEntry, chunks: list[Document]):
+        """Queue the chunks of a file for embedding."""
+        if not chunks:
+            self.repo_index.set_file(file_path, entry)
+            return
+        for chunk in chunks:
+            chunk.id = str(uuid.uuid4())
+        self.file_entries[file_path] = entry
+        self.file_chunks[file_path] = _chunk_entries(
+            [chunk.id for chunk in chunks],
+            [chunk.page_content for chunk in chunks],
+            [chunk.metadata for chunk in chunks],
+        )
+        self.file_texts[file_path] = [chunk.page_content for chunk in chunks]
+        self.remaining_chunks[file_path] = len(chunks)
+        for chunk in chunks:
+            self.pending_chunks.append(chunk)
+            if len(self.pending_chunks) >= self.batch_size:
+                self._submit_batch()
+
+    def add_embedded_chunks(
+        self,
+        file_path: str,
+        entry: FileEntry,
+        embeddings: list,
+        documents: list[str],
+        metadatas: list[dict],
+    ):
+        """Store already embedded chunks of a file, for instance copied from another path."""
+        ids = [str(uuid.uuid4()) for _ in documents]
+        if documents:
+            self.vector_store._collection.add(
+                ids=ids,
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas,
+            )
+        self.repo_index.set_chunks(
+            file_path,
+            _chunk_entries(ids, documents, metadatas),
+            documents,
+            _language(metadatas),
+        )
+        self.repo_index.set_file(file_path, entry)
+
+    def flush(self):
+        """Embed and store every queued chunk."""
+        if self.pending_chunks:
+            self._submit_batch()
+        while self.in_flight:
+            self._write_oldest_batch()
+        self.repo_index.commit()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _submit_batch(self):
+        batch = self.pending_chunks
+        self.pending_chunks = []
+        future = self.executor.submit(
+            self.vector_store.embeddings.embed_documents,
+            [chunk.page_content for chunk in batch],
+        )
+        self.in_flight.append((future, batch))
+        while len(self.in_flight) > self.max_in_flight:
+            self._write_oldest_batch()
+
+    def _write_oldest_batch(self):
+        future, batch = self.in_flight.popleft()
+        self.vector_store._collection.add(
+            ids=[chunk.id for chunk in batch],
+            embeddings=future.result(),
+            documents=[chunk.page_content for chunk in batch],
+            metadatas=[chunk.metadata for chunk in batch],
+        )
+        for chunk in batch:
+            file_path = chunk.metadata["file_path"]
+            self.remaining_chunks[file_path] -= 1
+            if self.remaining_chunks[file_path] == 0:
+                del self.remaining_chunks[file_path]
+                self.repo_index.set_chunks(
+                    file_path,
+                    self.file_chunks.pop(file_path),
+                    self.file_texts.pop(file_path),
+                    chunk.metadata.get("language", ""),
+                )
+                self.repo_index.set_file(file_path, self.file_entries.pop(file_path))
+        self.repo_index.commit()
+
+
+def _chunk_entries(
+    ids: list[str], documents: list[str], metadatas: list[dict]
+) -> list[ChunkEntry]:
+    return [
+        ChunkEntry(
+            chunk_number=metadata["chunk_number"],
+            chunk_id=chunk_id,
+            start_index=metadata["start_index"],
+            length=len(document),
+        )
+        for chunk_id, document, metadata in zip(ids, documents, metadatas)
+    ]
+
+
+def _language(metadatas: list[dict]) -> str:
+    return metadatas[0].get("language", "") if metadatas else ""
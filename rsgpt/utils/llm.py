@@ -1,48 +1,91 @@
-from langchain_openai import ChatOpenAI
-from os import getenv, makedirs
 import logging
-from datetime import datetime
-from langchain.callbacks.base import BaseCallbackHandler
+import threading
+from os import getenv
+from langchain_core.callbacks import BaseCallbackHandler
 
-# Setup logging directory and file
-log_directory = ".rsgpt/log"
-makedirs(log_directory, exist_ok=True)
-log_filename = f"{log_directory}/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
-logging.basicConfig(
-    filename=log_filename,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+# Chat models built on first use, importing the OpenAI client takes most of the startup
+MODELS = {
+    "llm_base": "openai/gpt-4o-2024-11-20",
+    "llm_think": "deepseek/deepseek-r1",
+}
+
+_models_lock = threading.Lock()
+_models = {}
+_llm_cache = None
+logger = logging.getLogger(__name__)
+
+
+def configure_llm_cache(
+    cache_path: str | None, ttl_s: float | None = None, max_entries: int = 5000
+):
+    """
+    Cache the responses of the chat models in a SQLite database at cache_path.
+    Passing None disables the cache. Models already built are rebuilt on next use.
+    """
+    global _llm_cache
+    with _models_lock:
+        if cache_path is None:
+            _llm_cache = None
+        else:
+            from .llm_cache import SQLiteLLMCache
+
+            _llm_cache = SQLiteLLMCache(
+                cache_path, ttl_s=ttl_s, max_entries=max_entries
+            )
+        _models.clear()
+
+
+def llm_cache_stats() -> dict | None:
+    """Return the counters of the response cache, or None when it is disabled."""
+    return _llm_cache.stats() if _llm_cache is not None else None
+
+
+class _BufferString:
+    """Messages rendered as text only when the log record is written."""
+
+    def __init__(self, messages: list):
+        self.messages = messages
+
+    def __str__(self) -> str:
+        from langchain_core.messages import get_buffer_string
+
+        return get_buffer_string(self.messages)
 
 
 class InputDisplayCallbackHandler(BaseCallbackHandler):
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        for prompt in messages:
+            logger.info("--- INPUT SENT TO LLM ---\n%s", _BufferString(prompt))
+
     def on_llm_start(self, serialized, prompts, **kwargs):
-        logging.info("--- INPUT SENT TO LLM ---")
         for prompt in prompts:
-            logging.info(prompt)
-        logging.info("-------------------------")
+            logger.info("--- INPUT SENT TO LLM ---\n%s", prompt)
 
 
 class OutputDisplayCallbackHandler(BaseCallbackHandler):
     def on_llm_end(self, response, **kwargs):
-        logging.info("--- OUTPUT FROM LLM ---")
-        logging.info(response)
-        logging.info("-------------------------")
+        logger.info("--- OUTPUT FROM LLM ---\n%s", response)
 
 
 input_display_callback = InputDisplayCallbackHandler()
 output_display_callback = OutputDisplayCallbackHandler()
 
-llm_base = ChatOpenAI(
-    openai_api_key=getenv("OPENROUTER_API_KEY"),
-    openai_api_base="https://openrouter.ai/api/v1",
-    model_name="openai/gpt-4o-2024-11-20",
-    callbacks=[input_display_callback, output_display_callback],
-)
-
-llm_think = ChatOpenAI(
-    openai_api_key=getenv("OPENROUTER_API_KEY"),
-    openai_api_base="https://openrouter.ai/api/v1",
-    model_name="deepseek/deepseek-r1",
-    callbacks=[input_display_callback, output_display_callback],
-)
+
+def __getattr__(name: str):
+    """Build `llm_base` and `llm_think` when they are first imported."""
+    if name not in MODELS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _models_lock:
+        if name not in _models:
+            from langchain_openai import ChatOpenAI
+
+            _models[name] = ChatOpenAI(
+                openai_api_key=getenv("OPENROUTER_API_KEY"),
+                openai_api_base="https://openrouter.ai/api/v1",
+                model_name=MODELS[name],
+                callbacks=[input_display_callback, output_display_callback],
+                cache=_llm_cache,
+                # Report token usage when streaming too, for the tracing spans
+                stream_usage=True,
+            )
+        return _models[name]
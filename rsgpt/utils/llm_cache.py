@@ -0,0 +1,71 @@
+import hashlib
+import json
+from typing import Any, Optional
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from .sqlite_cache import SQLiteLRUCache
+
+# Fields of serialized messages left out of the cache keys
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata")
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LLM response cache stored in a SQLite database.
+
+    LangChain looks responses up by the serialized prompt messages and by a string
+    describing the model, its parameters and its bound tools. Message ids and metadata are
+    left out of the key, so a response is reused for the same call made again by a graph.
+    Entries expire after `ttl_s` seconds and the cache keeps at most `max_entries`
+    responses, evicting the least recently used ones.
+    """
+
+    def __init__(self, path: str, ttl_s: float | None = None, max_entries: int = 5000):
+        self.cache = SQLiteLRUCache(path, max_entries, ttl_s)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        response = self.cache.get_many([key]).get(key)
+        if response is None:
+            return None
+        return loads(response, allowed_objects="core", secrets_from_env=False)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        key = self._key(prompt, llm_string)
+        self.cache.put_many({key: dumps(list(return_val))})
+
+    def clear(self, **kwargs: Any):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(
+            f"{llm_string}\0{normalize_prompt(prompt)}".encode("utf-8", "surrogatepass")
+        ).hexdigest()
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Drop the fields of the serialized messages which change between identical calls.
+
+    LangGraph gives every message of a state a random id, and responses carry their
+    metadata and token usage, so the raw prompt of a graph node never repeats.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+    for message in messages:
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if not isinstance(kwargs, dict):
+            continue
+        for field in VOLATILE_MESSAGE_FIELDS:
+            kwargs.pop(field, None)
+        if kwargs.get("type") == "ai":
+            kwargs.pop("usage_metadata", None)
+    return json.dumps(messages, sort_keys=True)
@@ -0,0 +1,186 @@
+import codecs
+import os
+import signal
+import subprocess
+import sys
+import threading
+from collections import deque
+from typing import TextIO
+
+READ_BLOCK_SIZE = 65536
+# Seconds given to a timed out command to exit after SIGTERM before it is killed
+TERMINATE_GRACE_PERIOD = 5
+
+
+class BoundedOutput:
+    """
+    Collect the output of a command, keeping only its beginning and its end.
+    Both halves share the character budget, the middle is replaced by a marker.
+    """
+
+    def __init__(self, max_chars: int):
+        self.head_budget = max_chars // 2
+        self.tail_budget = max_chars - self.head_budget
+        self.head: list[str] = []
+        self.head_size = 0
+        self.tail: deque[str] = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def append(self, text: str):
+        if self.head_size < self.head_budget:
+            kept = text[: self.head_budget - self.head_size]
+            self.head.append(kept)
+            self.head_size += len(kept)
+            text = text[len(kept) :]
+        if not text:
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.tail_budget:
+            excess = self.tail_size - self.tail_budget
+            first = self.tail[0]
+            if len(first) <= excess:
+                self.tail.popleft()
+                self.tail_size -= len(first)
+                self.dropped += len(first)
+            else:
+                self.tail[0] = first[excess:]
+                self.tail_size -= excess
+                self.dropped += excess
+
+    def getvalue(self) -> str:
+        head = "".join(self.head)
+        tail = "".join(self.tail)
+        if self.dropped:
+            return f"{head}\n[... {self.dropped} characters truncated ...]\n{tail}"
+        return head + tail
+
+
+def _limit_resources(
+    command: str | list[str],
+    shell: bool,
+    memory_limit_mb: int | None,
+    cpu_limit_s: int | None,
+) -> list[str]:
+    """
+    Wrap a command in a shell applying resource limits with ulimit before running it.
+    Unlike a preexec_fn, this is safe to start from a multithreaded process.
+    """
+    limits = []
+    if memory_limit_mb:
+        limits.append(f"ulimit -v {int(memory_limit_mb) * 1024}")
+    if cpu_limit_s:
+        limits.append(f"ulimit -t {int(cpu_limit_s)}")
+    arguments = ["/bin/sh", "-c", command] if shell else list(command)
+    # The command is passed as arguments, so it never needs quoting
+    return ["/bin/sh", "-c", " && ".join(limits) + ' && exec "$@"', "sh", *arguments]
+
+
+def _read_stream(stream, output: BoundedOutput, console: TextIO | None):
+    # Read by blocks rather than lines so a huge line cannot exhaust memory
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for block in iter(lambda: stream.read1(READ_BLOCK_SIZE), b""):
+        text = decoder.decode(block)
+        output.append(text)
+        if console is not None:
+            console.write(text)
+            console.flush()
+    output.append(decoder.decode(b"", final=True))
+    stream.close()
+
+
+def _stop_process(process: subprocess.Popen):
+    """Terminate a process and its children, killing them if they do not exit."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (AttributeError, ProcessLookupError):
+        process.terminate()
+    try:
+        process.wait(timeout=TERMINATE_GRACE_PERIOD)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError):
+            process.kill()
+        process.wait()
+
+
+def run_command(
+    command: str | list[str],
+    cwd: str,
+    shell: bool = False,
+    timeout: float | None = None,
+    max_output_chars: int = 20000,
+    memory_limit_mb: int | None = None,
+    cpu_limit_s: int | None = None,
+    stream: bool = True,
+) -> dict:
+    """
+    Run a command while streaming its output, with a timeout and bounded memory.
+
+    Args:
+        command (str | list[str]): Command to run, a string when shell is True.
+        cwd (str): Working directory of the command.
+        shell (bool): Whether to run the command through the shell.
+        timeout (float | None): Seconds after which the command and its children are stopped.
+        max_output_chars (int): Characters kept from each of stdout and stderr, the middle
+            of longer outputs is truncated.
+        memory_limit_mb (int | None): Address space limit of the command, ignored on
+            Windows.
+        cpu_limit_s (int | None): CPU time limit of the command, ignored on Windows.
+        stream (bool): Whether to echo the output lines to the console as they arrive.
+
+    Returns:
+        dict: The decoded stdout and stderr, the return code and whether the command timed out.
+    """
+    if os.name == "posix" and (memory_limit_mb or cpu_limit_s):
+        if isinstance(command, str) and not shell:
+            command = [command]
+        command = _limit_resources(command, shell, memory_limit_mb, cpu_limit_s)
+        shell = False
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        shell=shell,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=os.name == "posix",
+    )
+    stdout = BoundedOutput(max_output_chars)
+    stderr = BoundedOutput(max_output_chars)
+    readers = [
+        threading.Thread(
+            target=_read_stream,
+            args=(process.stdout, stdout, sys.stdout if stream else None),
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_read_stream,
+            args=(process.stderr, stderr, sys.stderr if stream else None),
+            daemon=True,
+        ),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _stop_process(process)
+    for reader in readers:
+        # Background children may keep the pipes open after the command exited
+        reader.join(timeout=1)
+
+    stderr_value = stderr.getvalue()
+    if timed_out:
+        stderr_value += f"\nCommand timed out after {timeout} seconds and was stopped."
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr_value,
+        "returncode": process.returncode,
+        "timed_out": timed_out,
+    }
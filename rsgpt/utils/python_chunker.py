@@ -0,0 +1,221 @@
+import ast
+import re
+from dataclasses import dataclass
+
+# Size in characters above which a definition is split into smaller chunks
+PYTHON_CHUNK_CHARS = 4000
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_LINE_END = re.compile(r"\r\n|\r|\n")
+
+
+@dataclass
+class Symbol:
+    """Definition of a function, method or class in a Python file."""
+
+    qualified_name: str
+    name: str
+    kind: str
+    start_line: int
+    end_line: int
+
+
+@dataclass
+class CodeChunk:
+    """Range of lines of a Python file, 1-based and inclusive, forming one chunk."""
+
+    start_line: int
+    end_line: int
+    symbol: str
+    kind: str
+
+
+def line_offsets(source: str) -> list[int]:
+    """Return the offset of the start of each line, and the length of the source last."""
+    return [0] + [match.end() for match in _LINE_END.finditer(source)] + [len(source)]
+
+
+def _kind(node: ast.AST, in_class: bool) -> str:
+    if isinstance(node, ast.ClassDef):
+        return "class"
+    return "method" if in_class else "function"
+
+
+def _definition_start(node: ast.AST, lines: list[str], lower_bound: int) -> int:
+    """Return the first line of a definition, its decorators and comments above it."""
+    start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+    while start - 1 > lower_bound and lines[start - 2].lstrip().startswith("#"):
+        start -= 1
+    return start
+
+
+def extract_symbols(tree: ast.Module, lines: list[str]) -> list[Symbol]:
+    """Return every function, method and class defined in a module, nested ones included."""
+    symbols = []
+
+    def visit(body: list[ast.stmt], prefix: str, in_class: bool):
+        for node in body:
+            if isinstance(node, _DEFINITIONS):
+                qualified_name = prefix + node.name
+                symbols.append(
+                    Symbol(
+                        qualified_name=qualified_name,
+                        name=node.name,
+                        kind=_kind(node, in_class),
+                        start_line=_definition_start(node, lines, 0),
+                        end_line=node.end_lineno,
+                    )
+                )
+                visit(
+                    node.body,
+                    qualified_name + ".",
+                    isinstance(node, ast.ClassDef),
+                )
+            else:
+                # Definitions under if, try or with blocks are still reachable by name
+                for field in ("body", "orelse", "finalbody", "handlers"):
+                    visit(getattr(node, field, []), prefix, in_class)
+
+    visit(tree.body, "", False)
+    return symbols
+
+
+def _split_lines(
+    chunk: CodeChunk, line_starts: list[int], max_chars: int
+) -> list[CodeChunk]:
+    """Split a chunk into consecutive ranges of whole lines of at most max_chars."""
+    parts = []
+    start = chunk.start_line
+    for line in range(chunk.start_line, chunk.end_line + 1):
+        if line > start and line_starts[line] - line_starts[start - 1] > max_chars:
+            parts.append(CodeChunk(start, line - 1, chunk.symbol, chunk.kind))
+            start = line
+    parts.append(CodeChunk(start, chunk.end_line, chunk.symbol, chunk.kind))
+    return parts
+
+
+def _chunk_body(
+    body: list[ast.stmt],
+    outer: CodeChunk,
+    prefix: str,
+    in_class: bool,
+    lines: list[str],
+    line_starts: list[int],
+    max_chars: int,
+) -> list[CodeChunk]:
+    """
+    Cover the lines of the outer chunk with one chunk per definition of body, and chunks
+    of the other statements attributed to the outer symbol.
+    """
+    chunks = []
+    line = outer.start_line
+    for node in body:
+        if not isinstance(node, _DEFINITIONS):
+            continue
+        start = _definition_start(node, lines, line - 1)
+        if start > line:
+            chunks.extend(
+                _split_lines(
+                    CodeChunk(line, start - 1, outer.symbol, outer.kind),
+                    line_starts,
+                    max_chars,
+                )
+            )
+        chunk = CodeChunk(
+            start, node.end_lineno, prefix + node.name, _kind(node, in_class)
+        )
+        chunks.extend(_fit_chunk(chunk, node, lines, line_starts, max_chars))
+        line = node.end_lineno + 1
+    if line <= outer.end_line:
+        chunks.extend(
+            _split_lines(
+                CodeChunk(line, outer.end_line, outer.symbol, outer.kind),
+                line_starts,
+                max_chars,
+            )
+        )
+
+    # Blank lines between definitions do not make chunks of their own
+    merged = []
+    for chunk in chunks:
+        if not merged:
+            merged.append(chunk)
+        elif _is_blank(chunk, lines):
+            merged[-1].end_line = chunk.end_line
+        elif _is_blank(merged[-1], lines):
+            chunk.start_line = merged[-1].start_line
+            merged[-1] = chunk
+        else:
+            merged.append(chunk)
+    return merged
+
+
+def _is_blank(chunk: CodeChunk, lines: list[str]) -> bool:
+    return not "".join(lines[chunk.start_line - 1 : chunk.end_line]).strip()
+
+
+def _fit_chunk(
+    chunk: CodeChunk,
+    node: ast.AST,
+    lines: list[str],
+    line_starts: list[int],
+    max_chars: int,
+) -> list[CodeChunk]:
+    """Split an oversized definition, classes by method, other code by lines."""
+    size = line_starts[chunk.end_line] - line_starts[chunk.start_line - 1]
+    if size <= max_chars:
+        return [chunk]
+    if isinstance(node, ast.ClassDef) and any(
+        isinstance(child, _DEFINITIONS) for child in node.body
+    ):
+        return _chunk_body(
+            node.body,
+            chunk,
+            chunk.symbol + ".",
+            True,
+            lines,
+            line_starts,
+            max_chars,
+        )
+    return _split_lines(chunk, line_starts, max_chars)
+
+
+def split_python(
+    source: str, max_chars: int = PYTHON_CHUNK_CHARS, tree: ast.Module | None = None
+) -> tuple[list[tuple[int, int, CodeChunk]], list[Symbol]] | None:
+    """
+    Split Python source into one chunk per top-level function or class.
+
+    Statements between definitions form their own chunks. Definitions larger than
+    max_chars are split further, classes into one chunk per method, and anything else
+    into ranges of whole lines. Chunks are contiguous and cover the whole source.
+
+    Args:
+        source (str): Content of the Python file.
+        max_chars (int): Size above which a chunk is split.
+        tree (ast.Module | None): The source already parsed, if available.
+
+    Returns:
+        tuple | None: The start and end offsets of each chunk in the source with its line
+            range and symbol, and the symbols defined in the source. None when the source
+            cannot be parsed.
+    """
+    if tree is None:
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return None
+    line_starts = line_offsets(source)
+    lines = [source[start:end] for start, end in zip(line_starts, line_starts[1:])]
+    # A final line ending leaves an empty last line, which is not a line of the source
+    if len(lines) > 1 and lines[-1] == "":
+        lines.pop()
+        line_starts.pop()
+    if not "".join(lines).strip():
+        return [], []
+    module = CodeChunk(1, len(lines), "", "module")
+    chunks = _chunk_body(tree.body, module, "", False, lines, line_starts, max_chars)
+    return [
+        (line_starts[chunk.start_line - 1], line_starts[chunk.end_line], chunk)
+        for chunk in chunks
+    ], extract_symbols(tree, lines)
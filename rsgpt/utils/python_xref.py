@@ -0,0 +1,120 @@
+import ast
+from dataclasses import dataclass, field
+from .python_chunker import Symbol
+
+
+@dataclass
+class Reference:
+    """Use of a name, or of an attribute, in a Python file."""
+
+    name: str
+    line: int
+    # Qualified name of the function or class using it, empty at module level
+    symbol: str
+
+
+@dataclass
+class Import:
+    """Name imported by a Python file, modules being resolved to absolute names."""
+
+    module: str
+    name: str
+    line: int
+
+
+@dataclass
+class CodeIndex:
+    """Definitions, references and imports of a Python file."""
+
+    symbols: list[Symbol] = field(default_factory=list)
+    references: list[Reference] = field(default_factory=list)
+    imports: list[Import] = field(default_factory=list)
+
+
+def module_name(file_path: str) -> str:
+    """Return the dotted module name of a Python file from its path in the repository."""
+    parts = file_path.removesuffix(".py").split("/")
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts)
+
+
+def _resolve(module: str | None, level: int, file_path: str) -> str:
+    """Return the absolute name of the module of a possibly relative import."""
+    if level == 0:
+        return module or ""
+    package = module_name(file_path).split(".")
+    if not file_path.endswith("__init__.py"):
+        package.pop()
+    base = package[: len(package) - (level - 1)] if level > 1 else package
+    return ".".join(base + ([module] if module else []))
+
+
+class _ReferenceCollector(ast.NodeVisitor):
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.scope: list[str] = []
+        self.references: dict[tuple[str, int, str], Reference] = {}
+        self.imports: list[Import] = []
+
+    def _add(self, name: str, line: int):
+        symbol = ".".join(self.scope)
+        self.references.setdefault((name, line, symbol), Reference(name, line, symbol))
+
+    def _visit_definition(self, node):
+        # Decorators, default values and bases are evaluated in the enclosing scope
+        for child in node.decorator_list:
+            self.visit(child)
+        if isinstance(node, ast.ClassDef):
+            for child in node.bases + node.keywords:
+                self.visit(child)
+        else:
+            self.visit(node.args)
+            if node.returns:
+                self.visit(node.returns)
+        self.scope.append(node.name)
+        for child in node.body:
+            self.visit(child)
+        self.scope.pop()
+
+    visit_FunctionDef = _visit_definition
+    visit_AsyncFunctionDef = _visit_definition
+    visit_ClassDef = _visit_definition
+
+    def visit_Name(self, node: ast.Name):
+        if not isinstance(node.ctx, ast.Store):
+            self._add(node.id, node.lineno)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if not isinstance(node.ctx, ast.Store):
+            self._add(node.attr, node.end_lineno or node.lineno)
+        self.visit(node.value)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.imports.append(Import(alias.name, "", node.lineno))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        module = _resolve(node.module, node.level, self.file_path)
+        for alias in node.names:
+            self.imports.append(Import(module, alias.name, node.lineno))
+
+
+def extract_code_index(
+    tree: ast.Module, file_path: str, symbols: list[Symbol]
+) -> CodeIndex:
+    """
+    Collect the references and imports of a parsed Python file.
+
+    References are the names read and the attributes accessed, with the definition they
+    appear in. Names are not resolved, `self.run()` and `run()` both reference `run`.
+
+    Args:
+        tree (ast.Module): Parsed content of the file.
+        file_path (str): Path of the file from the repository's root, to resolve
+            relative imports.
+        symbols (list[Symbol]): Definitions of the file.
+    """
+    collector = _ReferenceCollector(file_path)
+    collector.visit(tree)
+    return CodeIndex(symbols, list(collector.references.values()), collector.imports)
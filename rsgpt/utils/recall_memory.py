@@ -0,0 +1,231 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, writes are then only locked in-process
+    fcntl = None
+
+RECORDS_FILE = "memories.jsonl"
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+LOCK_FILE = "lock"
+
+
+class RecallMemoryStore:
+    """
+    Append-only recall memory store persisted in a directory.
+
+    Each memory is appended as one JSON line to `memories.jsonl` and its normalized
+    embedding as one float32 row to `vectors.f32`. Saving a memory therefore costs a
+    single append whatever the size of the store, and searching memory-maps the vector
+    matrix instead of deserializing it. Vectors are written and synced before their
+    record, and a store is truncated back to its last complete record when opened, so
+    a crash in the middle of a write never corrupts it.
+    """
+
+    def __init__(self, path: str, embeddings: Embeddings):
+        self.path = path
+        self.embeddings = embeddings
+        self.lock = threading.Lock()
+        self.dimension: int | None = None
+        self.ids: list[str] = []
+        self.texts: list[str] = []
+        self.records_offset = 0
+        self.vectors: np.memmap | None = None
+        if os.path.isfile(path):
+            self._migrate_legacy_store()
+        os.makedirs(path, exist_ok=True)
+        with self._file_lock():
+            self._load_meta()
+            self._recover()
+            self._read_new_records()
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self.texts)
+
+    def add_texts(self, texts: list[str]) -> list[str]:
+        """Embed and append memories to the store. Returns their ids."""
+        vectors = self._normalize(np.asarray(self.embeddings.embed_documents(texts)))
+        return self._append([str(uuid.uuid4()) for _ in texts], texts, vectors)
+
+    def similarity_search(self, query: str, k: int = 3) -> list[str]:
+        """Return the content of the k memories closest to the query."""
+        self._refresh()
+        if not self.texts:
+            return []
+        query_vector = self._normalize(
+            np.asarray([self.embeddings.embed_query(query)])
+        )[0]
+        with self.lock:
+            vectors = self._vector_matrix()
+            scores = vectors @ query_vector
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [self.texts[index] for index in best]
+
+    def _append(self, ids: list[str], texts: list[str], vectors: np.ndarray):
+        with self.lock, self._file_lock():
+            if self.dimension is None:
+                self._write_meta(vectors.shape[1])
+            # Another process may have appended memories since our last read, or
+            # crashed in the middle of a write
+            self._recover()
+            self._read_new_records()
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            lines = "".join(
+                json.dumps({"id": memory_id, "text": text}) + "\n"
+                for memory_id, text in zip(ids, texts)
+            )
+            with open(self._file(RECORDS_FILE), "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._read_new_records()
+        return ids
+
+    def _refresh(self):
+        """Pick up memories appended by other processes."""
+        records_path = self._file(RECORDS_FILE)
+        if os.path.exists(records_path) and (
+            os.path.getsize(records_path) != self.records_offset
+        ):
+            with self.lock:
+                self._read_new_records()
+
+    def _read_new_records(self):
+        records_path = self._file(RECORDS_FILE)
+        if not os.path.exists(records_path):
+            return
+        if self.dimension is None:
+            self._load_meta()
+        with open(records_path, "rb") as f:
+            f.seek(self.records_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.texts.append(record["text"])
+                self.records_offset += len(line)
+
+    def _vector_matrix(self) -> np.ndarray:
+        count = len(self.texts)
+        if self.vectors is None or self.vectors.shape[0] != count:
+            self.vectors = np.memmap(
+                self._file(VECTORS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(count, self.dimension),
+            )
+        return self.vectors
+
+    def _recover(self):
+        """
+        Truncate the store to its last memory having both a record and a vector.
+        Must be called with the file lock held. Records already read are not checked
+        again, unless vectors are missing for some of them.
+        """
+        records_path = self._file(RECORDS_FILE)
+        vectors_path = self._file(VECTORS_FILE)
+        if self.dimension is None:
+            return
+        row_size = self.dimension * np.dtype(np.float32).itemsize
+        vector_count = (
+            os.path.getsize(vectors_path) // row_size
+            if os.path.exists(vectors_path)
+            else 0
+        )
+        if vector_count < len(self.texts):
+            self.ids, self.texts, self.records_offset = [], [], 0
+            self.vectors = None
+        record_count, records_size = len(self.texts), self.records_offset
+        if os.path.exists(records_path):
+            with open(records_path, "rb") as f:
+                f.seek(records_size)
+                for line in f:
+                    if record_count == vector_count or not line.endswith(b"\n"):
+                        break
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        break
+                    record_count += 1
+                    records_size += len(line)
+            if os.path.getsize(records_path) != records_size:
+                os.truncate(records_path, records_size)
+        if os.path.exists(vectors_path):
+            if os.path.getsize(vectors_path) != record_count * row_size:
+                os.truncate(vectors_path, record_count * row_size)
+
+    def _load_meta(self):
+        meta_path = self._file(META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                self.dimension = json.load(f)["dimension"]
+
+    def _write_meta(self, dimension: int):
+        meta_path = self._file(META_FILE)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"dimension": dimension}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(meta_path + ".tmp", meta_path)
+        self.dimension = dimension
+
+    def _migrate_legacy_store(self):
+        """Convert a store dumped by InMemoryVectorStore into an append-only store."""
+        with open(self.path, "r") as f:
+            legacy_store = json.load(f)
+        legacy_path = self.path + ".legacy.json"
+        shutil.move(self.path, legacy_path)
+        os.makedirs(self.path)
+        if legacy_store:
+            records = list(legacy_store.values())
+            self._append(
+                [record["id"] for record in records],
+                [record["text"] for record in records],
+                self._normalize(np.asarray([record["vector"] for record in records])),
+            )
+        print(f"Migrated recall memories to {self.path}, backup in {legacy_path}")
+
+    def _file_lock(self):
+        return _FileLock(self._file(LOCK_FILE))
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (vectors / norms).astype(np.float32)
+
+
+class _FileLock:
+    """Exclusive lock on a file shared by the processes using the same store."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *_):
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
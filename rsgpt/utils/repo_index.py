@@ -0,0 +1,361 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from .python_chunker import Symbol
+from .python_xref import CodeIndex, Import, Reference
+
+# Bump when the layout changes, older indexes are then rebuilt from scratch
+SCHEMA_VERSION = 6
+SCHEMA = [
+    "CREATE TABLE files ("
+    "file_path TEXT PRIMARY KEY, blob_sha TEXT NOT NULL, "
+    "mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL)",
+    "CREATE TABLE chunks ("
+    "id INTEGER PRIMARY KEY, file_path TEXT NOT NULL, chunk_number INTEGER NOT NULL, "
+    "chunk_id TEXT NOT NULL, start_index INTEGER NOT NULL, length INTEGER NOT NULL, "
+    "UNIQUE (file_path, chunk_number))",
+    # Full text index of the chunks, its rowid is the id of the chunk in `chunks`
+    "CREATE VIRTUAL TABLE chunk_text USING fts5("
+    "content, file_path UNINDEXED, language UNINDEXED)",
+    # Functions, methods and classes defined by the Python files
+    "CREATE TABLE symbols ("
+    "file_path TEXT NOT NULL, qualified_name TEXT NOT NULL, name TEXT NOT NULL, "
+    "kind TEXT NOT NULL, start_line INTEGER NOT NULL, end_line INTEGER NOT NULL)",
+    "CREATE INDEX symbols_name ON symbols (name)",
+    "CREATE INDEX symbols_file_path ON symbols (file_path)",
+    # Names used by the Python files, and the names they import
+    "CREATE TABLE name_references ("
+    "file_path TEXT NOT NULL, name TEXT NOT NULL, line INTEGER NOT NULL, "
+    "symbol TEXT NOT NULL)",
+    "CREATE INDEX name_references_name ON name_references (name)",
+    "CREATE INDEX name_references_file_path ON name_references (file_path)",
+    "CREATE TABLE imports ("
+    "file_path TEXT NOT NULL, module TEXT NOT NULL, name TEXT NOT NULL, "
+    "line INTEGER NOT NULL)",
+    "CREATE INDEX imports_module ON imports (module)",
+    "CREATE INDEX imports_name ON imports (name)",
+    "CREATE INDEX imports_file_path ON imports (file_path)",
+    # Incremented by every commit changing the index, to invalidate derived caches
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "INSERT INTO meta VALUES ('generation', 0)",
+]
+
+
+@dataclass
+class FileEntry:
+    """State of a repository file as last stored in the vector store."""
+
+    blob_sha: str
+    mtime_ns: int
+    size: int
+
+
+@dataclass
+class ChunkEntry:
+    """Location of a chunk in its file and in the vector store."""
+
+    chunk_number: int
+    chunk_id: str
+    start_index: int
+    length: int
+
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    Compute the git blob SHA-1 of a file content, as reported by `git ls-files -s`.
+    """
+    header = f"blob {len(data)}\0".encode("utf-8")
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class RepoIndex:
+    """
+    Persistent manifest of the files stored in the repository vector store.
+
+    The manifest lives next to the Chroma collection in `.rsgpt/chroma_db/index.sqlite3`
+    so that both are always wiped together. Besides the state of each file, it maps every
+    chunk of a file to its id in the collection and its character range in the file, and
+    keeps a full text index of the chunks for lexical search.
+    """
+
+    def __init__(self, repo_path: str):
+        self.path = os.path.join(repo_path, ".rsgpt", "chroma_db", "index.sqlite3")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.changed = False
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._create_schema()
+
+    def _create_schema(self):
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # Virtual tables first, dropping them also drops their shadow tables
+        tables = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "ORDER BY sql LIKE 'CREATE VIRTUAL TABLE%' DESC"
+        ).fetchall()
+        for (table,) in tables:
+            self.connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        # Generations restart from 0, the creation time tells rebuilt indexes apart
+        self.connection.execute(
+            "INSERT INTO meta VALUES ('created', ?)", (time.time_ns(),)
+        )
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.commit()
+
+    def get_files(self) -> dict[str, FileEntry]:
+        """Return the manifest entry of every indexed file."""
+        rows = self.connection.execute(
+            "SELECT file_path, blob_sha, mtime_ns, size FROM files"
+        )
+        return {row[0]: FileEntry(*row[1:]) for row in rows}
+
+    def get_file(self, file_path: str) -> FileEntry | None:
+        row = self.connection.execute(
+            "SELECT blob_sha, mtime_ns, size FROM files WHERE file_path = ?",
+            (file_path,),
+        ).fetchone()
+        return FileEntry(*row) if row else None
+
+    def set_file(self, file_path: str, entry: FileEntry):
+        self.changed = True
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (file_path, entry.blob_sha, entry.mtime_ns, entry.size),
+        )
+
+    def remove_file(self, file_path: str):
+        self.changed = True
+        self.connection.execute("DELETE FROM files WHERE file_path = ?", (file_path,))
+        self._remove_chunks(file_path)
+        self.set_code_index(file_path, None)
+
+    def set_code_index(self, file_path: str, code_index: CodeIndex | None):
+        """Replace the definitions, references and imports of a file."""
+        self.changed = True
+        for table in ("symbols", "name_references", "imports"):
+            self.connection.execute(
+                f"DELETE FROM {table} WHERE file_path = ?", (file_path,)
+            )
+        if code_index is None:
+            return
+        self.connection.executemany(
+            "INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    file_path,
+                    symbol.qualified_name,
+                    symbol.name,
+                    symbol.kind,
+                    symbol.start_line,
+                    symbol.end_line,
+                )
+                for symbol in code_index.symbols
+            ],
+        )
+        self.connection.executemany(
+            "INSERT INTO name_references VALUES (?, ?, ?, ?)",
+            [
+                (file_path, reference.name, reference.line, reference.symbol)
+                for reference in code_index.references
+            ],
+        )
+        self.connection.executemany(
+            "INSERT INTO imports VALUES (?, ?, ?, ?)",
+            [
+                (file_path, imported.module, imported.name, imported.line)
+                for imported in code_index.imports
+            ],
+        )
+
+    def find_symbols(self, name: str, limit: int = 20) -> list[tuple[str, Symbol]]:
+        """
+        Return the file path and the definition of the symbols matching a name.
+
+        Args:
+            name (str): Name or dotted suffix of the qualified name of the symbol, for
+                instance `agent`, `RepoWorker.agent` or `graphs.RepoWorker.agent`.
+            limit (int): Maximum number of symbols returned.
+        """
+        parts = name.strip().split(".")
+        rows = self.connection.execute(
+            "SELECT file_path, qualified_name, name, kind, start_line, end_line "
+            "FROM symbols WHERE name = ? ORDER BY file_path, start_line",
+            (parts[-1],),
+        )
+        matches = []
+        for file_path, *fields in rows:
+            symbol = Symbol(*fields)
+            # Leading parts may also name the module, as in rsgpt.tools.search_repo_content
+            qualified_parts = file_path.removesuffix(".py").replace("/", ".").split(
+                "."
+            ) + symbol.qualified_name.split(".")
+            if qualified_parts[-len(parts) :] == parts:
+                matches.append((file_path, symbol))
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def find_references(
+        self, name: str, limit: int = 100
+    ) -> list[tuple[str, Reference]]:
+        """Return the file path and the location of the uses of a name."""
+        rows = self.connection.execute(
+            "SELECT file_path, name, line, symbol FROM name_references "
+            "WHERE name = ? ORDER BY file_path, line LIMIT ?",
+            (name, limit),
+        )
+        return [(row[0], Reference(*row[1:])) for row in rows]
+
+    def get_imports(self, file_path: str) -> list[Import]:
+        """Return the names imported by a file."""
+        rows = self.connection.execute(
+            "SELECT module, name, line FROM imports WHERE file_path = ? ORDER BY line",
+            (file_path,),
+        )
+        return [Import(*row) for row in rows]
+
+    def find_name_imports(self, name: str) -> list[tuple[str, Import]]:
+        """Return the file path and the import statement of the files importing a name."""
+        rows = self.connection.execute(
+            "SELECT file_path, module, name, line FROM imports WHERE name = ? "
+            "ORDER BY file_path, line",
+            (name,),
+        )
+        return [(row[0], Import(*row[1:])) for row in rows]
+
+    def find_importers(self, module: str, limit: int = 100) -> list[str]:
+        """
+        Return the paths of the files importing a module, either directly or by importing
+        a name from its package.
+        """
+        package, _, name = module.rpartition(".")
+        escaped = re.sub(r"([\\%_])", r"\\\1", module)
+        rows = self.connection.execute(
+            "SELECT DISTINCT file_path FROM imports "
+            "WHERE module = ? OR module LIKE ? ESCAPE '\\' OR (module = ? AND name = ?) "
+            "ORDER BY file_path LIMIT ?",
+            (module, escaped + ".%", package, name, limit),
+        )
+        return [row[0] for row in rows]
+
+    def get_chunk_numbers(self, file_path: str, start: int, end: int) -> list[int]:
+        """Return the numbers of the chunks overlapping a character range of a file."""
+        rows = self.connection.execute(
+            "SELECT chunk_number FROM chunks WHERE file_path = ? "
+            "AND start_index < ? AND start_index + length > ? ORDER BY chunk_number",
+            (file_path, end, start),
+        )
+        return [row[0] for row in rows]
+
+    def set_chunks(
+        self,
+        file_path: str,
+        chunks: list[ChunkEntry],
+        texts: list[str],
+        language: str = "",
+    ):
+        """Replace the chunk locations of a file and their full text index."""
+        self.changed = True
+        self._remove_chunks(file_path)
+        for chunk, text in zip(chunks, texts):
+            cursor = self.connection.execute(
+                "INSERT INTO chunks (file_path, chunk_number, chunk_id, start_index, "
+                "length) VALUES (?, ?, ?, ?, ?)",
+                (
+                    file_path,
+                    chunk.chunk_number,
+                    chunk.chunk_id,
+                    chunk.start_index,
+                    chunk.length,
+                ),
+            )
+            self.connection.execute(
+                "INSERT INTO chunk_text (rowid, content, file_path, language) "
+                "VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, text, file_path, language),
+            )
+
+    def _remove_chunks(self, file_path: str):
+        self.connection.execute(
+            "DELETE FROM chunk_text WHERE rowid IN "
+            "(SELECT id FROM chunks WHERE file_path = ?)",
+            (file_path,),
+        )
+        self.connection.execute("DELETE FROM chunks WHERE file_path = ?", (file_path,))
+
+    def get_chunks(
+        self, file_path: str, start_chunk: int = 0, stop_chunk: int | None = None
+    ) -> list[ChunkEntry]:
+        """Return the chunks of a file numbered from start_chunk to stop_chunk included."""
+        if stop_chunk is None:
+            stop_chunk = start_chunk
+        rows = self.connection.execute(
+            "SELECT chunk_number, chunk_id, start_index, length FROM chunks "
+            "WHERE file_path = ? AND chunk_number BETWEEN ? AND ? "
+            "ORDER BY chunk_number",
+            (file_path, start_chunk, stop_chunk),
+        )
+        return [ChunkEntry(*row) for row in rows]
+
+    def search_text(
+        self,
+        match_query: str,
+        limit: int,
+        path_prefix: str = "",
+        language: str = "",
+    ) -> list[str]:
+        """
+        Return the ids of the chunks matching an FTS5 query, best BM25 score first.
+
+        Args:
+            match_query (str): FTS5 query matched against the chunk contents.
+            limit (int): Maximum number of chunk ids returned.
+            path_prefix (str): Only return chunks of files whose path starts with it.
+            language (str): Only return chunks of files in this language.
+        """
+        conditions = ["chunk_text MATCH ?"]
+        parameters = [match_query]
+        if path_prefix:
+            escaped = re.sub(r"([\\%_])", r"\\\1", path_prefix)
+            conditions.append("chunk_text.file_path LIKE ? ESCAPE '\\'")
+            parameters.append(escaped + "%")
+        if language:
+            conditions.append("chunk_text.language = ?")
+            parameters.append(language)
+        rows = self.connection.execute(
+            "SELECT chunks.chunk_id FROM chunk_text "
+            "JOIN chunks ON chunks.id = chunk_text.rowid "
+            f"WHERE {' AND '.join(conditions)} ORDER BY chunk_text.rank LIMIT ?",
+            (*parameters, limit),
+        )
+        return [row[0] for row in rows]
+
+    def count_chunks(self, file_path: str) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM chunks WHERE file_path = ?", (file_path,)
+        ).fetchone()[0]
+
+    def get_revision(self) -> tuple[int, int, int]:
+        """
+        Return an identifier of the content of the index, which changes with every commit
+        changing the index and when the index is rebuilt.
+        """
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        return SCHEMA_VERSION, meta.get("created", 0), meta["generation"]
+
+    def commit(self):
+        if self.changed:
+            self.connection.execute(
+                "UPDATE meta SET value = value + 1 WHERE key = 'generation'"
+            )
+            self.changed = False
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
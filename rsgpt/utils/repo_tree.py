@@ -0,0 +1,113 @@
+import os
+from functools import lru_cache
+from .repo_index import RepoIndex
+
+# Number of rendered trees kept, for different arguments or repositories
+TREE_CACHE_SIZE = 32
+
+
+def _build_tree(file_paths: list[str]) -> dict:
+    """Nest file paths into directories, files map to None."""
+    tree = {}
+    for file_path in file_paths:
+        node = tree
+        *directories, file_name = file_path.split("/")
+        for directory in directories:
+            node = node.setdefault(directory, {})
+        node[file_name] = None
+    return tree
+
+
+def _count_files(node: dict) -> int:
+    return sum(1 if child is None else _count_files(child) for child in node.values())
+
+
+def render_tree(
+    file_paths: list[str], path: str = "", max_depth: int = 3, max_entries: int = 500
+) -> str:
+    """
+    Render the files under path as a tree, directories deeper than max_depth are
+    collapsed into their number of files and the output stops after max_entries lines.
+    """
+    path = path.strip("/")
+    if path in ("", "."):
+        path = ""
+    node = _build_tree(file_paths)
+    for part in path.split("/") if path else []:
+        node = node.get(part)
+        if node is None:
+            return "NO PATH FOUND"
+
+    lines = []
+    truncated = False
+
+    def render(node: dict, prefix: str, depth: int):
+        nonlocal truncated
+        entries = sorted(node.items())
+        for index, (name, child) in enumerate(entries):
+            if len(lines) >= max_entries:
+                truncated = True
+                return
+            last = index == len(entries) - 1
+            connector = "└── " if last else "├── "
+            if child is None:
+                lines.append(f"{prefix}{connector}{name}")
+            elif depth >= max_depth:
+                file_count = _count_files(child)
+                files = "file" if file_count == 1 else "files"
+                lines.append(f"{prefix}{connector}{name}/ ({file_count} {files})")
+            else:
+                lines.append(f"{prefix}{connector}{name}/")
+                render(child, f"{prefix}    " if last else f"{prefix}│   ", depth + 1)
+
+    render(node, "", 1)
+    if truncated:
+        lines.append(
+            f"... truncated after {max_entries} entries, "
+            "use a deeper path or a lower max_depth to see more."
+        )
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=TREE_CACHE_SIZE)
+def _cached_tree(
+    repo_key: str,
+    revision: tuple[int, int, int],
+    path: str,
+    max_depth: int,
+    max_entries: int,
+) -> str:
+    repo_index = RepoIndex(repo_key)
+    try:
+        file_paths = list(repo_index.get_files())
+    finally:
+        repo_index.close()
+    return render_tree(file_paths, path, max_depth, max_entries)
+
+
+def get_repo_tree(
+    repo_path: str, path: str = "", max_depth: int = 3, max_entries: int = 500
+) -> str:
+    """
+    Return the tree of the files tracked by the repository index.
+
+    Only files of the index are listed, so ignored files such as build outputs or virtual
+    environments never appear. Rendered trees are cached until the index changes.
+
+    Args:
+        repo_path (str): Path to the repository.
+        path (str): Directory from the repository's root whose content is rendered.
+        max_depth (int): Number of directory levels rendered below path.
+        max_entries (int): Maximum number of lines of the tree.
+
+    Returns:
+        str: The rendered tree.
+    """
+    repo_key = os.path.realpath(repo_path)
+    repo_index = RepoIndex(repo_key)
+    try:
+        # Read before the files, a concurrent update then only causes a cache miss
+        revision = repo_index.get_revision()
+    finally:
+        repo_index.close()
+    return _cached_tree(repo_key, revision, path, max_depth, max_entries)
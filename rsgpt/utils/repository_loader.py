@@ -1,97 +1,373 @@
-from datetime import datetime
+import ast
+import multiprocessing
 import os
-from git import Repo
+import stat
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from langchain_chroma import Chroma
-from langchain_ollama.embeddings import OllamaEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter, Language
 from langchain_core.documents import Document
+from .git import list_repository_files
+from .python_chunker import split_python
+from .python_xref import CodeIndex, extract_code_index
+from .indexing_pipeline import EMBEDDING_BATCH_SIZE, IndexingPipeline
+from .repo_index import FileEntry, RepoIndex, git_blob_sha
+from .stores import get_repo_lock, get_repo_vector_store
 
+# Maximum number of paths passed to a single Chroma `$in` filter
+DELETE_BATCH_SIZE = 500
+# Below this number of files to split, a process pool costs more than it saves
+PARALLEL_SPLIT_MIN_FILES = 32
+# Forking a process running threads (logging, embedding requests, file watchers) can
+# deadlock the children on a lock held at fork time, workers start from a fresh process
+SPLIT_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
 
-def load_repository(repo_path: str):
+EXTENSION_TO_LANGUAGE = {
+    ".py": Language.PYTHON,
+    ".js": Language.JS,
+    ".html": Language.HTML,
+    ".md": Language.MARKDOWN,
+    ".cpp": Language.CPP,
+    ".hpp": Language.CPP,
+}
+
+
+def file_language(file_path: str) -> str:
+    """Return the language of a file from its extension, "text" when it is unknown."""
+    language = EXTENSION_TO_LANGUAGE.get(os.path.splitext(file_path)[1])
+    return language.value if language else "text"
+
+
+@lru_cache(maxsize=None)
+def _get_text_splitter(language: Language | None) -> RecursiveCharacterTextSplitter:
+    """Return the text splitter of a language, built once per process."""
+    if language:
+        return RecursiveCharacterTextSplitter.from_language(
+            language=language,
+            chunk_size=2000,
+            chunk_overlap=200,
+            add_start_index=True,
+        )
+    return RecursiveCharacterTextSplitter(
+        chunk_size=2000,
+        chunk_overlap=200,
+        add_start_index=True,
+    )
+
+
+def _split_file(
+    repo_path: str, file_path: str
+) -> tuple[list[Document], CodeIndex | None] | None:
+    """
+    Read a repository file and split it into chunks ready to be embedded.
+    Runs in the indexing worker processes. Returns None for binary files.
+
+    Python files are split by definition, their chunks carry the qualified name and the
+    line range of the definition, and their definitions, references and imports are
+    returned along with them. Other files, and Python files which do not parse, are split
+    by characters.
+    """
+    try:
+        # Keep line endings untouched so chunk offsets match the file on disk
+        with open(
+            os.path.join(repo_path, file_path), "r", encoding="utf-8", newline=""
+        ) as f:
+            content = f.read()
+    except UnicodeDecodeError:
+        return None
+
+    language = EXTENSION_TO_LANGUAGE.get(os.path.splitext(file_path)[1])
+    tree = _parse_python(content) if language == Language.PYTHON else None
+    if tree is not None:
+        code_chunks, symbols = split_python(content, tree=tree)
+        code_index = extract_code_index(tree, file_path, symbols)
+        chunks = [
+            Document(
+                page_content=content[start:end],
+                metadata={
+                    "start_index": start,
+                    "symbol": code_chunk.symbol,
+                    "symbol_kind": code_chunk.kind,
+                    "start_line": code_chunk.start_line,
+                    "end_line": code_chunk.end_line,
+                },
+            )
+            for start, end, code_chunk in code_chunks
+        ]
+    else:
+        code_index = None
+        chunks = _get_text_splitter(language).split_documents(
+            [Document(page_content=content, id=file_path)]
+        )
+    chunk_total = len(chunks)
+    for chunk_number, chunk in enumerate(chunks):
+        chunk.metadata = {
+            **chunk.metadata,
+            "file_path": file_path,
+            "chunk_number": chunk_number,
+            "last_chunk_number": chunk_total,
+            "language": file_language(file_path),
+        }
+    return chunks, code_index
+
+
+def _parse_python(content: str) -> ast.Module | None:
+    try:
+        return ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+
+def _read_code_index(repo_path: str, file_path: str) -> CodeIndex | None:
+    """Return the definitions, references and imports of a file, if it is Python."""
+    if EXTENSION_TO_LANGUAGE.get(os.path.splitext(file_path)[1]) != Language.PYTHON:
+        return None
+    split = _split_file(repo_path, file_path)
+    return split[1] if split else None
+
+
+def _stat_files(repo_path: str, repo_file_list: list[str]) -> dict[str, os.stat_result]:
+    """Return the stat of the regular files of the list which exist and can be indexed."""
+    file_stats = {}
+    for file_path in repo_file_list:
+        # Never index our own vector store, even if the repository does not ignore it
+        if file_path.startswith(".rsgpt/"):
+            continue
+        try:
+            file_stat = os.stat(os.path.join(repo_path, file_path))
+        except FileNotFoundError:
+            continue
+        if stat.S_ISREG(file_stat.st_mode):
+            file_stats[file_path] = file_stat
+    return file_stats
+
+
+def _scan_files(
+    repo_path: str, repo_file_list: list[str], known_files: dict[str, FileEntry]
+) -> dict[str, FileEntry]:
+    """
+    Compute the manifest entry of every file of the repository.
+    Files whose size and mtime did not change since the last check reuse the stored hash.
+    """
+    current_files = {}
+    for file_path, file_stat in _stat_files(repo_path, repo_file_list).items():
+        known_entry = known_files.get(file_path)
+        if (
+            known_entry
+            and known_entry.mtime_ns == file_stat.st_mtime_ns
+            and known_entry.size == file_stat.st_size
+        ):
+            current_files[file_path] = known_entry
+            continue
+        with open(os.path.join(repo_path, file_path), "rb") as f:
+            blob_sha = git_blob_sha(f.read())
+        current_files[file_path] = FileEntry(
+            blob_sha, file_stat.st_mtime_ns, file_stat.st_size
+        )
+    return current_files
+
+
+def _delete_file_chunks(vector_store: Chroma, file_paths: list[str]):
+    """Delete all the chunks belonging to the given files from the vector store."""
+    for start in range(0, len(file_paths), DELETE_BATCH_SIZE):
+        batch = file_paths[start : start + DELETE_BATCH_SIZE]
+        ids = vector_store.get(where={"file_path": {"$in": batch}}, include=[])["ids"]
+        if ids:
+            vector_store.delete(ids)
+
+
+def load_repository(
+    repo_path: str,
+    embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+    indexing_workers: int = 1,
+):
     """
     A utility function to load a repository, check for modified files, update vector stores, and split documents into chunks.
 
+    Files are tracked by their git blob SHA in a persistent manifest, so only files whose
+    content changed are re-embedded. Files whose content is already stored under another
+    path (renamed, moved or duplicated files) reuse the existing vectors. New chunks are
+    embedded in batches spanning several files while the next files are being split.
+    With several indexing workers, files are read and split in a process pool and streamed
+    to the embedding stage as they complete.
+
     Args:
         repo_path (str): Path to the repository.
+        embedding_batch_size (int): Number of chunks sent in a single embedding request.
+        indexing_workers (int): Number of processes reading and splitting files.
 
     Returns:
         dict: An empty dictionary as result.
     """
-    if not os.path.exists(os.path.join(repo_path, ".rsgpt")):
-        os.makedirs(os.path.join(repo_path, ".rsgpt", "chroma_db"), exist_ok=True)
+    with get_repo_lock(repo_path):
+        # Closing the index also rolls back the writes of an interrupted run
+        repo_index = RepoIndex(repo_path)
+        try:
+            return _load_repository(
+                repo_path, repo_index, embedding_batch_size, indexing_workers
+            )
+        finally:
+            repo_index.close()
 
-    last_check_path = os.path.join(repo_path, ".rsgpt", "chroma_db", "last_check")
-    last_check_datetime: datetime = datetime.fromisoformat("1970-01-01T00:00:00")
-    if os.path.exists(last_check_path):
-        with open(last_check_path, "r") as f:
-            last_check_datetime = datetime.fromisoformat(f.read())
 
-    repo = Repo(repo_path)
-    repo.git.add(A=True)
-    repo_file_list = repo.git.ls_files().split("\n")
-    modified_files = []
+def index_is_current(repo_path: str) -> bool:
+    """
+    Return whether the index records every file of the repository with its current size
+    and mtime. Files are only listed and stat'ed, none is read.
+    """
+    repo_index = RepoIndex(repo_path)
+    try:
+        known_files = repo_index.get_files()
+    finally:
+        repo_index.close()
+    file_stats = _stat_files(repo_path, list_repository_files(repo_path))
+    return file_stats.keys() == known_files.keys() and all(
+        (known_files[file_path].mtime_ns, known_files[file_path].size)
+        == (file_stat.st_mtime_ns, file_stat.st_size)
+        for file_path, file_stat in file_stats.items()
+    )
+
 
-    for file in repo_file_list:
+def reindex_file(
+    repo_path: str,
+    file_path: str,
+    embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+):
+    """
+    Update the vector store and the repository index for a single file.
+    Used right after a tool edited the file, so that its chunks stay addressable.
+
+    Args:
+        repo_path (str): Path to the repository.
+        file_path (str): Path of the file from the repository's root directory.
+        embedding_batch_size (int): Number of chunks sent in a single embedding request.
+    """
+    with get_repo_lock(repo_path):
+        vector_store = get_repo_vector_store(repo_path)
+        repo_index = RepoIndex(repo_path)
         try:
-            file_datetime = datetime.fromtimestamp(os.path.getmtime(file))
-            if file_datetime > last_check_datetime:
-                modified_files.append(file)
-        except FileNotFoundError:
-            pass
+            entry = _scan_files(repo_path, [file_path], {}).get(file_path)
+            _delete_file_chunks(vector_store, [file_path])
+            repo_index.remove_file(file_path)
+            if entry is not None:
+                with IndexingPipeline(
+                    vector_store, repo_index, batch_size=embedding_batch_size
+                ) as pipeline:
+                    chunks, code_index = _split_file(repo_path, file_path) or ([], None)
+                    repo_index.set_code_index(file_path, code_index)
+                    pipeline.add_file(file_path, entry, chunks)
+                    pipeline.flush()
+            repo_index.commit()
+        finally:
+            repo_index.close()
 
-    vector_store = Chroma(
-        collection_name="repo",
-        embedding_function=OllamaEmbeddings(model="bge-m3"),
-        persist_directory=os.path.join(repo_path, ".rsgpt", "chroma_db"),
-    )
 
-    extention_to_language = {
-        ".py": Language.PYTHON,
-        ".js": Language.JS,
-        ".html": Language.HTML,
-        ".md": Language.MARKDOWN,
-        ".cpp": Language.CPP,
-        ".hpp": Language.CPP,
-    }
-
-    old_documents = vector_store.get()
-    for index in range(len(old_documents["ids"])):
-        old_file_path = old_documents["metadatas"][index]["file_path"]
-        if old_file_path in modified_files or old_file_path not in repo_file_list:
-            vector_store.delete(old_documents["ids"][index])
+def _load_repository(
+    repo_path: str,
+    repo_index: RepoIndex,
+    embedding_batch_size: int,
+    indexing_workers: int,
+) -> dict:
+    if not os.path.exists(os.path.join(repo_path, ".rsgpt")):
+        os.makedirs(os.path.join(repo_path, ".rsgpt", "chroma_db"), exist_ok=True)
+
+    repo_file_list = list_repository_files(repo_path)
+
+    vector_store = get_repo_vector_store(repo_path)
 
+    known_files = repo_index.get_files()
+    if not known_files:
+        # No manifest yet: anything already in the collection cannot be trusted
+        stale_ids = vector_store.get(include=[])["ids"]
+        if stale_ids:
+            vector_store.delete(stale_ids)
+        last_check_path = os.path.join(repo_path, ".rsgpt", "chroma_db", "last_check")
+        if os.path.exists(last_check_path):
+            os.remove(last_check_path)
+
+    current_files = _scan_files(repo_path, repo_file_list, known_files)
+    modified_files = [
+        file_path
+        for file_path, entry in current_files.items()
+        if file_path not in known_files
+        or known_files[file_path].blob_sha != entry.blob_sha
+    ]
+    removed_files = [
+        file_path for file_path in known_files if file_path not in current_files
+    ]
+
+    # Collect the vectors of already embedded contents before deleting anything
+    path_by_sha = {entry.blob_sha: path for path, entry in known_files.items()}
+    reused_chunks = {}
     for file_path in modified_files:
-        print(f"Processing file: {file_path}")
-        extention = os.path.splitext(file_path)[1]
-        language = extention_to_language.get(extention)
-        text_splitter = None
-        if language:
-            text_splitter = RecursiveCharacterTextSplitter.from_language(
-                language=language,
-                chunk_size=2000,
-                chunk_overlap=200,
+        source_path = path_by_sha.get(current_files[file_path].blob_sha)
+        if source_path is None:
+            continue
+        reused_chunks[file_path] = vector_store.get(
+            where={"file_path": source_path},
+            include=["embeddings", "documents", "metadatas"],
+        )
+
+    _delete_file_chunks(vector_store, modified_files + removed_files)
+    for file_path in modified_files + removed_files:
+        repo_index.remove_file(file_path)
+    repo_index.commit()
+
+    reused_files = [path for path in modified_files if path in reused_chunks]
+    split_files = [path for path in modified_files if path not in reused_chunks]
+
+    with IndexingPipeline(
+        vector_store, repo_index, batch_size=embedding_batch_size
+    ) as pipeline:
+        for file_path in reused_files:
+            print(f"Reusing embeddings for file: {file_path}")
+            source = reused_chunks[file_path]
+            repo_index.set_code_index(file_path, _read_code_index(repo_path, file_path))
+            pipeline.add_embedded_chunks(
+                file_path,
+                current_files[file_path],
+                embeddings=source["embeddings"],
+                documents=source["documents"],
+                metadatas=[
+                    {
+                        **metadata,
+                        "file_path": file_path,
+                        "language": file_language(file_path),
+                    }
+                    for metadata in source["metadatas"]
+                ],
             )
-        else:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=2000,
-                chunk_overlap=200,
+
+        executor = None
+        split = partial(_split_file, repo_path)
+        if indexing_workers > 1 and len(split_files) >= PARALLEL_SPLIT_MIN_FILES:
+            executor = ProcessPoolExecutor(
+                max_workers=indexing_workers,
+                mp_context=multiprocessing.get_context(SPLIT_START_METHOD),
             )
-        with open(file_path, "r") as f:
-            document = Document(page_content=f.read(), id=file_path)
-
-        chunks = text_splitter.split_documents([document])
-        chunk_number = 0
-        chunk_total = len(chunks)
-        for chunk in chunks:
-            chunk.metadata = {
-                "file_path": file_path,
-                "chunk_number": chunk_number,
-                "last_chunk_number": chunk_total,
-            }
-            vector_store.add_documents([chunk])
-            chunk_number += 1
-
-    with open(last_check_path, "w") as f:
-        f.write(datetime.now().isoformat())
+            chunksize = max(1, len(split_files) // (indexing_workers * 8))
+            split_results = executor.map(split, split_files, chunksize=chunksize)
+        else:
+            split_results = map(split, split_files)
+        try:
+            for file_path, split_result in zip(split_files, split_results):
+                print(f"Processing file: {file_path}")
+                # Binary files are recorded without chunks so they are not read again
+                chunks, code_index = split_result or ([], None)
+                repo_index.set_code_index(file_path, code_index)
+                pipeline.add_file(file_path, current_files[file_path], chunks)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        pipeline.flush()
+
+    # Content-identical files only need their new stat recorded
+    modified_set = set(modified_files)
+    for file_path, entry in current_files.items():
+        if file_path not in modified_set and known_files[file_path] != entry:
+            repo_index.set_file(file_path, entry)
+    repo_index.commit()
 
     return {}
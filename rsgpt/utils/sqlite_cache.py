@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Bump when the layout changes, caches of an older layout are then emptied
+CACHE_SCHEMA_VERSION = 1
+# Maximum number of keys looked up in a single SQLite query
+LOOKUP_BATCH_SIZE = 500
+
+
+class SQLiteLRUCache:
+    """
+    Key-value cache stored in a SQLite database.
+
+    The cache keeps at most `max_entries` values, evicting the least recently used ones,
+    and values stored more than `ttl_s` seconds ago are dropped when looked up. The cache
+    owns its database, which is emptied when written with an older layout.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_s: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CACHE_SCHEMA_VERSION:
+            self._create_schema()
+        self.entry_count = self.connection.execute(
+            "SELECT COUNT(*) FROM entries"
+        ).fetchone()[0]
+
+    def _create_schema(self):
+        tables = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ).fetchall()
+        for (table,) in tables:
+            self.connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+        self.connection.execute(
+            "CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created_at INTEGER NOT NULL, last_access INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX entries_last_access ON entries (last_access)"
+        )
+        self.connection.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+        self.connection.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes | str]:
+        """
+        Return the values stored for the keys, missing and expired keys are left out.
+        Every key of the list counts as a hit or a miss, duplicates included.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time_ns()
+        values = {}
+        expired = []
+        with self.lock:
+            for start in range(0, len(unique_keys), LOOKUP_BATCH_SIZE):
+                batch = unique_keys[start : start + LOOKUP_BATCH_SIZE]
+                rows = self.connection.execute(
+                    "SELECT key, value, created_at FROM entries WHERE key IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                )
+                for key, value, created_at in rows:
+                    if self.ttl_s and now - created_at > self.ttl_s * 1e9:
+                        expired.append(key)
+                    else:
+                        values[key] = value
+            if expired:
+                self.connection.executemany(
+                    "DELETE FROM entries WHERE key = ?", [(key,) for key in expired]
+                )
+                self.entry_count -= len(expired)
+            if values:
+                self.connection.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in values],
+                )
+            if expired or values:
+                self.connection.commit()
+            hit_count = sum(key in values for key in keys)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return values
+
+    def put_many(self, values: dict[str, bytes | str]):
+        """Store values, replacing the ones stored for the same keys."""
+        now = time.time_ns()
+        keys = list(values)
+        with self.lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start : start + LOOKUP_BATCH_SIZE]
+                self.entry_count -= self.connection.execute(
+                    "SELECT COUNT(*) FROM entries WHERE key IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchone()[0]
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in values.items()],
+            )
+            self.entry_count += len(values)
+            if self.entry_count > self.max_entries:
+                # Evict a tenth more than needed so eviction does not run on every call
+                excess = self.entry_count - self.max_entries + self.max_entries // 10
+                self.connection.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+                    "ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self.entry_count = self.connection.execute(
+                    "SELECT COUNT(*) FROM entries"
+                ).fetchone()[0]
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+            self.entry_count = 0
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters of the cache since it was opened."""
+        return {"hits": self.hits, "misses": self.misses, "entries": self.entry_count}
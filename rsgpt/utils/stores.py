@@ -0,0 +1,144 @@
+import os
+import threading
+from typing import TYPE_CHECKING
+from langchain_core.embeddings import Embeddings
+from .embedding_cache import CachedEmbeddings
+from .recall_memory import RecallMemoryStore
+from .tracing import TracedEmbeddings, get_tracer
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
+EMBEDDING_MODEL = "bge-m3"
+# How long Ollama keeps the embedding model loaded between two requests
+EMBEDDING_KEEP_ALIVE = "30m"
+
+_lock = threading.Lock()
+_base_embeddings: Embeddings | None = None
+_embeddings: Embeddings | None = None
+_embedding_cache_path: str | None = None
+_embedding_cache_max_entries = 50000
+_repo_vector_stores: dict[str, "Chroma"] = {}
+_repo_locks: dict[str, threading.RLock] = {}
+_recall_memory_stores: dict[str, RecallMemoryStore] = {}
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Return the embedding client shared by the whole process.
+    Reusing a single client keeps the HTTP connection to Ollama alive between calls.
+    When an embedding cache is configured, the client is wrapped by it, and calls are
+    recorded as spans while tracing.
+    """
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            if _base_embeddings is not None:
+                embeddings = _base_embeddings
+                model_name = type(embeddings).__name__
+            else:
+                from langchain_ollama.embeddings import OllamaEmbeddings
+
+                embeddings = OllamaEmbeddings(
+                    model=EMBEDDING_MODEL, keep_alive=EMBEDDING_KEEP_ALIVE
+                )
+                model_name = EMBEDDING_MODEL
+            if _embedding_cache_path:
+                embeddings = CachedEmbeddings(
+                    embeddings,
+                    _embedding_cache_path,
+                    model_name,
+                    max_entries=_embedding_cache_max_entries,
+                )
+            tracer = get_tracer()
+            if tracer is not None:
+                embeddings = TracedEmbeddings(embeddings, tracer)
+            _embeddings = embeddings
+        return _embeddings
+
+
+def set_embeddings(embeddings: Embeddings | None):
+    """
+    Replace the shared embedding client, for instance with a local stand-in.
+    Stores opened with the previous client are dropped.
+    """
+    global _base_embeddings
+    with _lock:
+        _base_embeddings = embeddings
+        _reset()
+
+
+def configure_embedding_cache(cache_path: str | None, max_entries: int = 50000):
+    """
+    Cache every embedding of the process in a SQLite database at cache_path.
+    Passing None disables the cache.
+    """
+    global _embedding_cache_path, _embedding_cache_max_entries
+    with _lock:
+        _embedding_cache_path = cache_path
+        _embedding_cache_max_entries = max_entries
+        _reset()
+
+
+def get_embedding_settings() -> tuple[Embeddings | None, str | None, int]:
+    """
+    Return the embedding client set with set_embeddings and the configuration of the
+    embedding cache, for callers changing them temporarily.
+    """
+    with _lock:
+        return (
+            _base_embeddings,
+            _embedding_cache_path,
+            _embedding_cache_max_entries,
+        )
+
+
+def embedding_cache_stats() -> dict | None:
+    """Return the counters of the embedding cache, or None when it is not in use."""
+    embeddings = _embeddings
+    if isinstance(embeddings, TracedEmbeddings):
+        embeddings = embeddings.embeddings
+    return embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None
+
+
+def _reset():
+    global _embeddings
+    _embeddings = None
+    _repo_vector_stores.clear()
+    _recall_memory_stores.clear()
+
+
+def get_repo_vector_store(repo_path: str) -> "Chroma":
+    """Return the vector store of a repository, opened once per process."""
+    from langchain_chroma import Chroma
+
+    key = os.path.realpath(repo_path)
+    embeddings = get_embeddings()
+    with _lock:
+        if key not in _repo_vector_stores:
+            _repo_vector_stores[key] = Chroma(
+                collection_name="repo",
+                embedding_function=embeddings,
+                persist_directory=os.path.join(key, ".rsgpt", "chroma_db"),
+            )
+        return _repo_vector_stores[key]
+
+
+def get_repo_lock(repo_path: str) -> threading.RLock:
+    """
+    Return the lock serializing the indexing and the edits of a repository. The lock is
+    reentrant, so an edit holding it can re-index the files it changed.
+    """
+    key = os.path.realpath(repo_path)
+    with _lock:
+        return _repo_locks.setdefault(key, threading.RLock())
+
+
+def get_recall_memory_store(memory_store_path: str) -> RecallMemoryStore:
+    """Return the recall memory store saved at the given path, opened once per process."""
+    key = os.path.realpath(memory_store_path)
+    embeddings = get_embeddings()
+    with _lock:
+        if key not in _recall_memory_stores:
+            _recall_memory_stores[key] = RecallMemoryStore(key, embeddings)
+        return _recall_memory_stores[key]
@@ -0,0 +1,139 @@
+import sys
+import time
+from typing import TextIO
+from langchain_core.messages import BaseMessage
+
+# Characters of tool arguments and results shown on a progress line
+PREVIEW_CHARS = 120
+
+
+def _text_content(content) -> str:
+    """Return the text of a message content, which may be a list of content blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def _preview(value) -> str:
+    if isinstance(value, BaseMessage):
+        value = value.content
+    text = " ".join(str(value).split())
+    if len(text) > PREVIEW_CHARS:
+        return text[:PREVIEW_CHARS] + "..."
+    return text
+
+
+class StreamPrinter:
+    """
+    Print the events of a graph run as they happen.
+
+    Model tokens are written as they are generated, under a header naming the graph node
+    producing them. Since workers may run concurrently, a new header is written each time
+    the tokens switch to another model run. Tool calls are reported when they start and
+    when they finish, with their duration.
+    """
+
+    def __init__(self, output: TextIO = sys.stdout):
+        self.output = output
+        self.start_time = time.monotonic()
+        self.first_token_time: float | None = None
+        self.current_run: str | None = None
+        self.line_open = False
+        self.tool_start_times: dict[str, float] = {}
+        self.streamed_texts: dict[str, str] = {}
+        self.last_model_text = ""
+
+    def handle(self, event: dict):
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            self._on_token(event)
+        elif kind == "on_chat_model_end":
+            self.last_model_text = self.streamed_texts.pop(event["run_id"], "")
+        elif kind == "on_tool_start":
+            self.tool_start_times[event["run_id"]] = time.monotonic()
+            self._print_line(
+                f"[tool] {event['name']} started: "
+                f"{_preview(event['data'].get('input', ''))}"
+            )
+        elif kind == "on_tool_end":
+            elapsed = time.monotonic() - self.tool_start_times.pop(
+                event["run_id"], self.start_time
+            )
+            self._print_line(
+                f"[tool] {event['name']} finished in {elapsed:.1f}s: "
+                f"{_preview(event['data'].get('output', ''))}"
+            )
+        elif kind == "on_tool_error":
+            self.tool_start_times.pop(event["run_id"], None)
+            self._print_line(
+                f"[tool] {event['name']} failed: {_preview(event['data'].get('error'))}"
+            )
+
+    def finish(self, final_message: BaseMessage | None):
+        """Print the final message unless its content was already streamed."""
+        if final_message is not None and (
+            _text_content(final_message.content) != self.last_model_text
+        ):
+            self._close_line()
+            final_message.pretty_print()
+        elapsed = time.monotonic() - self.start_time
+        summary = f"[done in {elapsed:.1f}s"
+        if self.first_token_time is not None:
+            summary += f", first token after {self.first_token_time:.1f}s"
+        self._print_line(summary + "]")
+
+    def _on_token(self, event: dict):
+        text = _text_content(event["data"]["chunk"].content)
+        if not text:
+            return
+        if self.first_token_time is None:
+            self.first_token_time = time.monotonic() - self.start_time
+        run_id = event["run_id"]
+        if run_id != self.current_run:
+            node = event.get("metadata", {}).get("langgraph_node", event["name"])
+            self._close_line()
+            self.output.write(f"[{node}] ")
+            self.current_run = run_id
+        self.streamed_texts[run_id] = self.streamed_texts.get(run_id, "") + text
+        self.output.write(text)
+        self.output.flush()
+        self.line_open = True
+
+    def _print_line(self, line: str):
+        self._close_line()
+        self.output.write(line + "\n")
+        self.output.flush()
+        self.current_run = None
+
+    def _close_line(self):
+        if self.line_open:
+            self.output.write("\n")
+            self.line_open = False
+
+
+async def astream_graph(graph, graph_input, config, output: TextIO = sys.stdout):
+    """
+    Run a compiled graph while printing its tokens and tool calls as they happen.
+
+    Args:
+        graph: Compiled graph to run.
+        graph_input: Input state of the graph.
+        config: Configuration of the run.
+        output (TextIO): Stream the progress is written to.
+
+    Returns:
+        The final state of the graph, as returned by `ainvoke`.
+    """
+    printer = StreamPrinter(output)
+    final_state = None
+    async for event in graph.astream_events(graph_input, config, version="v2"):
+        printer.handle(event)
+        if event["event"] == "on_chain_end" and not event["parent_ids"]:
+            final_state = event["data"]["output"]
+    messages = (final_state or {}).get("messages") or [None]
+    printer.finish(messages[-1])
+    return final_state
@@ -0,0 +1,297 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+_tracer: "Tracer | None" = None
+
+
+class Tracer:
+    """
+    Record timed spans of a session to a JSONL file and aggregate them for a summary.
+
+    Each span is written as one JSON object when it ends, with its kind (graph, node,
+    tool, llm or embedding), name, start time, duration, status and the id of the closest
+    recorded span it ran in. LLM spans also carry their token usage and whether they were
+    answered from the response cache.
+    """
+
+    def __init__(self, log_directory: str):
+        os.makedirs(log_directory, exist_ok=True)
+        self.session_id = uuid.uuid4().hex
+        self.path = os.path.join(
+            log_directory, f"trace_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.jsonl"
+        )
+        self.file = open(self.path, "a", buffering=1)
+        self.lock = threading.Lock()
+        self.totals: dict[tuple[str, str], dict] = {}
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        start: float,
+        duration: float,
+        span_id: str | None = None,
+        parent_id: str | None = None,
+        error: str | None = None,
+        **attributes: Any,
+    ):
+        span = {
+            "session_id": self.session_id,
+            "span_id": span_id or uuid.uuid4().hex,
+            "parent_id": parent_id,
+            "kind": kind,
+            "name": name,
+            "start": start,
+            "duration_s": duration,
+            "status": "error" if error else "ok",
+            **({"error": error} if error else {}),
+            **attributes,
+        }
+        line = json.dumps(span, default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            total = self.totals.setdefault(
+                (kind, name),
+                {"count": 0, "errors": 0, "duration_s": 0.0, "max_s": 0.0},
+            )
+            total["count"] += 1
+            total["errors"] += bool(error)
+            total["duration_s"] += duration
+            total["max_s"] = max(total["max_s"], duration)
+            for key in ("prompt_tokens", "completion_tokens", "cached", "texts"):
+                # Responses served from the LLM cache spent no tokens
+                if key.endswith("_tokens") and attributes.get("cached"):
+                    continue
+                if attributes.get(key):
+                    total[key] = total.get(key, 0) + int(attributes[key])
+
+    def summary(self, cache_stats: dict[str, dict] | None = None) -> str:
+        """
+        Return a table of the time spent per kind and name of span, slowest first,
+        followed by the counters of the given caches.
+        """
+        with self.lock:
+            totals = sorted(
+                self.totals.items(),
+                key=lambda item: item[1]["duration_s"],
+                reverse=True,
+            )
+        lines = [
+            f"{'kind':<10} {'name':<32} {'count':>6} {'total s':>9} {'mean s':>8} "
+            f"{'max s':>8}  details"
+        ]
+        for (kind, name), total in totals:
+            details = []
+            if "prompt_tokens" in total or "completion_tokens" in total:
+                details.append(
+                    f"tokens {total.get('prompt_tokens', 0)} in / "
+                    f"{total.get('completion_tokens', 0)} out"
+                )
+            if "cached" in total:
+                details.append(f"{total['cached']} cached")
+            if "texts" in total:
+                details.append(f"{total['texts']} texts")
+            if total["errors"]:
+                details.append(f"{total['errors']} errors")
+            lines.append(
+                f"{kind:<10} {name[:32]:<32} {total['count']:>6} "
+                f"{total['duration_s']:>9.2f} {total['duration_s'] / total['count']:>8.2f} "
+                f"{total['max_s']:>8.2f}  {', '.join(details)}"
+            )
+        for cache, stats in (cache_stats or {}).items():
+            lines.append(
+                f"{cache}: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['entries']} entries"
+            )
+        lines.append(f"Spans written to {self.path}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Turn LangChain callbacks into spans: graph runs, graph nodes, tool calls and LLM calls.
+    Other runnables are not recorded, but spans nested in them are attached to the
+    closest recorded ancestor.
+    """
+
+    # Called on the event loop, so timings are not skewed by the executor queue
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self.lock = threading.Lock()
+        # run id -> (kind, name, start, wall clock start, recorded parent id)
+        self.runs: dict[UUID, tuple] = {}
+        # run id of every open run -> id of its closest recorded ancestor or itself
+        self.recorded_ancestors: dict[UUID, str | None] = {}
+
+    def _start(
+        self, run_id: UUID, parent_run_id: UUID | None, kind: str | None, name: str
+    ):
+        with self.lock:
+            parent_id = self.recorded_ancestors.get(parent_run_id)
+            self.recorded_ancestors[run_id] = run_id.hex if kind else parent_id
+            if kind:
+                self.runs[run_id] = (
+                    kind,
+                    name,
+                    time.perf_counter(),
+                    time.time(),
+                    parent_id,
+                )
+
+    def _end(self, run_id: UUID, error: BaseException | None = None, **attributes):
+        with self.lock:
+            self.recorded_ancestors.pop(run_id, None)
+            run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        kind, name, start, wall_start, parent_id = run
+        self.tracer.record(
+            kind,
+            name,
+            wall_start,
+            time.perf_counter() - start,
+            span_id=run_id.hex,
+            parent_id=parent_id,
+            error=repr(error) if error else None,
+            **attributes,
+        )
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        name = kwargs.get("name") or ""
+        kind = None
+        if parent_run_id is None:
+            kind = "graph"
+        elif metadata and metadata.get("langgraph_node") == name:
+            kind = "node"
+        self._start(run_id, parent_run_id, kind, name)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(
+        self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs
+    ):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start(run_id, parent_run_id, "tool", name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, parent_run_id=None, **kwargs
+    ):
+        invocation_params = kwargs.get("invocation_params") or {}
+        name = (
+            invocation_params.get("model_name")
+            or invocation_params.get("model")
+            or kwargs.get("name")
+            or "llm"
+        )
+        self._start(run_id, parent_run_id, "llm", name)
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self.on_chat_model_start(
+            serialized, prompts, run_id=run_id, parent_run_id=parent_run_id, **kwargs
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens = completion_tokens = 0
+        cached = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+                    # LangChain zeroes the cost of responses served from the cache
+                    cached = cached or usage.get("total_cost") == 0
+        self._end(
+            run_id,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached=cached,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+class TracedEmbeddings(Embeddings):
+    """Embeddings wrapper recording a span per embedding request."""
+
+    def __init__(self, embeddings: Embeddings, tracer: Tracer):
+        self.embeddings = embeddings
+        self.tracer = tracer
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._traced("embed_documents", self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._traced("embed_query", self.embeddings.embed_query, text)
+
+    def _traced(self, name: str, function, texts):
+        wall_start, start = time.time(), time.perf_counter()
+        error = None
+        try:
+            return function(texts)
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            self.tracer.record(
+                "embedding",
+                name,
+                wall_start,
+                time.perf_counter() - start,
+                error=error,
+                texts=len(texts) if isinstance(texts, list) else 1,
+            )
+
+
+def start_tracing(log_directory: str) -> Tracer:
+    """Start recording the spans of this process under log_directory."""
+    global _tracer
+    _tracer = Tracer(log_directory)
+    return _tracer
+
+
+def get_tracer() -> Tracer | None:
+    """Return the tracer of the process, or None when tracing is disabled."""
+    return _tracer
+
+
+def stop_tracing(cache_stats: dict[str, dict] | None = None) -> str | None:
+    """Stop tracing and return the summary of the session."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    summary = tracer.summary(cache_stats)
+    tracer.close()
+    return summary